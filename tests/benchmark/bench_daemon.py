@@ -0,0 +1,276 @@
+"""
+End-to-end daemon benchmark against a fake login1 service.
+
+It starts a private dbus-daemon (used as both system and session bus), serves
+a fake org.freedesktop.login1 (see fakelogin1.py) with N users and M sessions
+each, then drives timekprDaemon.checkUsers and timekprDaemon._restrictUsers
+for a number of ticks and reports tick latency distribution, DBus call counts
+and daemon phase timings. No real logind is needed, but the daemon has to be
+in development mode (TK_DEV_ACTIVE, TK_DEV_BUS = "ses").
+
+    python3 tests/benchmark/bench_daemon.py --users 100 --sessions 2 --latency-ms 1 --ticks 50
+"""
+
+# imports
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# paths
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+# names
+L1_BUS_NAME = "org.freedesktop.login1"
+L1_PATH = "/org/freedesktop/login1"
+BENCH_IF = "com.timekpr.bench.FakeLogin1"
+
+
+def getDistribution(pValues):
+    """Get latency distribution (in milliseconds)"""
+    # sorted
+    values = sorted(pValues)
+    # no values
+    if not values:
+        return {}
+
+    def _percentile(pPercentile):
+        # nearest rank
+        return values[min(len(values) - 1, max(0, int(round(pPercentile * len(values) + 0.5)) - 1))]
+
+    # result
+    return {
+        "count": len(values),
+        "min": values[0] * 1000,
+        "p50": _percentile(0.5) * 1000,
+        "p95": _percentile(0.95) * 1000,
+        "p99": _percentile(0.99) * 1000,
+        "max": values[-1] * 1000,
+        "mean": sum(values) / len(values) * 1000,
+    }
+
+
+def startBus():
+    """Start private bus and point both system and session bus addresses to it"""
+    # start
+    busProcess = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--nopidfile", "--print-address=1"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    # address
+    address = busProcess.stdout.readline().strip()
+    # set up env for us and children
+    os.environ["DBUS_SESSION_BUS_ADDRESS"] = address
+    os.environ["DBUS_SYSTEM_BUS_ADDRESS"] = address
+    # result
+    return busProcess
+
+
+def startFakeLogin1(pArgs):
+    """Start fake login1 and wait until it's on the bus"""
+    # imports
+    import dbus
+
+    # start
+    fakeProcess = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(BENCH_DIR, "fakelogin1.py"),
+            "--users",
+            str(pArgs.users),
+            "--sessions",
+            str(pArgs.sessions),
+            "--latency-ms",
+            str(pArgs.latency_ms),
+        ]
+    )
+    # wait for the name
+    bus = dbus.SystemBus()
+    for rTry in range(600):
+        # there
+        if bus.name_has_owner(L1_BUS_NAME):
+            break
+        # died
+        if fakeProcess.poll() is not None:
+            raise RuntimeError("fake login1 exited with %s" % (fakeProcess.returncode))
+        # wait
+        time.sleep(0.1)
+    else:
+        raise RuntimeError("fake login1 did not appear on the bus")
+    # interface to control the fake
+    fakeInterface = dbus.Interface(bus.get_object(L1_BUS_NAME, L1_PATH), BENCH_IF)
+    # result
+    return fakeProcess, fakeInterface
+
+
+def processPendingEvents(pContext):
+    """Process main loop events (signals, timeouts) in this thread"""
+    # process
+    while pContext.pending():
+        pContext.iteration(False)
+
+
+def runBenchmark(pArgs, pRuntimeDir):
+    """Run the daemon against the fake service"""
+    # daemon resolves development paths relative to its own directory
+    os.chdir(os.path.join(REPO_DIR, "timekpr", "server"))
+    sys.path.insert(0, REPO_DIR)
+
+    # timekpr imports
+    from gi.repository import GLib
+    from timekpr.common.constants import constants as cons
+    from timekpr.common.utils import perfstats
+    from timekpr.server.interface.dbus.daemon import timekprDaemon
+
+    # development mode with session bus is required
+    if not (cons.TK_DEV_ACTIVE and cons.TK_DEV_BUS == "ses"):
+        raise RuntimeError('benchmark needs TK_DEV_ACTIVE = True and TK_DEV_BUS = "ses"')
+    # keep user configs, control files and logs out of the tree
+    cons.TK_CONFIG_DIR_DEV = pRuntimeDir
+    cons.TK_WORK_DIR_DEV = pRuntimeDir
+    cons.TK_LOGFILE_DIR_DEV = pRuntimeDir
+
+    # fake login1
+    fakeProcess, fakeInterface = startFakeLogin1(pArgs)
+    try:
+        # daemon (main loop is not run in separate thread, its events are processed between ticks)
+        daemon = timekprDaemon()
+        daemon.initTimekpr()
+        daemon._timekprConfig.setTimekprWorkerThreads(pArgs.workers)
+        context = GLib.MainContext.default()
+
+        # first tick sets up all users
+        processPendingEvents(context)
+        tickStart = time.perf_counter()
+        daemon.checkUsers()
+        initialTick = time.perf_counter() - tickStart
+        # users to restrict
+        for rUserName in sorted(daemon._timekprUserList)[: pArgs.restricted]:
+            # no time left
+            daemon.setTimeLeft(rUserName, "=", 0)
+        processPendingEvents(context)
+
+        # measure steady state only
+        fakeInterface.ResetCallCounts()
+        perfstats.resetPerfStats()
+        tickTimes = []
+        restrictTimes = []
+        # ticks
+        for rTick in range(pArgs.ticks):
+            # check users
+            tickStart = time.perf_counter()
+            daemon.checkUsers()
+            tickTimes.append(time.perf_counter() - tickStart)
+            # restrictions
+            tickStart = time.perf_counter()
+            daemon._restrictUsers()
+            restrictTimes.append(time.perf_counter() - tickStart)
+            # signals and timeouts
+            processPendingEvents(context)
+            # pause
+            if pArgs.interval > 0:
+                time.sleep(pArgs.interval)
+
+        # call counts
+        callCounts = {str(rMethod): int(rCnt) for rMethod, rCnt in fakeInterface.GetCallCounts().items()}
+        # result
+        return {
+            "users": pArgs.users,
+            "sessions": pArgs.sessions,
+            "latency_ms": pArgs.latency_ms,
+            "workers": pArgs.workers,
+            "restricted": pArgs.restricted,
+            "tracked_users": len(daemon._timekprUserList),
+            "initial_tick_ms": initialTick * 1000,
+            "tick_ms": getDistribution(tickTimes),
+            "restrict_ms": getDistribution(restrictTimes),
+            "dbus_calls": callCounts,
+            "dbus_calls_per_tick": sum(callCounts.values()) / max(pArgs.ticks, 1),
+            "phases": perfstats.getPerfStats(),
+        }
+    finally:
+        # stop fake
+        fakeProcess.terminate()
+        fakeProcess.wait()
+
+
+def printReport(pResult):
+    """Print human readable report"""
+    print(
+        "users: %i (tracked: %i), sessions per user: %i, latency: %.2f ms, workers: %i, restricted: %i"
+        % (
+            pResult["users"],
+            pResult["tracked_users"],
+            pResult["sessions"],
+            pResult["latency_ms"],
+            pResult["workers"],
+            pResult["restricted"],
+        )
+    )
+    print("initial tick: %.2f ms" % (pResult["initial_tick_ms"]))
+    for rName in ("tick_ms", "restrict_ms"):
+        # distribution
+        dist = pResult[rName]
+        print(
+            "%-12s n=%i min=%.2f p50=%.2f p95=%.2f p99=%.2f max=%.2f mean=%.2f"
+            % (rName, dist["count"], dist["min"], dist["p50"], dist["p95"], dist["p99"], dist["max"], dist["mean"])
+        )
+    print("dbus calls per tick: %.2f" % (pResult["dbus_calls_per_tick"]))
+    for rMethod, rCnt in sorted(pResult["dbus_calls"].items()):
+        print("  %-20s %i" % (rMethod, rCnt))
+    print("phases (ms):")
+    for rPhase, rStats in sorted(pResult["phases"].items()):
+        # skip per user phases in summary
+        if ":" in rPhase:
+            continue
+        print(
+            "  %-28s n=%i p50=%.3f p95=%.3f max=%.3f"
+            % (rPhase, rStats["count"], rStats["p50"] * 1000, rStats["p95"] * 1000, rStats["max"] * 1000)
+        )
+
+
+def main():
+    # args
+    parser = argparse.ArgumentParser(description="timekpr daemon benchmark against a fake login1")
+    parser.add_argument("--users", type=int, default=10, help="number of synthetic users")
+    parser.add_argument("--sessions", type=int, default=1, help="number of sessions per user")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fake login1 latency per call")
+    parser.add_argument("--ticks", type=int, default=20, help="number of measured ticks")
+    parser.add_argument("--interval", type=float, default=0.0, help="pause between ticks in seconds")
+    parser.add_argument("--workers", type=int, default=0, help="worker threads for processing users")
+    parser.add_argument("--restricted", type=int, default=0, help="number of users with no time left")
+    parser.add_argument("--json", action="store_true", help="print result as JSON")
+    args = parser.parse_args()
+
+    # bus daemon is required
+    if shutil.which("dbus-daemon") is None:
+        sys.exit("dbus-daemon is not available")
+
+    # private bus
+    busProcess = startBus()
+    runtimeDir = tempfile.mkdtemp(prefix="timekpr-bench-")
+    try:
+        # run
+        result = runBenchmark(args, runtimeDir)
+    finally:
+        # clean up
+        busProcess.terminate()
+        busProcess.wait()
+        shutil.rmtree(runtimeDir, ignore_errors=True)
+
+    # report
+    if args.json:
+        print(json.dumps(result, indent=2, sort_keys=True))
+    else:
+        printReport(result)
+    # daemon threads (worker pool, log flushing) are not needed anymore
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+PlayTime process scanner benchmark against synthetic process trees (see fakeproc.py).
+
+For every tree size and filter count it measures the initial full scan, scans
+with process churn before each of them, filter changes (processes of the user
+are matched again) and the kill path. The kill path is measured on real
+processes (copies of sleep started by the benchmark), signals can not be sent
+to synthetic ones. Trees with user mix and killing processes of other users
+need root, otherwise all processes belong to the current user.
+
+    python3 tests/benchmark/bench_playtime.py --pids 1000,10000,50000 --filters 1,10,100 --churn 0.01
+"""
+
+# imports
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# paths
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, REPO_DIR)
+
+# benchmark imports
+from bench_daemon import getDistribution
+from fakeproc import fakeProcTree, getExeName, UID_START
+
+# timekpr imports
+from timekpr.server.user.playtime import timekprPlayTimeConfig
+
+# executable for kill path
+KILL_EXE = "tkbenchsleep"
+
+
+class benchConfig(object):
+    """Server config values, which PlayTime uses"""
+
+    def __init__(self, pEnhanced, pCpuActivity):
+        """Initialize"""
+        # whether cmdline is inspected
+        self._enhanced = pEnhanced
+        # whether CPU use of matched processes is checked
+        self._cpuActivity = pCpuActivity
+
+    def getTimekprPlayTimeEnhancedActivityMonitorEnabled(self):
+        """Get whether cmdline is inspected"""
+        return self._enhanced
+
+    def getTimekprPlayTimeProcConnectorEnabled(self):
+        """Processes are always listed"""
+        return False
+
+    def getTimekprPlayTimeCgroupScanEnabled(self):
+        """Processes are always listed"""
+        return False
+
+    def getTimekprPlayTimeCpuActivityEnabled(self):
+        """Get whether CPU use of matched processes is checked"""
+        return self._cpuActivity
+
+
+def getFilters(pCnt, pExeCnt, pShift=0):
+    """Get filters for executables spread over all executables (every 4th is regexp, scripts are matched by cmdline)"""
+    # def
+    flts = []
+    # spread
+    for rNr in range(pCnt):
+        # executable
+        exeNr = (rNr * max(pExeCnt // max(pCnt, 1), 1) + pShift) % pExeCnt
+        # script (interpreter is not matched, script in cmdline is)
+        if exeNr % 10 == 9:
+            flt = "%s\\.py" % (getExeName(exeNr))
+        # regexp
+        elif rNr % 4 == 3:
+            flt = "%s(-bin)?" % (getExeName(exeNr))
+        # plain executable
+        else:
+            flt = getExeName(exeNr)
+        # filter with description
+        flts.append([flt, "bench %i" % (rNr)])
+    # result
+    return flts
+
+
+def benchScan(pArgs, pTree, pFltCnt):
+    """Measure scans and filter changes on synthetic tree"""
+    # owners
+    owners = sorted(set(str(pTree.getOwner(rUid)) for rUid in range(UID_START, UID_START + pArgs.users)))
+    # PlayTime on synthetic tree
+    playTimeConfig = timekprPlayTimeConfig(benchConfig(pArgs.enhanced, pArgs.cpu), pProcRoot=pTree.getRoot())
+    # filters
+    for rOwner in owners:
+        playTimeConfig.processPlayTimeFilters(rOwner, getFilters(pFltCnt, pArgs.exes))
+    # initial scan
+    timeStart = time.perf_counter()
+    playTimeConfig._cachePlayTimeProcesses()
+    initialScan = time.perf_counter() - timeStart
+
+    # scans with churn
+    scanTimes = []
+    cpuTimes = []
+    churnCnt = 0
+    for _rTick in range(pArgs.ticks):
+        # churn
+        churnCnt += pTree.churn(pArgs.churn)
+        # scan
+        timeStart = time.perf_counter()
+        playTimeConfig._cachePlayTimeProcesses()
+        scanTimes.append(time.perf_counter() - timeStart)
+        # CPU use of matched processes
+        if pArgs.cpu:
+            # check
+            timeStart = time.perf_counter()
+            playTimeConfig._processCpuActivity()
+            cpuTimes.append(time.perf_counter() - timeStart)
+
+    # filter changes (filters are shifted, so they change every time)
+    filterTimes = []
+    for rTick in range(pArgs.ticks):
+        # all users
+        for rOwner in owners:
+            # change
+            timeStart = time.perf_counter()
+            playTimeConfig.processPlayTimeFilters(rOwner, getFilters(pFltCnt, pArgs.exes, rTick + 1))
+            filterTimes.append(time.perf_counter() - timeStart)
+
+    # result
+    return {
+        "users": len(owners),
+        "cached": len(playTimeConfig.getCachedProcesses()),
+        "matched": sum(playTimeConfig.getMatchedUserProcessCnt(rOwner) for rOwner in owners),
+        "churned": churnCnt,
+        "initial_scan_ms": initialScan * 1000,
+        "scan_ms": getDistribution(scanTimes),
+        "cpu_ms": getDistribution(cpuTimes),
+        "filters_ms": getDistribution(filterTimes),
+    }
+
+
+def benchKill(pArgs, pFltCnt, pWorkDir):
+    """Measure kill path on real processes"""
+    # user for processes
+    uid = UID_START if os.geteuid() == 0 else os.geteuid()
+    # executable, which is matched only by our filter
+    exe = os.path.join(pWorkDir, KILL_EXE)
+    shutil.copy(shutil.which("sleep"), exe)
+    os.chmod(pWorkDir, 0o755)
+    # start processes
+    processes = [subprocess.Popen([exe, "600"], user=uid if os.geteuid() == 0 else None) for _rNr in range(pArgs.kill)]
+    try:
+        # PlayTime on real processes
+        playTimeConfig = timekprPlayTimeConfig(benchConfig(pArgs.enhanced, pArgs.cpu))
+        playTimeConfig.processPlayTimeFilters(
+            str(uid), getFilters(pFltCnt - 1, pArgs.exes) + [[KILL_EXE, "bench kill"]]
+        )
+        # scan
+        timeStart = time.perf_counter()
+        playTimeConfig._cachePlayTimeProcesses()
+        scanTime = time.perf_counter() - timeStart
+        # matched
+        matchedCnt = playTimeConfig.getMatchedUserProcessCnt(str(uid))
+        # kill
+        timeStart = time.perf_counter()
+        playTimeConfig.killPlayTimeProcesses(str(uid))
+        killTime = time.perf_counter() - timeStart
+        # wait for all to exit
+        while any(rProcess.poll() is None for rProcess in processes):
+            time.sleep(0.001)
+        exitTime = time.perf_counter() - timeStart
+        # release exited processes
+        playTimeConfig.processPlayTimeActivities()
+    finally:
+        # clean up
+        for rProcess in processes:
+            # still there
+            if rProcess.poll() is None:
+                rProcess.kill()
+            rProcess.wait()
+        os.unlink(exe)
+    # result
+    return {
+        "processes": pArgs.kill,
+        "matched": matchedCnt,
+        "real_scan_ms": scanTime * 1000,
+        "kill_ms": killTime * 1000,
+        "exit_ms": exitTime * 1000,
+    }
+
+
+def runBenchmark(pArgs, pWorkDir):
+    """Run all sizes and filter counts"""
+    # results
+    results = []
+    # tree sizes
+    for rPidCnt in pArgs.pids:
+        # tree
+        tree = fakeProcTree(
+            os.path.join(pWorkDir, "proc%i" % (rPidCnt)),
+            [UID_START + rNr for rNr in range(pArgs.users)],
+            pArgs.exes,
+            pArgs.seed,
+        )
+        # build
+        timeStart = time.perf_counter()
+        tree.populate(rPidCnt)
+        buildTime = time.perf_counter() - timeStart
+        # filter counts
+        for rFltCnt in pArgs.filters:
+            # result
+            result = {"pids": rPidCnt, "filters": rFltCnt, "build_s": buildTime}
+            # scan
+            result.update(benchScan(pArgs, tree, rFltCnt))
+            # kill
+            if pArgs.kill > 0:
+                result["kill"] = benchKill(pArgs, rFltCnt, pWorkDir)
+            # add
+            results.append(result)
+        # clean up
+        tree.removeTree()
+    # result
+    return results
+
+
+def printReport(pResults):
+    """Print human readable report"""
+    # results
+    for rResult in pResults:
+        print(
+            "pids: %i, filters: %i, users: %i, cached: %i, matched: %i, churned: %i, tree built in %.1f s"
+            % (
+                rResult["pids"],
+                rResult["filters"],
+                rResult["users"],
+                rResult["cached"],
+                rResult["matched"],
+                rResult["churned"],
+                rResult["build_s"],
+            )
+        )
+        print("  %-12s %.2f" % ("initial scan", rResult["initial_scan_ms"]))
+        for rName in ("scan_ms", "cpu_ms", "filters_ms"):
+            # distribution
+            dist = rResult[rName]
+            # not measured
+            if not dist:
+                continue
+            print(
+                "  %-12s n=%i min=%.2f p50=%.2f p95=%.2f p99=%.2f max=%.2f mean=%.2f"
+                % (rName, dist["count"], dist["min"], dist["p50"], dist["p95"], dist["p99"], dist["max"], dist["mean"])
+            )
+        # kill
+        if "kill" in rResult:
+            print(
+                "  %-12s processes=%i matched=%i real_scan=%.2f kill=%.2f exit=%.2f"
+                % (
+                    "kill_ms",
+                    rResult["kill"]["processes"],
+                    rResult["kill"]["matched"],
+                    rResult["kill"]["real_scan_ms"],
+                    rResult["kill"]["kill_ms"],
+                    rResult["kill"]["exit_ms"],
+                )
+            )
+
+
+def main():
+    # args
+    parser = argparse.ArgumentParser(description="timekpr PlayTime scanner benchmark on synthetic process trees")
+    parser.add_argument("--pids", default="1000,10000,50000", help="process counts (comma separated)")
+    parser.add_argument("--filters", default="1,10,100", help="filter counts per user (comma separated)")
+    parser.add_argument("--users", type=int, default=10, help="number of users")
+    parser.add_argument("--exes", type=int, default=1000, help="number of distinct executables")
+    parser.add_argument("--churn", type=float, default=0.01, help="share of processes replaced before every scan")
+    parser.add_argument("--ticks", type=int, default=10, help="number of measured scans and filter changes")
+    parser.add_argument("--kill", type=int, default=100, help="number of real processes for kill path (0 - skip)")
+    parser.add_argument("--enhanced", action="store_true", help="inspect cmdlines too")
+    parser.add_argument("--cpu", action="store_true", help="check CPU use of matched processes")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print result as JSON")
+    args = parser.parse_args()
+    args.pids = [int(rCnt) for rCnt in args.pids.split(",")]
+    args.filters = [max(int(rCnt), 1) for rCnt in args.filters.split(",")]
+
+    # trees are created here
+    workDir = tempfile.mkdtemp(prefix="timekpr-ptbench-")
+    try:
+        # run
+        results = runBenchmark(args, workDir)
+    finally:
+        # clean up
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    # report
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        printReport(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Stand-in for org.freedesktop.login1 used by the daemon benchmark.
+
+It serves a manager, N synthetic users and M sessions per user on the bus
+given by DBUS_SYSTEM_BUS_ADDRESS, sleeps for a configurable time in every
+call (to mimic a loaded logind) and counts all calls, which can be read
+back through the com.timekpr.bench.FakeLogin1 interface on the manager.
+
+    python3 fakelogin1.py --users 50 --sessions 2 --latency-ms 1
+"""
+
+# imports
+import argparse
+import os
+import time
+import dbus
+import dbus.service
+from dbus.mainloop.glib import DBusGMainLoop
+from gi.repository import GLib
+
+# names
+L1_BUS_NAME = "org.freedesktop.login1"
+L1_PATH = "/org/freedesktop/login1"
+L1_MANAGER_IF = "org.freedesktop.login1.Manager"
+L1_USER_IF = "org.freedesktop.login1.User"
+L1_SESSION_IF = "org.freedesktop.login1.Session"
+L1_SEAT_IF = "org.freedesktop.login1.Seat"
+BENCH_IF = "com.timekpr.bench.FakeLogin1"
+# first synthetic user id (above UID_MIN everywhere)
+UID_START = 20000
+
+
+class fakeLogin1Service(object):
+    """Call accounting and latency shared by all fake objects"""
+
+    def __init__(self, pLatency):
+        """Initialize"""
+        # latency per call (secs)
+        self._latency = pLatency
+        # call counts per method
+        self._callCounts = {}
+
+    def account(self, pMethod):
+        """Account for the call and simulate latency"""
+        # count
+        self._callCounts[pMethod] = self._callCounts.get(pMethod, 0) + 1
+        # simulate busy service (logind processes calls one by one too)
+        if self._latency > 0:
+            time.sleep(self._latency)
+
+    def getCallCounts(self):
+        """Get call counts"""
+        return self._callCounts
+
+    def resetCallCounts(self):
+        """Reset call counts"""
+        self._callCounts = {}
+
+
+class fakeLogin1Object(dbus.service.Object):
+    """Object which exposes properties for one login1 interface"""
+
+    def __init__(self, pBus, pPath, pService, pInterface, pProperties):
+        """Initialize"""
+        # service
+        self._service = pService
+        # interface and properties
+        self._interface = pInterface
+        self._properties = pProperties
+        # init DBUS
+        super().__init__(pBus, pPath)
+
+    @dbus.service.method(dbus.PROPERTIES_IFACE, in_signature="ss", out_signature="v")
+    def Get(self, pInterface, pProperty):
+        """Get property"""
+        self._service.account("Get")
+        # not ours
+        if pInterface != self._interface or pProperty not in self._properties:
+            raise dbus.exceptions.DBusException(
+                "Unknown property %s.%s" % (pInterface, pProperty),
+                name="org.freedesktop.DBus.Error.UnknownProperty",
+            )
+        # result
+        return self._properties[pProperty]
+
+    @dbus.service.method(dbus.PROPERTIES_IFACE, in_signature="s", out_signature="a{sv}")
+    def GetAll(self, pInterface):
+        """Get all properties"""
+        self._service.account("GetAll")
+        # result
+        return self._properties if pInterface == self._interface else {}
+
+    @dbus.service.signal(dbus.PROPERTIES_IFACE, signature="sa{sv}as")
+    def PropertiesChanged(self, pInterface, pChanged, pInvalidated):
+        """Properties changed signal"""
+        pass
+
+
+class fakeLogin1Session(fakeLogin1Object):
+    """Session object"""
+
+    @dbus.service.method(L1_SESSION_IF, in_signature="", out_signature="")
+    def Lock(self):
+        """Lock session"""
+        self._service.account("Lock")
+
+    @dbus.service.method(L1_SESSION_IF, in_signature="", out_signature="")
+    def Terminate(self):
+        """Terminate session"""
+        self._service.account("Terminate")
+
+
+class fakeLogin1Seat(fakeLogin1Object):
+    """Seat object"""
+
+    @dbus.service.method(L1_SEAT_IF, in_signature="u", out_signature="")
+    def SwitchTo(self, pVTNr):
+        """Switch VT"""
+        self._service.account("SwitchTo")
+
+
+class fakeLogin1Manager(dbus.service.Object):
+    """Manager object"""
+
+    def __init__(self, pBus, pService, pUsers, pSessions):
+        """Initialize manager, users and sessions"""
+        # service
+        self._service = pService
+        # users (uid, name, path)
+        self._users = []
+        # all objects (so they stay alive)
+        self._objects = []
+        # init DBUS
+        super().__init__(pBus, L1_PATH)
+
+        # seat
+        seatPath = "%s/seat/seat0" % (L1_PATH)
+        self._objects.append(fakeLogin1Seat(pBus, seatPath, pService, L1_SEAT_IF, {"Id": "seat0"}))
+
+        # users and their sessions
+        for rUserIdx in range(pUsers):
+            # user
+            uid = UID_START + rUserIdx
+            userName = "tkbench%04i" % (rUserIdx)
+            userPath = "%s/user/_%i" % (L1_PATH, uid)
+            # sessions
+            sessions = []
+            for rSessionIdx in range(pSessions):
+                # session
+                sessionId = "%i_%i" % (uid, rSessionIdx)
+                sessionPath = "%s/session/_%s" % (L1_PATH, sessionId)
+                sessions.append(dbus.Struct((sessionId, dbus.ObjectPath(sessionPath)), signature="so"))
+                # session properties
+                sessionProperties = {
+                    "Id": sessionId,
+                    "Name": userName,
+                    "User": dbus.Struct((dbus.UInt32(uid), dbus.ObjectPath(userPath)), signature="uo"),
+                    "Type": "x11" if rSessionIdx == 0 else "tty",
+                    "Class": "user",
+                    "State": "active" if rSessionIdx == 0 else "online",
+                    "Active": dbus.Boolean(rSessionIdx == 0),
+                    "IdleHint": dbus.Boolean(False),
+                    "LockedHint": dbus.Boolean(False),
+                    "Remote": dbus.Boolean(False),
+                    "VTNr": dbus.UInt32(rSessionIdx + 2),
+                    "Seat": dbus.Struct(("seat0", dbus.ObjectPath(seatPath)), signature="so"),
+                }
+                self._objects.append(fakeLogin1Session(pBus, sessionPath, pService, L1_SESSION_IF, sessionProperties))
+            # user properties
+            userProperties = {
+                "UID": dbus.UInt32(uid),
+                "GID": dbus.UInt32(uid),
+                "Name": userName,
+                "State": "active",
+                "Sessions": dbus.Array(sessions, signature="(so)"),
+                "IdleHint": dbus.Boolean(False),
+            }
+            self._objects.append(fakeLogin1Object(pBus, userPath, pService, L1_USER_IF, userProperties))
+            self._users.append((dbus.UInt32(uid), userName, dbus.ObjectPath(userPath)))
+
+    @dbus.service.method(L1_MANAGER_IF, in_signature="", out_signature="a(uso)")
+    def ListUsers(self):
+        """List users"""
+        self._service.account("ListUsers")
+        return self._users
+
+    @dbus.service.method(L1_MANAGER_IF, in_signature="ssss", out_signature="h")
+    def Inhibit(self, pWhat, pWho, pWhy, pMode):
+        """Take inhibitor lock"""
+        self._service.account("Inhibit")
+        # any fd will do
+        return dbus.types.UnixFd(os.open(os.devnull, os.O_RDONLY))
+
+    @dbus.service.method(L1_MANAGER_IF, in_signature="s", out_signature="o")
+    def GetSeat(self, pSeatId):
+        """Get seat"""
+        self._service.account("GetSeat")
+        return dbus.ObjectPath("%s/seat/%s" % (L1_PATH, pSeatId))
+
+    @dbus.service.method(L1_MANAGER_IF, in_signature="s", out_signature="")
+    def TerminateSession(self, pSessionId):
+        """Terminate session"""
+        self._service.account("TerminateSession")
+
+    @dbus.service.method(L1_MANAGER_IF, in_signature="b", out_signature="")
+    def Suspend(self, pInteractive):
+        """Suspend"""
+        self._service.account("Suspend")
+
+    @dbus.service.method(L1_MANAGER_IF, in_signature="b", out_signature="")
+    def PowerOff(self, pInteractive):
+        """Power off"""
+        self._service.account("PowerOff")
+
+    @dbus.service.signal(L1_MANAGER_IF, signature="uo")
+    def UserNew(self, pUID, pUserPath):
+        """User new signal"""
+        pass
+
+    @dbus.service.signal(L1_MANAGER_IF, signature="uo")
+    def UserRemoved(self, pUID, pUserPath):
+        """User removed signal"""
+        pass
+
+    @dbus.service.signal(L1_MANAGER_IF, signature="so")
+    def SessionNew(self, pSessionId, pSessionPath):
+        """Session new signal"""
+        pass
+
+    @dbus.service.signal(L1_MANAGER_IF, signature="so")
+    def SessionRemoved(self, pSessionId, pSessionPath):
+        """Session removed signal"""
+        pass
+
+    @dbus.service.signal(L1_MANAGER_IF, signature="b")
+    def PrepareForSleep(self, pStart):
+        """Prepare for sleep signal"""
+        pass
+
+    @dbus.service.method(BENCH_IF, in_signature="", out_signature="a{su}")
+    def GetCallCounts(self):
+        """Get call counts (not accounted)"""
+        return dbus.Dictionary(self._service.getCallCounts(), signature="su")
+
+    @dbus.service.method(BENCH_IF, in_signature="", out_signature="")
+    def ResetCallCounts(self):
+        """Reset call counts (not accounted)"""
+        self._service.resetCallCounts()
+
+
+def main():
+    # args
+    parser = argparse.ArgumentParser(description="Fake login1 service for timekpr benchmarks")
+    parser.add_argument("--users", type=int, default=10, help="number of synthetic users")
+    parser.add_argument("--sessions", type=int, default=1, help="number of sessions per user")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latency for every call in milliseconds")
+    args = parser.parse_args()
+
+    # main loop
+    DBusGMainLoop(set_as_default=True)
+    # fake system bus is set up by the caller
+    bus = dbus.SystemBus()
+    # objects
+    service = fakeLogin1Service(args.latency_ms / 1000.0)
+    manager = fakeLogin1Manager(bus, service, args.users, args.sessions)
+    # name is taken last, so when it appears, everything is ready
+    busName = dbus.service.BusName(L1_BUS_NAME, bus=bus)
+    # run
+    GLib.MainLoop().run()
+    # keep references
+    del manager, busName
+
+
+if __name__ == "__main__":
+    main()
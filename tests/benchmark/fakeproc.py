@@ -0,0 +1,180 @@
+"""
+Synthetic process information file system used by PlayTime benchmarks and tests.
+
+It creates <root>/<pid>/{exe,cmdline,stat,status} for a number of processes,
+which is all PlayTime reads about a process. PlayTime takes process owner from
+the owner of the exe link, owners can only be set when running as root, when
+not, all processes belong to the current user. Processes can be replaced between
+ticks to mimic process churn (new processes get new pids, like kernel does).
+
+    python3 fakeproc.py --root /tmp/fakeproc --pids 10000 --users 10 --exes 1000
+"""
+
+# imports
+import argparse
+import os
+import random
+import shutil
+
+# first synthetic user id (above UID_MIN everywhere)
+UID_START = 20000
+# first synthetic pid (kernel threads and system services come first)
+PID_START = 300
+# executable locations, executables are "app<nr>", every 10th of them is started by interpreter
+EXE_PATH = "/usr/lib/fakeapps/app%i/bin/app%i"
+INTERPRETER_PATH = "/usr/bin/python3"
+SCRIPT_PATH = "/usr/share/fakeapps/app%i/app%i.py"
+
+
+def getExeName(pExeNr):
+    """Get executable name, which is also what filters match"""
+    # result
+    return "app%i" % (pExeNr)
+
+
+class fakeProcTree(object):
+    """Synthetic process tree"""
+
+    def __init__(self, pRoot, pUids, pExeCnt, pSeed=0):
+        """Initialize (tree is empty)"""
+        # location
+        self._root = pRoot
+        # users and executables to choose from
+        self._uids = pUids
+        self._exeCnt = pExeCnt
+        # reproducible
+        self._random = random.Random(pSeed)
+        # owners can be set only by root
+        self._isOwnerSet = os.geteuid() == 0
+        # processes: pid -> (uid, exe nr, parent pid)
+        self._processes = {}
+        # next pid
+        self._nextPid = PID_START
+        # create
+        os.makedirs(self._root, exist_ok=True)
+
+    def addProcess(self, pUid=None, pExeNr=None, pParentPid=None):
+        """Add process (random user, executable and parent when not given), returns pid"""
+        # pid
+        pid = self._nextPid
+        self._nextPid += 1
+        # user
+        uid = self._random.choice(self._uids) if pUid is None else pUid
+        # executable
+        exeNr = self._random.randrange(self._exeCnt) if pExeNr is None else pExeNr
+        # parent (random earlier process, if it's gone, process is adopted by init)
+        if pParentPid is None:
+            parentPid = self._random.randrange(PID_START, pid) if pid > PID_START else 1
+            parentPid = parentPid if parentPid in self._processes else 1
+        else:
+            parentPid = pParentPid
+        # interpreted
+        if exeNr % 10 == 9:
+            # interpreter runs script
+            exe = INTERPRETER_PATH
+            cmdLine = [INTERPRETER_PATH, SCRIPT_PATH % (exeNr, exeNr), "--fake"]
+        else:
+            # binary
+            exe = EXE_PATH % (exeNr, exeNr)
+            cmdLine = [exe, "--fake", "--nr=%i" % (pid)]
+        # process dir
+        procDir = os.path.join(self._root, str(pid))
+        os.mkdir(procDir)
+        # exe (link target does not have to exist)
+        os.symlink(exe, os.path.join(procDir, "exe"))
+        # owner
+        if self._isOwnerSet:
+            os.lchown(os.path.join(procDir, "exe"), uid, uid)
+        # cmdline
+        with open(os.path.join(procDir, "cmdline"), "w") as cmdFd:
+            cmdFd.write("\x00".join(cmdLine) + "\x00")
+        # process
+        self._processes[pid] = (uid, exeNr, parentPid)
+        # stat
+        self.setCpuTime(pid, 2)
+        # status
+        with open(os.path.join(procDir, "status"), "w") as statusFd:
+            statusFd.write(
+                "Name:\t%s\nState:\tS (sleeping)\nTgid:\t%i\nPid:\t%i\nPPid:\t%i\nUid:\t%i\t%i\t%i\t%i\n"
+                % (os.path.basename(exe)[:15], pid, pid, parentPid, uid, uid, uid, uid)
+            )
+        # result
+        return pid
+
+    def setCpuTime(self, pPid, pCpuTime):
+        """Set CPU time used by process (split evenly between user and system time)"""
+        # process
+        _uid, exeNr, parentPid = self._processes[pPid]
+        # command
+        comm = os.path.basename(INTERPRETER_PATH if exeNr % 10 == 9 else EXE_PATH % (exeNr, exeNr))[:15]
+        # stat (utime and stime are 14th and 15th fields)
+        with open(os.path.join(self._root, str(pPid), "stat"), "w") as statFd:
+            statFd.write(
+                "%i (%s) S %i %i %i 0 -1 4194304 100 0 0 0 %i %i 0 0 20 0 1 0 100 1000000 100\n"
+                % (pPid, comm, parentPid, pPid, pPid, pCpuTime // 2, pCpuTime - pCpuTime // 2)
+            )
+
+    def removeProcess(self, pPid):
+        """Remove process"""
+        # remove
+        shutil.rmtree(os.path.join(self._root, str(pPid)))
+        self._processes.pop(pPid)
+
+    def populate(self, pCnt):
+        """Add random processes"""
+        # add
+        for _rNr in range(pCnt):
+            self.addProcess()
+
+    def churn(self, pRate):
+        """Replace share of random processes with new ones, returns how many processes were replaced"""
+        # how many
+        cnt = int(len(self._processes) * pRate)
+        # remove
+        for rPid in self._random.sample(list(self._processes), cnt):
+            self.removeProcess(rPid)
+        # add
+        self.populate(cnt)
+        # result
+        return cnt
+
+    def getRoot(self):
+        """Get location of the tree"""
+        # result
+        return self._root
+
+    def getProcesses(self):
+        """Get processes (pid -> (uid, exe nr, parent pid))"""
+        # result
+        return self._processes
+
+    def getOwner(self, pUid):
+        """Get owner, which PlayTime sees for process of user"""
+        # result
+        return pUid if self._isOwnerSet else os.geteuid()
+
+    def removeTree(self):
+        """Remove whole tree"""
+        # remove
+        shutil.rmtree(self._root, ignore_errors=True)
+        self._processes.clear()
+
+
+def main():
+    # args
+    parser = argparse.ArgumentParser(description="synthetic process information file system for PlayTime")
+    parser.add_argument("--root", required=True, help="where to create the tree")
+    parser.add_argument("--pids", type=int, default=1000, help="number of processes")
+    parser.add_argument("--users", type=int, default=10, help="number of users")
+    parser.add_argument("--exes", type=int, default=1000, help="number of distinct executables")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    # create
+    tree = fakeProcTree(args.root, [UID_START + rNr for rNr in range(args.users)], args.exes, args.seed)
+    tree.populate(args.pids)
+    print("created %i processes in %s" % (len(tree.getProcesses()), args.root))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from timekpr.common.utils.misc import splitConfigValueLimit
 from timekpr.common.utils.misc import splitConfigValueNameParam
 
 
@@ -5,3 +6,11 @@ def test_splitConfigValueNameParam():
     assert ("!22", "00-15") == splitConfigValueNameParam("!22[00-15]")
     assert ("3600", "3") == splitConfigValueNameParam("3600[3]")
     assert ("3600", "3") == splitConfigValueNameParam('3600("3")')
+
+
+def test_splitConfigValueLimit():
+    assert ("steam[Steam]", "3600") == splitConfigValueLimit("steam[Steam]{3600}")
+    assert ("steam[]", "") == splitConfigValueLimit("steam[]{}")
+    assert ("steam[Steam]", None) == splitConfigValueLimit("steam[Steam]")
+    assert ("app{2}", None) == splitConfigValueLimit("app{2}")
+    assert ("app[x]{y}", None) == splitConfigValueLimit("app[x]{y}")
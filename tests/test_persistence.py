@@ -0,0 +1,32 @@
+from timekpr.server.user import persistence
+from timekpr.server.user.persistence import timekprPersistenceScheduler
+
+
+class _config(object):
+    def getTimekprSaveTime(self):
+        return 30
+
+    def getTimekprPollTime(self):
+        return 3
+
+
+class _user(object):
+    def __init__(self):
+        self.saved = 0
+
+    def isDayChanged(self):
+        return False
+
+    def saveSpent(self):
+        self.saved += 1
+
+
+def test_sparse_ticks_save_everyone(monkeypatch):
+    timeNow = [1000.0]
+    monkeypatch.setattr(persistence.time, "monotonic", lambda: timeNow[0])
+    users = {"user%i" % (rNr): _user() for rNr in range(10)}
+    scheduler = timekprPersistenceScheduler(_config())
+    for _rTick in range(5):
+        scheduler.processUsers(users)
+        timeNow[0] += 60
+    assert all(rUser.saved >= 4 for rUser in users.values())
@@ -0,0 +1,125 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark"))
+
+from fakeproc import fakeProcTree, getExeName, UID_START  # noqa: E402
+from timekpr.server.user.playtime import timekprPlayTimeConfig  # noqa: E402
+
+
+class _config(object):
+    def __init__(self, pCpuActivity=False):
+        self._cpuActivity = pCpuActivity
+
+    def getTimekprPlayTimeEnhancedActivityMonitorEnabled(self):
+        return True
+
+    def getTimekprPlayTimeProcConnectorEnabled(self):
+        return False
+
+    def getTimekprPlayTimeCgroupScanEnabled(self):
+        return False
+
+    def getTimekprPlayTimeCpuActivityEnabled(self):
+        return self._cpuActivity
+
+
+def _getTree(pRoot, pCpuActivity=False):
+    tree = fakeProcTree(str(pRoot), [UID_START], 10)
+    uid = str(tree.getOwner(UID_START))
+    playTimeConfig = timekprPlayTimeConfig(_config(pCpuActivity), pProcRoot=str(pRoot))
+    return tree, uid, playTimeConfig
+
+
+def test_matched_processes(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path)
+    game = tree.addProcess(pUid=UID_START, pExeNr=1)
+    script = tree.addProcess(pUid=UID_START, pExeNr=9)
+    tree.addProcess(pUid=UID_START, pExeNr=2)
+    playTimeConfig.processPlayTimeFilters(uid, [[getExeName(1), ""], ["%s\\.py" % (getExeName(9)), ""]])
+    playTimeConfig._cachePlayTimeProcesses()
+    assert sorted(rProc[0] for rProc in playTimeConfig.getMatchedUserProcesses(uid)) == sorted([str(game), str(script)])
+    assert playTimeConfig.verifyPlayTimeActive(uid, "bench")
+
+
+def test_churn_removes_processes(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path)
+    game = tree.addProcess(pUid=UID_START, pExeNr=1)
+    playTimeConfig.processPlayTimeFilters(uid, [[getExeName(1), ""]])
+    playTimeConfig._cachePlayTimeProcesses()
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 1
+    tree.removeProcess(game)
+    tree.addProcess(pUid=UID_START, pExeNr=2)
+    playTimeConfig._cachePlayTimeProcesses()
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 0
+    assert len(playTimeConfig.getCachedUserProcesses(uid)) == 1
+
+
+def test_descendants_filter(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path)
+    launcher = tree.addProcess(pUid=UID_START, pExeNr=1, pParentPid=1)
+    child = tree.addProcess(pUid=UID_START, pExeNr=2, pParentPid=launcher)
+    tree.addProcess(pUid=UID_START, pExeNr=3, pParentPid=1)
+    playTimeConfig.processPlayTimeFilters(uid, [["+%s" % (getExeName(1)), ""]])
+    playTimeConfig._cachePlayTimeProcesses()
+    assert sorted(rProc[0] for rProc in playTimeConfig.getMatchedUserProcesses(uid)) == sorted(
+        [str(launcher), str(child)]
+    )
+
+
+def test_descendants_after_reset(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path)
+    launcher = tree.addProcess(pUid=UID_START, pExeNr=1, pParentPid=1)
+    tree.addProcess(pUid=UID_START, pExeNr=2, pParentPid=launcher)
+    playTimeConfig.processPlayTimeFilters(uid, [["+%s" % (getExeName(1)), ""]])
+    playTimeConfig._cachePlayTimeProcesses()
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 2
+    playTimeConfig.resetPlayTimeProcessCache()
+    playTimeConfig._cachePlayTimeProcesses()
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 2
+
+
+def test_skipped_users_are_not_inspected(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path)
+    playTimeConfig.processPlayTimeFilters(uid, [[getExeName(1), ""]])
+    playTimeConfig._cachePlayTimeProcesses()
+    tree.addProcess(pUid=UID_START, pExeNr=1)
+    playTimeConfig._cachePlayTimeProcesses(pSkippedUids={uid})
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 0
+    playTimeConfig._cachePlayTimeProcesses()
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 1
+
+
+def test_cpu_activity(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path, pCpuActivity=True)
+    game = tree.addProcess(pUid=UID_START, pExeNr=1)
+    launcher = tree.addProcess(pUid=UID_START, pExeNr=2)
+    playTimeConfig.processPlayTimeFilters(uid, [[getExeName(1), ""], [getExeName(2), ""]])
+    playTimeConfig.processPlayTimeActivities()
+    assert playTimeConfig.getActiveUserProcessCnt(uid) == 2
+    tree.setCpuTime(game, 100)
+    playTimeConfig.processPlayTimeActivities()
+    assert playTimeConfig.getActiveUserProcessCnt(uid) == 1
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 2
+    assert playTimeConfig.verifyPlayTimeActive(uid, "bench")
+    playTimeConfig.processPlayTimeActivities()
+    assert not playTimeConfig.verifyPlayTimeActive(uid, "bench")
+    assert launcher in tree.getProcesses()
+
+
+def test_limited_activities(tmp_path):
+    tree, uid, playTimeConfig = _getTree(tmp_path)
+    launcher = tree.addProcess(pUid=UID_START, pExeNr=1, pParentPid=1)
+    child = tree.addProcess(pUid=UID_START, pExeNr=2, pParentPid=launcher)
+    other = tree.addProcess(pUid=UID_START, pExeNr=3, pParentPid=1)
+    limitedFlt = "+%s" % (getExeName(1))
+    playTimeConfig.processPlayTimeFilters(uid, [[limitedFlt, ""], [getExeName(3), ""]], [limitedFlt])
+    playTimeConfig.processPlayTimeActivities()
+    assert playTimeConfig.getActiveUserLimitedActivities(uid) == [limitedFlt]
+    assert playTimeConfig._cachedPids[playTimeConfig._USRS][uid][playTimeConfig._LPIDS][limitedFlt] == {launcher, child}
+    tree.removeProcess(launcher)
+    tree.removeProcess(child)
+    playTimeConfig.processPlayTimeActivities()
+    assert playTimeConfig.getActiveUserLimitedActivities(uid) == []
+    assert playTimeConfig.getMatchedUserProcessCnt(uid) == 1
+    assert other in tree.getProcesses()
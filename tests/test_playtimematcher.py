@@ -0,0 +1,18 @@
+from timekpr.server.user.playtimematcher import timekprPlayTimeMatcher
+
+
+def test_joined_filters():
+    matcher = timekprPlayTimeMatcher(["app1", "app2(-bin)?", "/opt/games/app3"])
+    assert matcher.isMatched("/usr/bin/app1 --fake", None)
+    assert matcher.isMatched("/usr/bin/app2-bin", None)
+    assert matcher.isMatched("/opt/games/app3", None)
+    assert not matcher.isMatched("/usr/bin/app4", None)
+
+
+def test_backreference_filters():
+    matcher = timekprPlayTimeMatcher(["app(1|2)", "(a)\\1pp", "(?P<n>x)(?P=n)game"])
+    assert matcher.isMatched("aapp", None)
+    assert matcher.isMatched("/usr/bin/aapp --fake", None)
+    assert matcher.isMatched("/usr/bin/xxgame", None)
+    assert matcher.isMatched("/usr/bin/app2", None)
+    assert not matcher.isMatched("/usr/bin/abpp", None)
@@ -0,0 +1,60 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from timekpr.common.constants import constants as cons
+from timekpr.server.user.terminator import timekprProcessTerminator
+
+# process which reports terminate signal, but does not exit
+_STUBBORN = (
+    "import signal, sys, time\n"
+    "signal.signal(signal.SIGTERM, lambda *a: print('TERM', flush=True))\n"
+    "print('READY', flush=True)\n"
+    "time.sleep(60)\n"
+)
+
+
+def _startProcess():
+    process = subprocess.Popen([sys.executable, "-c", _STUBBORN], stdout=subprocess.PIPE, text=True)
+    assert process.stdout.readline().strip() == "READY"
+    return process, os.readlink("/proc/%i/exe" % (process.pid))
+
+
+def test_terminate_then_kill(monkeypatch):
+    monkeypatch.setattr(cons, "TK_PLAYTIME_KILL_TIMEOUT", 0.5)
+    process, exe = _startProcess()
+    try:
+        terminator = timekprProcessTerminator()
+        terminator.terminateProcesses({process.pid: exe})
+        assert process.stdout.readline().strip() == "TERM"
+        assert process.poll() is None
+        time.sleep(0.6)
+        terminator.processTerminations()
+        assert process.wait(5) == -signal.SIGKILL
+        terminator.processTerminations()
+        assert not terminator._processes
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
+def test_reused_pid_is_not_signalled(tmp_path):
+    process, _exe = _startProcess()
+    try:
+        os.mkdir(tmp_path / str(process.pid))
+        os.symlink("/usr/bin/another", tmp_path / str(process.pid) / "exe")
+        terminator = timekprProcessTerminator(str(tmp_path))
+        terminator.terminateProcesses({process.pid: "/usr/lib/fakeapps/app1/bin/app1"})
+        assert not terminator._processes
+        time.sleep(0.2)
+        assert process.poll() is None
+        os.unlink(tmp_path / str(process.pid) / "exe")
+        os.symlink("/usr/lib/fakeapps/app1/bin/app1", tmp_path / str(process.pid) / "exe")
+        terminator.terminateProcesses({process.pid: "/usr/lib/fakeapps/app1/bin/app1"})
+        assert process.stdout.readline().strip() == "TERM"
+    finally:
+        process.kill()
+        process.wait()
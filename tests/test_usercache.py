@@ -0,0 +1,38 @@
+import os
+import pwd
+
+from timekpr.common.constants import constants as cons
+from timekpr.common.utils import usercache
+
+
+def test_user_lookups():
+    user = pwd.getpwuid(os.getuid())
+    assert usercache.getUserById(os.getuid()) == user
+    assert user in usercache.getAllUsers()
+    assert usercache.getUserById(2**31 - 2) is None
+
+
+def test_user_limits(tmp_path, monkeypatch):
+    limits = tmp_path / "login.defs"
+    limits.write_text("UID_MIN 5000\nUID_MAX 6000\n")
+    monkeypatch.setattr(cons, "TK_USER_LIMITS_FILE", [str(limits)])
+    usercache.invalidateUserCache()
+    assert usercache.getUserLimits() == {"UID_MIN": 5000, "UID_MAX": 6000}
+    limits.write_text("UID_MIN 7000\n")
+    assert usercache.getUserLimits()["UID_MIN"] == 5000
+    usercache.invalidateUserCache()
+    assert usercache.getUserLimits() == {"UID_MIN": 7000, "UID_MAX": 60000}
+    usercache.invalidateUserCache()
+
+
+def test_file_watch(tmp_path):
+    users = tmp_path / "passwd"
+    users.write_text("a\n")
+    watch = usercache._timekprFileWatch([str(users), str(tmp_path / "missing" / "login.defs")])
+    assert not watch.isChanged()
+    (tmp_path / "other").write_text("b\n")
+    assert not watch.isChanged()
+    (tmp_path / "passwd+").write_text("b\n")
+    os.rename(str(tmp_path / "passwd+"), str(users))
+    assert watch.isChanged()
+    assert not watch.isChanged()
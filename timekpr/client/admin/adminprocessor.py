@@ -21,6 +21,7 @@ from timekpr.common.utils.misc import findHourStartEndMinutes as findHourStartEn
 from timekpr.common.utils.misc import (
     splitConfigValueNameParam as splitConfigValueNameParam,
 )
+from timekpr.common.utils.misc import splitConfigValueLimit as splitConfigValueLimit
 
 
 class timekprAdminClient(object):
@@ -435,7 +436,13 @@ class timekprAdminClient(object):
                 # loop thorhough activities
                 for rActArr in rUserConfig:
                     # activity
-                    act = "%s[%s]" % (rActArr[0], rActArr[1]) if rActArr[1] != "" else "%s" % (rActArr[0])
+                    act = (
+                        "%s[%s]" % (rActArr[0], rActArr[1])
+                        if rActArr[1] != "" or len(rActArr) > 2
+                        else "%s" % (rActArr[0])
+                    )
+                    # activity limit
+                    act = "%s{%s}" % (act, rActArr[2]) if len(rActArr) > 2 else act
                     # gather activities
                     result = "%s" % (act) if result == "" else "%s;%s" % (result, act)
                 log.consoleOut("%s: %s" % (rUserKey, result))
@@ -839,14 +846,16 @@ class timekprAdminClient(object):
             if pPlayTimeActivities != "":
                 # split activities
                 for rAct in pPlayTimeActivities.split(";"):
+                    # activity limit (if any)
+                    act, limit = splitConfigValueLimit(rAct)
                     # try parsing the names
-                    mask, description = splitConfigValueNameParam(rAct)
+                    mask, description = splitConfigValueNameParam(act)
                     # raise any error in case we can not get parsing right
                     if mask is None:
                         # raise
                         raise ValueError("this does not compute")
                     # set up activity list
-                    playTimeActivities.append([mask, description])
+                    playTimeActivities.append([mask, description] if limit is None else [mask, description, limit])
         except Exception as ex:
             # fail
             result = -1
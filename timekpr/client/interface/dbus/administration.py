@@ -644,6 +644,31 @@ class timekprAdminConnector(object):
         # result
         return result, message, timekprConfig
 
+    def getTimekprPerfStats(self):
+        """Get performance stats from server"""
+        # defaults
+        result, message = self.initReturnCodes(pInit=True, pCall=False)
+        perfStats = {}
+
+        # if we have end-point
+        if self._timekprAdminDbusInterface is not None:
+            # defaults
+            result, message = self.initReturnCodes(pInit=False, pCall=True)
+
+            # notify through dbus
+            try:
+                # call dbus method
+                result, message, perfStats = self._timekprAdminDbusInterface.getTimekprPerfStats()
+            except Exception as ex:
+                # exception
+                result, message = self.formatException(str(ex), __name__, self.getTimekprPerfStats.__name__)
+
+                # we cannot send notif through dbus, we need to reschedule connecton
+                self.initTimekprConnection(False, True)
+
+        # result
+        return result, message, perfStats
+
     def setTimekprLogLevel(self, pLogLevel):
         """Set the logging level for server"""
         # initial values
@@ -101,6 +101,42 @@ TK_LOCALIZATION_DIR_DEV = "../../resource/locale"
 TK_MAX_RETRIES = 5
 # max symbols to search for pattern in cmdline for PlayTime
 TK_MAX_CMD_SRCH = 512
+# interval (in seconds) for full process rescan when PlayTime processes are tracked by kernel process events
+TK_PLAYTIME_PROC_CONNECTOR_RESCAN_INTERVAL = 300
+# receive buffer size for kernel process events (bytes)
+TK_PLAYTIME_PROC_CONNECTOR_RCVBUF = 4194304
+# time (in seconds) for PlayTime process to exit after terminate signal, after that it's killed
+TK_PLAYTIME_KILL_TIMEOUT = 10
+# how many PlayTime match results (per user filters, executable and cmdline) are remembered
+TK_PLAYTIME_MATCH_CACHE_SIZE = 4096
+# niceness for PlayTime scanner process (io priority follows niceness, unless it's set explicitly)
+TK_PLAYTIME_SCANNER_NICE = 19
+# time (in seconds) to wait for PlayTime scanner process to exit
+TK_PLAYTIME_SCANNER_STOP_TIMEOUT = 5
+# CPU time (in clock ticks, usually 1/100 sec) matched PlayTime process has to use since last check to be active
+TK_PLAYTIME_CPU_ACTIVITY_TICKS = 1
+# interval (in seconds) for full login1 user list resync when users are tracked by signals
+TK_LOGIN1_RESYNC_INTERVAL = 300
+# interval (in seconds) for full login1 session properties resync when properties are tracked by signals
+TK_LOGIN1_SESSION_RESYNC_INTERVAL = 30
+# interval (in seconds) for exporting performance stats
+TK_PERF_STATS_EXPORT_INTERVAL = 60
+# file name for exported performance stats (Prometheus textfile format, in work directory)
+TK_PERF_STATS_EXPORT_FILE = "timekpr-perf.prom"
+# time (in seconds) cached user (passwd) entries are used before they are looked up again
+TK_USER_CACHE_TTL = 300
+# interval (in seconds) for checking whether users and login configuration files have changed
+TK_USER_CACHE_CHECK_INTERVAL = 1
+
+# ## performance stats phases ##
+TK_PERF_TICK = "tick"
+TK_PERF_GETUSERLIST = "getUserList"
+TK_PERF_PROCESSPT = "processPlayTimeActivities"
+TK_PERF_ADJSPENT = "adjustTimeSpentActual"
+TK_PERF_RECALCLEFT = "recalculateTimeLeft"
+TK_PERF_GETLEFT = "getTimeLeft"
+TK_PERF_SAVESPENT = "saveSpent"
+TK_PERF_RESTRICT = "restrictUsers"
 
 # ## dbus ##
 # common
@@ -174,6 +210,7 @@ TK_CTRL_DBUS_SESS_OBJ = "SESSION_OBJECT"
 TK_CTRL_DBUS_SESS_IF = "SESSION_INTERFACE"
 TK_CTRL_DBUS_SESS_PROP_IF = "SESSION_PROPERTIES_INTERFACE"
 TK_CTRL_DBUS_SESS_PROP = "SESSION_STATIC_PROPERTIES"
+TK_CTRL_DBUS_SESS_SIG = "SESSION_SIGNAL_MATCH"
 
 # limit configuration
 TK_CTRL_NDAY = "NEXTDAY"  # next day idx
@@ -184,6 +221,9 @@ TK_CTRL_LEFT = "LEFT"  # time left idx (continously)
 TK_CTRL_LEFTW = "LEFTW"  # time left for week
 TK_CTRL_LEFTM = "LEFTM"  # time left for month
 TK_CTRL_LCHECK = "LCHK"  # last checked idx
+TK_CTRL_LCHECKM = "LCHKM"  # last checked idx (monotonic clock)
+TK_CTRL_LCHECKB = "LCHKB"  # last checked idx (boottime clock)
+TK_CTRL_LCHECKR = "LCHKR"  # accounted time remainder idx (fractions of a second)
 TK_CTRL_LSAVE = "LSAVE"  # last saved idx
 TK_CTRL_LMOD = "LMOD"  # file modification idx (control)
 TK_CTRL_LCMOD = "LMCOD"  # file modification idx (config)
@@ -213,6 +253,7 @@ TK_CTRL_PTAUH = "PTAUH"  # PlayTime allowed during unaccounted intervals
 TK_CTRL_PTLMT = "PTLMT"  # time limits for each day for PlayTime
 TK_CTRL_PTLST = "PTLST"  # process list for PlayTime
 TK_CTRL_PTLSTC = "PTLSTC"  # process list count for PlayTime
+TK_CTRL_PTASP = "PTASP"  # time spent today for PlayTime activities, which have their own limits
 
 # notificaton limits
 TK_NOTIF_LEFT = "LEFT"
@@ -266,6 +307,14 @@ TK_PT_NOTIFICATION_LEVELS = "180[1]"
 # ## user PlayTime defaults ##
 # enabled
 TK_PLAYTIME_ENABLED = False
+# whether PlayTime processes are tracked by kernel process events (proc connector)
+TK_PLAYTIME_PROC_CONNECTOR_ENABLED = False
+# whether PlayTime processes are listed from users cgroups (instead of all processes)
+TK_PLAYTIME_CGROUP_SCAN_ENABLED = False
+# whether PlayTime processes are inspected in separate scanner process
+TK_PLAYTIME_SCANNER_PROCESS_ENABLED = False
+# whether PlayTime activity is counted only when matched processes use CPU
+TK_PLAYTIME_CPU_ACTIVITY_ENABLED = False
 # default value for allowed week days
 TK_PLAYTIME_ALLOWED_WEEKDAYS = "1;2;3;4;5;6;7"
 # how much PlayTime is allowed per allowed days
@@ -275,6 +324,8 @@ TK_PLAYTIME_LIMITS_PER_WEEKDAYS = "0;0;0;0;0;0;0"
 # time control
 # in-memory poll time
 TK_POLLTIME = 3
+# max adaptive poll time (0 - disabled, polling is done every TK_POLLTIME)
+TK_ADAPTIVE_POLLTIME_MAX = 0
 # flush interval
 TK_SAVE_INTERVAL = 30
 # time left for putting user on kill list
@@ -283,6 +334,12 @@ TK_TERMINATION_TIME = 15
 TK_FINAL_COUNTDOWN_TIME = 10
 # time left for final warning time
 TK_FINAL_NOTIFICATION_TIME = 60
+# threads for processing users in parallel (0 - process users one by one)
+TK_WORKER_THREADS = 0
+# whether to export performance stats to a file periodically
+TK_PERF_STATS_EXPORT_ENABLED = False
+# whether users are processed on the main loop (instead of a separate worker thread)
+TK_MAIN_LOOP_WORKER_ENABLED = False
 # default value for tracking inactive sessions
 TK_TRACK_INACTIVE = False
 # default value for tracking inactive sessions
@@ -18,11 +18,14 @@ from timekpr.common.utils.misc import findHourStartEndMinutes as findHourStartEn
 from timekpr.common.utils.misc import (
     splitConfigValueNameParam as splitConfigValueNameParam,
 )
+from timekpr.common.utils.misc import splitConfigValueLimit as splitConfigValueLimit
 
 # ## GLOBAL ##
 # key pattern search
 RE_KEYFINDER = re.compile("^ *([A-Z]+[A-Z_]+[0-9]*) *=.*$")
 RE_ARRAYKEYFINDER = re.compile("^##([A-Z]+[A-Z_]+)##.*$")
+# time spent for PlayTime activities (seconds and process mask in brackets)
+RE_ACTIVITYSPENTFINDER = re.compile(r"([0-9]+)\[([^\]]*)\]")
 
 
 def _saveConfigFile(pConfigFile, pKeyValuePairs):
@@ -219,6 +222,16 @@ class timekprConfig(object):
             pOverallSuccess=resultValue,
         )
         # read
+        param = "TIMEKPR_ADAPTIVE_POLLTIME_MAX"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getint,
+            section,
+            param,
+            pDefaultValue=cons.TK_ADAPTIVE_POLLTIME_MAX,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
+        # read
         param = "TIMEKPR_SAVE_TIME"
         resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
             self._timekprConfigParser.getint,
@@ -268,6 +281,36 @@ class timekprConfig(object):
             pCheckValue=None,
             pOverallSuccess=resultValue,
         )
+        # read
+        param = "TIMEKPR_WORKER_THREADS"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getint,
+            section,
+            param,
+            pDefaultValue=cons.TK_WORKER_THREADS,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
+        # read
+        param = "TIMEKPR_PERF_STATS_EXPORT_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getboolean,
+            section,
+            param,
+            pDefaultValue=cons.TK_PERF_STATS_EXPORT_ENABLED,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
+        # read
+        param = "TIMEKPR_MAIN_LOOP_WORKER_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getboolean,
+            section,
+            param,
+            pDefaultValue=cons.TK_MAIN_LOOP_WORKER_ENABLED,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
 
         # session section
         section = "SESSION"
@@ -374,6 +417,46 @@ class timekprConfig(object):
             pCheckValue=None,
             pOverallSuccess=resultValue,
         )
+        # read
+        param = "TIMEKPR_PLAYTIME_PROC_CONNECTOR_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getboolean,
+            section,
+            param,
+            pDefaultValue=cons.TK_PLAYTIME_PROC_CONNECTOR_ENABLED,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
+        # read
+        param = "TIMEKPR_PLAYTIME_CGROUP_SCAN_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getboolean,
+            section,
+            param,
+            pDefaultValue=cons.TK_PLAYTIME_CGROUP_SCAN_ENABLED,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
+        # read
+        param = "TIMEKPR_PLAYTIME_SCANNER_PROCESS_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getboolean,
+            section,
+            param,
+            pDefaultValue=cons.TK_PLAYTIME_SCANNER_PROCESS_ENABLED,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
+        # read
+        param = "TIMEKPR_PLAYTIME_CPU_ACTIVITY_ENABLED"
+        resultValue, self._timekprConfig[param] = _readAndNormalizeValue(
+            self._timekprConfigParser.getboolean,
+            section,
+            param,
+            pDefaultValue=cons.TK_PLAYTIME_CPU_ACTIVITY_ENABLED,
+            pCheckValue=None,
+            pOverallSuccess=resultValue,
+        )
 
         # global remote config section
         section = "REMOTE"
@@ -464,6 +547,21 @@ class timekprConfig(object):
             str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_POLLTIME),
         )
         # set up param
+        param = "TIMEKPR_ADAPTIVE_POLLTIME_MAX"
+        self._timekprConfigParser.set(
+            section,
+            "# this defines maximum polling time in seconds when no user is close to any limit, notification or restriction,",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   polling is adaptive only if this is larger than polling time (0 - adaptive polling is disabled)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_ADAPTIVE_POLLTIME_MAX)),
+        )
+        # set up param
         param = "TIMEKPR_SAVE_TIME"
         self._timekprConfigParser.set(
             section,
@@ -527,6 +625,47 @@ class timekprConfig(object):
             "%s" % (param),
             (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_FINAL_NOTIFICATION_TIME)),
         )
+        # set up param
+        param = "TIMEKPR_WORKER_THREADS"
+        self._timekprConfigParser.set(
+            section,
+            "# this defines how many threads are used to process logged in users in parallel (0 or 1 - users are processed one by one)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_WORKER_THREADS)),
+        )
+        # set up param
+        param = "TIMEKPR_PERF_STATS_EXPORT_ENABLED"
+        self._timekprConfigParser.set(
+            section,
+            "# this defines whether timekpr periodically exports performance stats (execution times of its processing phases)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   to Prometheus textfile timekpr-perf.prom in work directory",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PERF_STATS_EXPORT_ENABLED)),
+        )
+        # set up param
+        param = "TIMEKPR_MAIN_LOOP_WORKER_ENABLED"
+        self._timekprConfigParser.set(
+            section,
+            "# this defines whether users are processed on the main loop instead of a separate worker thread,",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   this way time accounting and administrative requests never run at the same time (restart is needed to apply)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_MAIN_LOOP_WORKER_ENABLED)),
+        )
 
         section = "SESSION"
         self._timekprConfigParser.add_section(section)
@@ -614,6 +753,66 @@ class timekprConfig(object):
             "%s" % (param),
             (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_ENABLED)),
         )
+        # set up param
+        param = "TIMEKPR_PLAYTIME_PROC_CONNECTOR_ENABLED"
+        self._timekprConfigParser.set(
+            section,
+            "# whether PlayTime activity monitor will track processes by kernel process events (fork / exec / exit) instead of",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   listing all processes every time, full process list is then inspected only occasionally (restart is needed to apply)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_PROC_CONNECTOR_ENABLED)),
+        )
+        # set up param
+        param = "TIMEKPR_PLAYTIME_CGROUP_SCAN_ENABLED"
+        self._timekprConfigParser.set(
+            section,
+            "# whether PlayTime activity monitor will inspect only processes in the user.slice cgroups of users with PlayTime activities",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   instead of all processes in the system (works on systemd systems only, otherwise all processes are inspected)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_CGROUP_SCAN_ENABLED)),
+        )
+        # set up param
+        param = "TIMEKPR_PLAYTIME_SCANNER_PROCESS_ENABLED"
+        self._timekprConfigParser.set(
+            section,
+            "# whether PlayTime activity monitor will inspect processes in separate scanner process with low CPU and IO priority,",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   accounting then uses the latest results of the scanner and is not delayed by inspection (restart is needed to apply)",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_SCANNER_PROCESS_ENABLED)),
+        )
+        # set up param
+        param = "TIMEKPR_PLAYTIME_CPU_ACTIVITY_ENABLED"
+        self._timekprConfigParser.set(
+            section,
+            "# whether PlayTime activity is counted only when its matched processes used CPU since the last check,",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "#   i.e. idle processes (e.g. launcher minimized to tray) are not counted as PlayTime, but they are still terminated",
+        )
+        self._timekprConfigParser.set(
+            section,
+            "%s" % (param),
+            (str(self._timekprConfig[param]) if pReuseValues else str(cons.TK_PLAYTIME_CPU_ACTIVITY_ENABLED)),
+        )
 
         # save the file
         with open(self._configFile, "w") as fp:
@@ -636,6 +835,9 @@ class timekprConfig(object):
         # in-memory polling time
         param = "TIMEKPR_POLLTIME"
         values[param] = str(self._timekprConfig[param])
+        # maximum adaptive polling time
+        param = "TIMEKPR_ADAPTIVE_POLLTIME_MAX"
+        values[param] = str(self._timekprConfig[param])
         # time interval to save user spent time
         param = "TIMEKPR_SAVE_TIME"
         values[param] = str(self._timekprConfig[param])
@@ -651,6 +853,15 @@ class timekprConfig(object):
         # final notification time (final warning before terminating session)
         param = "TIMEKPR_FINAL_NOTIFICATION_TIME"
         values[param] = str(self._timekprConfig[param])
+        # worker threads for processing users in parallel
+        param = "TIMEKPR_WORKER_THREADS"
+        values[param] = str(self._timekprConfig[param])
+        # performance stats export
+        param = "TIMEKPR_PERF_STATS_EXPORT_ENABLED"
+        values[param] = str(self._timekprConfig[param])
+        # process users on the main loop
+        param = "TIMEKPR_MAIN_LOOP_WORKER_ENABLED"
+        values[param] = str(self._timekprConfig[param])
         # which session types to control
         param = "TIMEKPR_SESSION_TYPES_CTRL"
         values[param] = str(self._timekprConfig[param])
@@ -666,6 +877,18 @@ class timekprConfig(object):
         # whether PlayTime enhanced activity monitor is enabled
         param = "TIMEKPR_PLAYTIME_ENHANCED_ACTIVITY_MONITOR_ENABLED"
         values[param] = str(self._timekprConfig[param])
+        # whether PlayTime processes are tracked by kernel process events
+        param = "TIMEKPR_PLAYTIME_PROC_CONNECTOR_ENABLED"
+        values[param] = str(self._timekprConfig[param])
+        # whether PlayTime processes are listed from users cgroups
+        param = "TIMEKPR_PLAYTIME_CGROUP_SCAN_ENABLED"
+        values[param] = str(self._timekprConfig[param])
+        # whether PlayTime processes are inspected in separate scanner process
+        param = "TIMEKPR_PLAYTIME_SCANNER_PROCESS_ENABLED"
+        values[param] = str(self._timekprConfig[param])
+        # whether PlayTime activity is counted only when matched processes use CPU
+        param = "TIMEKPR_PLAYTIME_CPU_ACTIVITY_ENABLED"
+        values[param] = str(self._timekprConfig[param])
         # ## pass placeholders for directories ##
         # config dir
         param = "TIMEKPR_CONFIG_DIR"
@@ -704,6 +927,12 @@ class timekprConfig(object):
                 "  %s=%s" % (param, str(self._timekprConfig[param])),
             )
             # log
+            param = "TIMEKPR_ADAPTIVE_POLLTIME_MAX"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
+            # log
             param = "TIMEKPR_SAVE_TIME"
             log.log(
                 cons.TK_LOG_LEVEL_INFO,
@@ -733,6 +962,24 @@ class timekprConfig(object):
                 cons.TK_LOG_LEVEL_INFO,
                 "  %s=%s" % (param, str(self._timekprConfig[param])),
             )
+            # log
+            param = "TIMEKPR_WORKER_THREADS"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
+            # log
+            param = "TIMEKPR_PERF_STATS_EXPORT_ENABLED"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
+            # log
+            param = "TIMEKPR_MAIN_LOOP_WORKER_ENABLED"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
 
             # log
             param = "TIMEKPR_SESSION_TYPES_CTRL"
@@ -766,6 +1013,30 @@ class timekprConfig(object):
                 cons.TK_LOG_LEVEL_INFO,
                 "  %s=%s" % (param, str(self._timekprConfig[param])),
             )
+            # log
+            param = "TIMEKPR_PLAYTIME_PROC_CONNECTOR_ENABLED"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
+            # log
+            param = "TIMEKPR_PLAYTIME_CGROUP_SCAN_ENABLED"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
+            # log
+            param = "TIMEKPR_PLAYTIME_SCANNER_PROCESS_ENABLED"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
+            # log
+            param = "TIMEKPR_PLAYTIME_CPU_ACTIVITY_ENABLED"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, str(self._timekprConfig[param])),
+            )
         # fail
         except Exception:
             # log
@@ -792,6 +1063,13 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprAdaptivePollTimeMax(self):
+        """Get maximum adaptive polling time"""
+        # param
+        param = "TIMEKPR_ADAPTIVE_POLLTIME_MAX"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprSaveTime(self):
         """Get save time"""
         # param
@@ -799,6 +1077,27 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprWorkerThreads(self):
+        """Get worker thread count for processing users"""
+        # param
+        param = "TIMEKPR_WORKER_THREADS"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPerfStatsExportEnabled(self):
+        """Returns whether performance stats export is enabled"""
+        # param
+        param = "TIMEKPR_PERF_STATS_EXPORT_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprMainLoopWorkerEnabled(self):
+        """Returns whether users are processed on the main loop"""
+        # param
+        param = "TIMEKPR_MAIN_LOOP_WORKER_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprTrackInactive(self):
         """Get tracking inactive"""
         # param
@@ -902,6 +1201,34 @@ class timekprConfig(object):
         # result
         return self._timekprConfig[param]
 
+    def getTimekprPlayTimeProcConnectorEnabled(self):
+        """Returns whether PlayTime processes are tracked by kernel process events"""
+        # param
+        param = "TIMEKPR_PLAYTIME_PROC_CONNECTOR_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeCgroupScanEnabled(self):
+        """Returns whether PlayTime processes are listed from users cgroups"""
+        # param
+        param = "TIMEKPR_PLAYTIME_CGROUP_SCAN_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeScannerProcessEnabled(self):
+        """Get whether PlayTime processes are inspected in separate scanner process"""
+        # param
+        param = "TIMEKPR_PLAYTIME_SCANNER_PROCESS_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
+    def getTimekprPlayTimeCpuActivityEnabled(self):
+        """Get whether PlayTime activity is counted only when matched processes use CPU"""
+        # param
+        param = "TIMEKPR_PLAYTIME_CPU_ACTIVITY_ENABLED"
+        # result
+        return self._timekprConfig[param]
+
     def getTimekprLastModified(self):
         """Get last file modification time"""
         # result
@@ -917,6 +1244,11 @@ class timekprConfig(object):
         # result
         self._timekprConfig["TIMEKPR_POLLTIME"] = pPollingTimeSecs
 
+    def setTimekprAdaptivePollTimeMax(self, pAdaptivePollTimeMaxSecs):
+        """Set maximum adaptive polling time"""
+        # result
+        self._timekprConfig["TIMEKPR_ADAPTIVE_POLLTIME_MAX"] = pAdaptivePollTimeMaxSecs
+
     def setTimekprSaveTime(self, pSaveTimeSecs):
         """Set save time"""
         # result
@@ -942,6 +1274,21 @@ class timekprConfig(object):
         # result
         self._timekprConfig["TIMEKPR_FINAL_NOTIFICATION_TIME"] = pFinalNotificationTimeSecs
 
+    def setTimekprWorkerThreads(self, pWorkerThreads):
+        """Set worker thread count for processing users"""
+        # result
+        self._timekprConfig["TIMEKPR_WORKER_THREADS"] = pWorkerThreads
+
+    def setTimekprPerfStatsExportEnabled(self, pPerfStatsExportEnabled):
+        """Set whether performance stats export is enabled"""
+        # result
+        self._timekprConfig["TIMEKPR_PERF_STATS_EXPORT_ENABLED"] = bool(pPerfStatsExportEnabled)
+
+    def setTimekprMainLoopWorkerEnabled(self, pMainLoopWorkerEnabled):
+        """Set whether users are processed on the main loop"""
+        # result
+        self._timekprConfig["TIMEKPR_MAIN_LOOP_WORKER_ENABLED"] = bool(pMainLoopWorkerEnabled)
+
     def setTimekprSessionsCtrl(self, pSessionsCtrl):
         """Set sessions to control"""
         self._timekprConfig["TIMEKPR_SESSION_TYPES_CTRL"] = ";".join(pSessionsCtrl)
@@ -962,6 +1309,26 @@ class timekprConfig(object):
         """Set PlayTime enable flag"""
         self._timekprConfig["TIMEKPR_PLAYTIME_ENHANCED_ACTIVITY_MONITOR_ENABLED"] = bool(pPlayTimeAdvancedSearchEnabled)
 
+    def setTimekprPlayTimeProcConnectorEnabled(self, pPlayTimeProcConnectorEnabled):
+        """Set whether PlayTime processes are tracked by kernel process events"""
+        # result
+        self._timekprConfig["TIMEKPR_PLAYTIME_PROC_CONNECTOR_ENABLED"] = bool(pPlayTimeProcConnectorEnabled)
+
+    def setTimekprPlayTimeCgroupScanEnabled(self, pPlayTimeCgroupScanEnabled):
+        """Set whether PlayTime processes are listed from users cgroups"""
+        # result
+        self._timekprConfig["TIMEKPR_PLAYTIME_CGROUP_SCAN_ENABLED"] = bool(pPlayTimeCgroupScanEnabled)
+
+    def setTimekprPlayTimeScannerProcessEnabled(self, pPlayTimeScannerProcessEnabled):
+        """Set whether PlayTime processes are inspected in separate scanner process"""
+        # result
+        self._timekprConfig["TIMEKPR_PLAYTIME_SCANNER_PROCESS_ENABLED"] = bool(pPlayTimeScannerProcessEnabled)
+
+    def setTimekprPlayTimeCpuActivityEnabled(self, pPlayTimeCpuActivityEnabled):
+        """Set whether PlayTime activity is counted only when matched processes use CPU"""
+        # result
+        self._timekprConfig["TIMEKPR_PLAYTIME_CPU_ACTIVITY_ENABLED"] = bool(pPlayTimeCpuActivityEnabled)
+
 
 class timekprUserConfig(object):
     """Class will contain and provide config related functionality"""
@@ -1162,6 +1529,7 @@ class timekprUserConfig(object):
             self._timekprUserConfig[param] = _cleanupValue(self._timekprUserConfig[param])
             # read activities
             self._timekprUserConfig["PLAYTIME_ACTIVITIES"] = []
+            self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"] = {}
             appCfgKeys = (
                 [
                     rParam[0]
@@ -1184,12 +1552,19 @@ class timekprUserConfig(object):
                 )
                 # read successful
                 if process is not None:
+                    # activity may have its own limit
+                    process, limit = splitConfigValueLimit(process)
                     # add to the activities list
                     proc, desc = splitConfigValueNameParam(process)
                     # we have valid process
                     if proc is not None:
                         # save process
                         self._timekprUserConfig["PLAYTIME_ACTIVITIES"].append([proc, desc])
+                        # save limit
+                        if limit:
+                            self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"][proc] = min(
+                                int(limit), cons.TK_LIMIT_PER_DAY
+                            )
             # log
             log.log(
                 cons.TK_LOG_LEVEL_DEBUG,
@@ -1222,6 +1597,17 @@ class timekprUserConfig(object):
         # result
         return result
 
+    def _getPlayTimeActivityValue(self, pIdx):
+        """Get PlayTime activity as it's saved in config file (process mask, description and limit)"""
+        # activity
+        act = self._timekprUserConfig["PLAYTIME_ACTIVITIES"][pIdx][0]
+        desc = self._timekprUserConfig["PLAYTIME_ACTIVITIES"][pIdx][1]
+        limit = self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"].get(act)
+        # limit goes after description, so description is always written when there is a limit
+        value = "%s[%s]" % (act, desc if desc is not None else "") if desc is not None or limit is not None else act
+        # result
+        return "%s{%i}" % (value, limit) if limit is not None else value
+
     def initUserConfiguration(self, pReuseValues=False):
         """Write new sections of the file"""
         log.log(
@@ -1423,6 +1809,14 @@ class timekprUserConfig(object):
             section,
             "#   friendly description in [] brackets. Process mask supports regexp, except symbols [], please be careful entering it!",
         )
+        self._timekprUserConfigParser.set(
+            section,
+            "#   If process mask starts with +, all processes started by matching process (e.g. launcher) are monitored as well.",
+        )
+        self._timekprUserConfigParser.set(
+            section,
+            "#   Activity may have its own daily limit in seconds in {} braces after description, e.g. PROCESS_MASK[DESCRIPTION]{3600}.",
+        )
         self._timekprUserConfigParser.set(section, "##PLAYTIME_ACTIVITIES## Do NOT remove or alter this line!")
         # save all activity values (activities are varying list), do this only if values are reused
         for rPTAppIdx in range(
@@ -1431,12 +1825,10 @@ class timekprUserConfig(object):
         ):
             # write all to file
             param = "PLAYTIME_ACTIVITY_%s" % (str(rPTAppIdx + 1).rjust(3, "0"))
-            act = self._timekprUserConfig["PLAYTIME_ACTIVITIES"][rPTAppIdx][0]
-            desc = self._timekprUserConfig["PLAYTIME_ACTIVITIES"][rPTAppIdx][1]
             self._timekprUserConfigParser.set(
                 section,
                 "%s" % (param),
-                "%s[%s]" % (act, desc) if desc is not None else "%s" % (act),
+                self._getPlayTimeActivityValue(rPTAppIdx),
             )
 
         # save the file
@@ -1510,11 +1902,7 @@ class timekprUserConfig(object):
         for rPTAppIdx in range(0, len(self._timekprUserConfig[param])):
             # write all to file
             subparam = "PLAYTIME_ACTIVITY_%s" % (str(rPTAppIdx + 1).rjust(3, "0"))
-            act = self._timekprUserConfig["PLAYTIME_ACTIVITIES"][rPTAppIdx][0]
-            desc = self._timekprUserConfig["PLAYTIME_ACTIVITIES"][rPTAppIdx][1]
-            values[param].append(
-                "%s = %s[%s]" % (subparam, act, desc) if desc is not None else "%s = %s" % (subparam, act)
-            )
+            values[param].append("%s = %s" % (subparam, self._getPlayTimeActivityValue(rPTAppIdx)))
 
         # edit client config file (using alternate method because configparser looses comments in the process)
         _saveConfigFile(self._configFile, values)
@@ -1617,7 +2005,19 @@ class timekprUserConfig(object):
             # log activities
             log.log(cons.TK_LOG_LEVEL_INFO, "  PT activities:")
             for rV in self._timekprUserConfig["PLAYTIME_ACTIVITIES"]:
-                log.log(cons.TK_LOG_LEVEL_INFO, "    %s=%s" % (rV[0], rV[1]))
+                log.log(
+                    cons.TK_LOG_LEVEL_INFO,
+                    "    %s=%s%s"
+                    % (
+                        rV[0],
+                        rV[1],
+                        (
+                            " (limit: %i)" % (self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"][rV[0]])
+                            if rV[0] in self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"]
+                            else ""
+                        ),
+                    ),
+                )
         # fail
         except Exception:
             # log
@@ -1734,6 +2134,13 @@ class timekprUserConfig(object):
         # result
         return self._timekprUserConfig[param]
 
+    def getUserPlayTimeActivityLimits(self):
+        """Return PlayTime limits for activities, which have their own limits (process mask -> limit)"""
+        # param
+        param = "PLAYTIME_ACTIVITY_LIMITS"
+        # result
+        return self._timekprUserConfig[param]
+
     def getUserConfigLastModified(self):
         """Get last file modification time for user"""
         # result
@@ -1839,15 +2246,22 @@ class timekprUserConfig(object):
         self._timekprUserConfig["PLAYTIME_LIMITS_PER_WEEKDAYS"] = ";".join(map(str, pPlayTimeAllowedLimitsPerWeekdays))
 
     def setUserPlayTimeAcitivityList(self, pPlayTimeActivityList):
-        """Set PlayTime process / process list"""
+        """Set PlayTime process / process list (activity may have its own limit as third value, None - no limit)"""
         # def
         self._timekprUserConfig["PLAYTIME_ACTIVITIES"] = []
+        self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"] = {}
         # loop through all
         for i in range(0, len(pPlayTimeActivityList)):
             # desc
             desc = None if pPlayTimeActivityList[i][1] == "" else pPlayTimeActivityList[i][1]
             # set this up
             self._timekprUserConfig["PLAYTIME_ACTIVITIES"].append([pPlayTimeActivityList[i][0], desc])
+            # limit
+            if len(pPlayTimeActivityList[i]) > 2 and pPlayTimeActivityList[i][2] is not None:
+                # set this up
+                self._timekprUserConfig["PLAYTIME_ACTIVITY_LIMITS"][pPlayTimeActivityList[i][0]] = (
+                    pPlayTimeActivityList[i][2]
+                )
 
 
 class timekprUserControl(object):
@@ -1974,6 +2388,21 @@ class timekprUserControl(object):
                 pCheckValue=cons.TK_LIMIT_PER_DAY,
                 pOverallSuccess=resultValue,
             )
+            # read
+            param = "PLAYTIME_ACTIVITIES_SPENT_DAY"
+            resultValue, activitiesSpent = _readAndNormalizeValue(
+                self._timekprUserControlParser.get,
+                section,
+                param,
+                pDefaultValue="",
+                pCheckValue=None,
+                pOverallSuccess=resultValue,
+            )
+            # process mask -> time spent
+            self._timekprUserControl[param] = {
+                rAct: min(int(rSpent), cons.TK_LIMIT_PER_DAY)
+                for rSpent, rAct in RE_ACTIVITYSPENTFINDER.findall(activitiesSpent)
+            }
 
             # if we could not read some values, save what we could + defaults
             if not resultValue:
@@ -2067,6 +2496,16 @@ class timekprUserControl(object):
             "%s" % (param),
             str(self._timekprUserControl[param]) if pReuseValues else "0",
         )
+        param = "PLAYTIME_ACTIVITIES_SPENT_DAY"
+        self._timekprUserControlParser.set(
+            section,
+            "# PlayTime spent for this day for activities with their own limits, pattern: SECONDS[PROCESS_MASK];...",
+        )
+        self._timekprUserControlParser.set(
+            section,
+            "%s" % (param),
+            self._getActivitiesSpentValue() if pReuseValues else "",
+        )
 
         # save the file
         with open(self._configFile, "w") as fp:
@@ -2077,6 +2516,14 @@ class timekprUserControl(object):
 
         log.log(cons.TK_LOG_LEVEL_INFO, "finish init user control")
 
+    def _getActivitiesSpentValue(self):
+        """Get PlayTime spent for activities as it's saved in control file"""
+        # result
+        return ";".join(
+            "%i[%s]" % (rSpent, rAct)
+            for rAct, rSpent in self._timekprUserControl["PLAYTIME_ACTIVITIES_SPENT_DAY"].items()
+        )
+
     def saveControl(self):
         """Save configuration"""
         log.log(cons.TK_LOG_LEVEL_INFO, "start save user (%s) control" % (self._userName))
@@ -2105,12 +2552,26 @@ class timekprUserControl(object):
         # PlayTime spent day
         param = "PLAYTIME_SPENT_DAY"
         values[param] = str(int(self._timekprUserControl[param]))
+        # PlayTime spent day for activities
+        param = "PLAYTIME_ACTIVITIES_SPENT_DAY"
+        values[param] = self._getActivitiesSpentValue()
 
         # edit control file (using alternate method because configparser looses comments in the process)
         _saveConfigFile(self._configFile, values)
 
         log.log(cons.TK_LOG_LEVEL_INFO, "finish save user control")
 
+    def syncControl(self):
+        """Flush saved control file to storage"""
+        # open
+        fd = os.open(self._configFile, os.O_RDONLY)
+        try:
+            # flush
+            os.fsync(fd)
+        finally:
+            # close
+            os.close(fd)
+
     def logUserControl(self):
         """Log user control config file"""
         # log
@@ -2160,6 +2621,12 @@ class timekprUserControl(object):
                 cons.TK_LOG_LEVEL_INFO,
                 "  %s=%s" % (param, str(self._timekprUserControl[param])),
             )
+            # log
+            param = "PLAYTIME_ACTIVITIES_SPENT_DAY"
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "  %s=%s" % (param, self._getActivitiesSpentValue()),
+            )
         # fail
         except Exception:
             # log
@@ -2218,6 +2685,11 @@ class timekprUserControl(object):
         # result
         return self._timekprUserControl["PLAYTIME_SPENT_DAY"]
 
+    def getUserPlayTimeActivitiesSpentDay(self):
+        """Get PlayTime spent for day for activities with their own limits (process mask -> time spent)"""
+        # result
+        return self._timekprUserControl["PLAYTIME_ACTIVITIES_SPENT_DAY"]
+
     def getUserControlLastModified(self):
         """Get last file modification time for user"""
         # result
@@ -2258,6 +2730,11 @@ class timekprUserControl(object):
         # result
         self._timekprUserControl["PLAYTIME_SPENT_DAY"] = pTimeSpent
 
+    def setUserPlayTimeActivitiesSpentDay(self, pActivitiesSpent):
+        """Set PlayTime spent for day for activities with their own limits (process mask -> time spent)"""
+        # result
+        self._timekprUserControl["PLAYTIME_ACTIVITIES_SPENT_DAY"] = dict(pActivitiesSpent)
+
 
 class timekprClientConfig(object):
     """Class will hold and provide config management for user"""
@@ -4,20 +4,20 @@ Created on Aug 28, 2018
 @author: mjasnik
 """
 
-# defaults
-_START_TIME = None
-_END_TIME = None
-_RESULT = 0
-
 # imports
 from datetime import datetime
 import os
-import pwd
 import inspect
+import threading
+import time
+
+# defaults (time measurements per thread)
+_MEASUREMENTS = threading.local()
 
 # timekpr imports
 from timekpr.common.constants import constants as cons
 from timekpr.common.log import log
+from timekpr.common.utils import usercache
 
 try:
     import psutil
@@ -43,7 +43,7 @@ def getNormalizedUserNames(pUID=None, pUser=None):
         # if we need to get one
         if pUID is not None:
             # user
-            user = pwd.getpwuid(pUID)
+            user = usercache.getUserById(pUID)
         # we have user
         if user is not None:
             # username
@@ -62,23 +62,19 @@ def getNormalizedUserNames(pUID=None, pUser=None):
 
 def measureTimeElapsed(pStart=False, pStop=False, pResult=False):
     """Calculate the time difference in the simplest manner"""
-    # init globals (per import)
-    global _START_TIME
-    global _END_TIME
-    global _RESULT
-
+    # measurements are done per thread (users may be processed in parallel)
     # set up start
     if pStart:
-        _START_TIME = datetime.now()
+        _MEASUREMENTS.startTime = datetime.now()
     # set up end
     if pStop:
         # calc seconds and finish stuff
-        _END_TIME = datetime.now()
-        _RESULT = (_END_TIME - _START_TIME).total_seconds()
-        _START_TIME = _END_TIME
+        endTime = datetime.now()
+        _MEASUREMENTS.result = (endTime - getattr(_MEASUREMENTS, "startTime", endTime)).total_seconds()
+        _MEASUREMENTS.startTime = endTime
 
     # return
-    return _RESULT
+    return getattr(_MEASUREMENTS, "result", 0)
 
 
 def measureDBUSTimeElapsed(pStart=False, pStop=False, pPrintToConsole=False, pDbusIFName=""):
@@ -102,6 +98,12 @@ def measureDBUSTimeElapsed(pStart=False, pStop=False, pPrintToConsole=False, pDb
     return result
 
 
+def getClockTimes():
+    """Get monotonic (does not advance while computer is asleep) and boottime (advances while asleep) clock values"""
+    # result
+    return time.monotonic(), time.clock_gettime(time.CLOCK_BOOTTIME)
+
+
 def checkAndSetRunning(app_name, user_name=""):
     """Check whether application is already running"""
     # set up pidfile name
@@ -346,3 +348,28 @@ def splitConfigValueNameParam(pStr):
 
     # return
     return value, param
+
+
+def splitConfigValueLimit(pStr):
+    """Separate value (with description in brackets) and limit in braces after it, e.g. "mask[description]{3600}"
+    (limit is returned as string, empty one means no limit, None - limit is not specified)"""
+    # value and its limit
+    value = pStr
+    limit = None
+
+    # limit is accepted only right after description (masks may contain braces, descriptions can not)
+    st = pStr.rfind("]{")
+    # found at the end
+    if st >= 0 and pStr.endswith("}"):
+        # limit
+        limit = pStr[st + 2 : -1]
+        # limit is numeric or empty
+        if limit == "" or limit.isdecimal():
+            # value with description
+            value = pStr[: st + 1]
+        else:
+            # not a limit, it's part of the value
+            limit = None
+
+    # return
+    return value, limit
@@ -187,6 +187,28 @@ class timekprNotificationManager(dbus.service.Object):
         )
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish processTimeLeft")
 
+    def getSecondsToNextNotification(self, pTimeLeft):
+        """Return seconds until time left reaches the next notification level or notification has to be repeated"""
+        # def
+        secondsToNotification = cons.TK_LIMIT_PER_DAY
+        # levels are in descending order, the first level which is reached is the current one
+        for rLimit in self._notificationLimits:
+            # check
+            if pTimeLeft >= rLimit[cons.TK_NOTIF_LEFT]():
+                # time left can not decrease faster than real time, so the level changes not earlier than this
+                secondsToNotification = pTimeLeft - rLimit[cons.TK_NOTIF_LEFT]() + 1
+                # repeated notification for current level
+                secondsToNotification = min(
+                    secondsToNotification,
+                    rLimit[cons.TK_NOTIF_INTERVAL]()
+                    - (datetime.now().replace(microsecond=0) - self._lastNotified).total_seconds(),
+                )
+                # we found what we needed
+                break
+
+        # result
+        return max(secondsToNotification, 0)
+
     def processTimeLimits(self, pTimeLimits):
         """Enable sending out the limits config"""
         # dbus dict for holding days
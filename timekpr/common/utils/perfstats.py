@@ -0,0 +1,167 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import bisect
+import os
+import tempfile
+import threading
+import time
+
+# timekpr imports
+from timekpr.common.constants import constants as cons
+from timekpr.common.log import log
+
+# histogram bucket upper bounds in seconds (last bucket catches everything else)
+_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# collected stats per phase and label (measurements come from worker, worker pool and main loop threads)
+_STATS = {}
+_STATS_LOCK = threading.Lock()
+# field indexes
+_CNT = 0
+_SUM = 1
+_MAX = 2
+_BKT = 3
+
+
+def startMeasurement():
+    """Start measurement (returns a start mark which has to be passed to stopMeasurement)"""
+    # result
+    return time.perf_counter()
+
+
+def stopMeasurement(pPhase, pStart, pLabel=""):
+    """Stop measurement and record it for phase (label is optional, e.g. user name)"""
+    # time elapsed
+    elapsed = time.perf_counter() - pStart
+    # bucket
+    bucketIdx = bisect.bisect_left(_BUCKETS, elapsed)
+    # lock
+    with _STATS_LOCK:
+        # get stats for phase
+        stats = _STATS.get((pPhase, pLabel))
+        # new phase
+        if stats is None:
+            # init
+            stats = _STATS[(pPhase, pLabel)] = [0, 0.0, 0.0, [0] * (len(_BUCKETS) + 1)]
+        # record
+        stats[_CNT] += 1
+        stats[_SUM] += elapsed
+        stats[_MAX] = max(stats[_MAX], elapsed)
+        stats[_BKT][bucketIdx] += 1
+
+
+def _getPercentile(pStats, pPercentile):
+    """Get estimated percentile from histogram (upper bound of the bucket, but not more than max)"""
+    # how many measurements have to be below the value
+    threshold = pStats[_CNT] * pPercentile
+    # cumulative count
+    cnt = 0
+    # go through buckets
+    for rIdx, rBucketCnt in enumerate(pStats[_BKT]):
+        # add up
+        cnt += rBucketCnt
+        # found
+        if cnt >= threshold and rIdx < len(_BUCKETS):
+            # result
+            return min(_BUCKETS[rIdx], pStats[_MAX])
+    # result
+    return pStats[_MAX]
+
+
+def getPerfStats():
+    """Get performance stats for all phases, key is "phase" or "phase:label", values are in seconds"""
+    # result
+    perfStats = {}
+    # lock
+    with _STATS_LOCK:
+        # go through all phases
+        for (rPhase, rLabel), rStats in _STATS.items():
+            # stats
+            perfStats["%s:%s" % (rPhase, rLabel) if rLabel else rPhase] = {
+                "count": float(rStats[_CNT]),
+                "sum": rStats[_SUM],
+                "p50": _getPercentile(rStats, 0.5),
+                "p95": _getPercentile(rStats, 0.95),
+                "max": rStats[_MAX],
+            }
+    # result
+    return perfStats
+
+
+def resetPerfStats():
+    """Reset all collected stats"""
+    # lock
+    with _STATS_LOCK:
+        # clear
+        _STATS.clear()
+
+
+def exportPerfStats(pWorkDir):
+    """Export performance stats to a Prometheus textfile in work directory (file is replaced atomically)"""
+    # metric name
+    metric = "timekpr_phase_duration_seconds"
+    # lines
+    lines = [
+        "# HELP %s Timekpr-nEXT daemon phase execution time." % (metric),
+        "# TYPE %s summary" % (metric),
+    ]
+    # max lines (separate gauge)
+    linesMax = [
+        "# HELP %s_max Timekpr-nEXT daemon phase max execution time." % (metric),
+        "# TYPE %s_max gauge" % (metric),
+    ]
+    # lock
+    with _STATS_LOCK:
+        # go through all phases (sorted, so output is stable)
+        for (rPhase, rLabel), rStats in sorted(_STATS.items()):
+            # labels
+            labels = 'phase="%s",user="%s"' % (rPhase, rLabel)
+            # quantiles
+            for rQuantile in (0.5, 0.95):
+                lines.append(
+                    '%s{%s,quantile="%s"} %.6f' % (metric, labels, str(rQuantile), _getPercentile(rStats, rQuantile))
+                )
+            # totals
+            lines.append("%s_sum{%s} %.6f" % (metric, labels, rStats[_SUM]))
+            lines.append("%s_count{%s} %i" % (metric, labels, rStats[_CNT]))
+            linesMax.append("%s_max{%s} %.6f" % (metric, labels, rStats[_MAX]))
+
+    # file name
+    exportFile = os.path.join(pWorkDir, cons.TK_PERF_STATS_EXPORT_FILE)
+    tmpFile = None
+    try:
+        # write to temporary file in the same directory
+        fd, tmpFile = tempfile.mkstemp(dir=pWorkDir, prefix=".%s." % (cons.TK_PERF_STATS_EXPORT_FILE))
+        with os.fdopen(fd, "w") as fp:
+            fp.write("\n".join(lines + linesMax) + "\n")
+        # readable for exporters
+        os.chmod(tmpFile, 0o644)
+        # replace atomically
+        os.replace(tmpFile, exportFile)
+    except Exception as ex:
+        # logging
+        log.log(cons.TK_LOG_LEVEL_INFO, 'ERROR: could not export performance stats to "%s": %s' % (exportFile, ex))
+        # clean up
+        if tmpFile is not None and os.path.isfile(tmpFile):
+            os.remove(tmpFile)
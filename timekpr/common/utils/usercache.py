@@ -0,0 +1,290 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import ctypes
+import ctypes.util
+import errno
+import fileinput
+import os
+import pwd
+import re
+import struct
+import threading
+import time
+
+# timekpr imports
+from timekpr.common.constants import constants as cons
+from timekpr.common.log import log
+
+# inotify events which mean that file was changed or replaced
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+# inotify event header (wd, mask, cookie, name length)
+_IN_EVENT = struct.Struct("iIII")
+
+# cached users: uid -> [expires, passwd entry or None when user does not exist]
+_USERS = {}
+# cached user list: [expires, passwd entries]
+_USER_LIST = [0.0, None]
+# cached user limits from login.defs
+_LIMITS = None
+# users are looked up from main loop, worker pool and PlayTime threads
+_LOCK = threading.Lock()
+# change watch for users and login configuration files (created on first use)
+_WATCH = None
+# when files are checked for changes next time (monotonic)
+_NEXT_CHECK = 0.0
+# field indexes
+_EXP = 0
+_VAL = 1
+
+
+class _timekprFileWatch(object):
+    """Watches files for changes, uses inotify on directories of the files (files are usually replaced, not written)
+    or file stats when inotify is not available"""
+
+    def __init__(self, pFiles):
+        """Initialize watch"""
+        # files
+        self._files = pFiles
+        # inotify fd
+        self._fd = None
+        # directory watches: wd -> file names
+        self._wds = {}
+        # file stats when inotify is not used
+        self._stats = None
+        # watch
+        try:
+            # inotify
+            self._initInotify()
+        except (OSError, AttributeError) as ex:
+            # release
+            self._closeInotify()
+            # stats
+            self._stats = self._getStats()
+            # logging
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "inotify is not available (%s), checking file stats instead" % (str(ex)))
+
+    def __del__(self):
+        """Release watch"""
+        # release
+        self._closeInotify()
+
+    def _initInotify(self):
+        """Set up inotify watches for directories of the files"""
+        # libc
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # init
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        # failed
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._fd = fd
+        # directories with files
+        dirs = {}
+        for rFile in self._files:
+            dirs.setdefault(os.path.dirname(rFile), set()).add(os.path.basename(rFile))
+        # watch directories
+        for rDir, rNames in dirs.items():
+            # directory does not exist (e.g. /usr/etc)
+            if not os.path.isdir(rDir):
+                continue
+            # watch
+            wd = libc.inotify_add_watch(self._fd, rDir.encode(), _IN_MASK)
+            # failed
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            self._wds[wd] = rNames
+
+    def _closeInotify(self):
+        """Release inotify fd"""
+        # opened
+        if self._fd is not None:
+            # close
+            os.close(self._fd)
+            self._fd = None
+
+    def _getStats(self):
+        """Get file stats (None for files which do not exist)"""
+        # def
+        stats = {}
+        # files
+        for rFile in self._files:
+            try:
+                # stat
+                stat = os.stat(rFile)
+                stats[rFile] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                # does not exist
+                stats[rFile] = None
+        # result
+        return stats
+
+    def isChanged(self):
+        """Check whether any of the files was changed since last check"""
+        # def
+        isChanged = False
+        # stats
+        if self._fd is None:
+            # current
+            stats = self._getStats()
+            # changed
+            isChanged = stats != self._stats
+            self._stats = stats
+            # result
+            return isChanged
+        # read all pending events
+        while True:
+            try:
+                # read
+                events = os.read(self._fd, 65536)
+            except OSError as ex:
+                # no more events
+                if ex.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            # go through events
+            offset = 0
+            while offset < len(events):
+                # event
+                wd, mask, _cookie, nameLen = _IN_EVENT.unpack_from(events, offset)
+                name = events[offset + _IN_EVENT.size : offset + _IN_EVENT.size + nameLen].rstrip(b"\0").decode()
+                offset += _IN_EVENT.size + nameLen
+                # events were lost or our file was changed
+                if mask & _IN_Q_OVERFLOW or name in self._wds.get(wd, ()):
+                    isChanged = True
+        # result
+        return isChanged
+
+
+def _loadUserLimits():
+    """Load user limits from login.defs (some distros are "different", login.defs may be in different dir)"""
+    # defaults
+    limits = {"UID_MIN": 1000, "UID_MAX": 60000}
+    # config reflects multiple dirs to check for the file
+    for rFile in cons.TK_USER_LIMITS_FILE:
+        # check if file exists
+        if os.path.isfile(rFile):
+            # load limits
+            with fileinput.input(rFile) as rLimitsFile:
+                # read line and do manipulations
+                for rLine in rLimitsFile:
+                    # get min/max uids
+                    if re.match("^UID_M(IN|AX)[ \t]+[0-9]+$", rLine):
+                        # find our config
+                        x = re.findall(r"^([A-Z_]+)[ \t]+([0-9]+).*$", rLine)
+                        # save min/max uuids
+                        limits[x[0][0]] = int(x[0][1])
+                # fin
+                break
+    # result
+    return limits
+
+
+def _checkChanges(pTimeNow):
+    """Drop everything cached when users or login configuration files have changed (has to be called with lock)"""
+    global _WATCH
+    global _NEXT_CHECK
+    # not the time yet
+    if pTimeNow < _NEXT_CHECK:
+        return
+    # next check
+    _NEXT_CHECK = pTimeNow + cons.TK_USER_CACHE_CHECK_INTERVAL
+    # first use
+    if _WATCH is None:
+        # watch
+        _WATCH = _timekprFileWatch([cons.TK_USERS_FILE] + cons.TK_USER_LIMITS_FILE)
+    # changed
+    elif _WATCH.isChanged():
+        # logging
+        log.log(cons.TK_LOG_LEVEL_DEBUG, "users or login configuration have changed, dropping cached users")
+        # drop
+        _dropCache()
+
+
+def _dropCache():
+    """Drop everything cached (has to be called with lock)"""
+    global _LIMITS
+    # drop
+    _USERS.clear()
+    _USER_LIST[_EXP] = 0.0
+    _USER_LIST[_VAL] = None
+    _LIMITS = None
+
+
+def getUserById(pUID):
+    """Get passwd entry of the user by id (None if user does not exist)"""
+    # now
+    timeNow = time.monotonic()
+    # lock
+    with _LOCK:
+        # changes
+        _checkChanges(timeNow)
+        # cached
+        user = _USERS.get(pUID)
+        # not cached or expired
+        if user is None or user[_EXP] <= timeNow:
+            try:
+                # look up
+                entry = pwd.getpwuid(pUID)
+            except KeyError:
+                # user does not exist (this is cached too)
+                entry = None
+            # cache
+            user = _USERS[pUID] = [timeNow + cons.TK_USER_CACHE_TTL, entry]
+    # result
+    return user[_VAL]
+
+
+def getAllUsers():
+    """Get passwd entries of all users"""
+    # now
+    timeNow = time.monotonic()
+    # lock
+    with _LOCK:
+        # changes
+        _checkChanges(timeNow)
+        # not cached or expired
+        if _USER_LIST[_VAL] is None or _USER_LIST[_EXP] <= timeNow:
+            # look up
+            _USER_LIST[_VAL] = pwd.getpwall()
+            _USER_LIST[_EXP] = timeNow + cons.TK_USER_CACHE_TTL
+            # individual users are cached too
+            for rUser in _USER_LIST[_VAL]:
+                _USERS[rUser.pw_uid] = [_USER_LIST[_EXP], rUser]
+        # result
+        return _USER_LIST[_VAL]
+
+
+def getUserLimits():
+    """Get user limits (UID_MIN, UID_MAX) from login.defs"""
+    global _LIMITS
+    # lock
+    with _LOCK:
+        # changes
+        _checkChanges(time.monotonic())
+        # not cached
+        if _LIMITS is None:
+            # load
+            _LIMITS = _loadUserLimits()
+        # result
+        return _LIMITS
+
+
+def invalidateUserCache():
+    """Drop everything cached, users and limits are looked up again on next use"""
+    # lock
+    with _LOCK:
+        # drop
+        _dropCache()
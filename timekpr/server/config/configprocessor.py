@@ -286,6 +286,12 @@ class timekprUserConfigurationProcessor(object):
                     )
                     # PlayTime activities
                     playTimeActivities = self._timekprUserConfig.getUserPlayTimeActivities()
+                    # activities with their own limits have limit as third value
+                    playTimeActivityLimits = self._timekprUserConfig.getUserPlayTimeActivityLimits()
+                    playTimeActivities = [
+                        (rAct + [str(playTimeActivityLimits[rAct[0]])] if rAct[0] in playTimeActivityLimits else rAct)
+                        for rAct in playTimeActivities
+                    ]
                     userConfigurationStore["PLAYTIME_ACTIVITIES"] = (
                         playTimeActivities if len(playTimeActivities) > 0 else dbus.Array(signature="aas")
                     )
@@ -1083,7 +1089,8 @@ class timekprUserConfigurationProcessor(object):
     def checkAndSetPlayTimeActivities(self, pPlayTimeActivities):
         """Validate and set up allowed PlayTime activities for the user"""
         """Validate allowed PlayTime activities for the user
-            server expects array of array of masks/descriptions"""
+            server expects array of array of masks/descriptions, optionally followed by activity limit in seconds
+            (empty limit removes it, when limit is not passed, current limit for the mask is kept)"""
 
         # check if we have this user
         result, message = self.loadAndCheckUserConfiguration()
@@ -1100,12 +1107,19 @@ class timekprUserConfigurationProcessor(object):
         else:
             # days
             activities = []
+            # current limits
+            activityLimits = self._timekprUserConfig.getUserPlayTimeActivityLimits()
 
             # parse config
             try:
                 for rAct in pPlayTimeActivities:
+                    # limit (kept as is, when it's not passed)
+                    limit = (int(rAct[2]) if rAct[2] != "" else None) if len(rAct) > 2 else activityLimits.get(rAct[0])
+                    # limit must be within a day
+                    if limit is not None and not 0 <= limit <= cons.TK_LIMIT_PER_DAY:
+                        raise ValueError("activity limit is out of range")
                     # set up act
-                    act = (rAct[0], rAct[1])
+                    act = (rAct[0], rAct[1], limit)
                     # add to list
                     activities.append(act)
             except Exception:
@@ -5,9 +5,7 @@ Created on Feb 05, 2019
 """
 
 # imports
-import fileinput
 import os
-import pwd
 import re
 from glob import glob
 
@@ -18,14 +16,11 @@ from timekpr.common.utils.config import timekprConfig
 from timekpr.common.utils.config import timekprUserConfig
 from timekpr.common.utils.config import timekprUserControl
 from timekpr.common.utils.misc import getNormalizedUserNames
+from timekpr.common.utils import usercache
 
-# user limits
-_limitsConfig = {}
+# login managers
 _loginManagers = [result.strip(None) for result in cons.TK_USERS_LOGIN_MANAGERS.split(";")]
 
-# defaults
-_limitsConfig["UID_MIN"] = 1000
-_limitsConfig["UID_MAX"] = 60000
 # username pattern:
 #   all users, max 101 chars
 #   linux users, extended with uppercase characters and first numeric or "." character
@@ -33,35 +28,16 @@ _limitsConfig["UID_MAX"] = 60000
 _userNameRegexp = re.compile(r"^[a-zA-Z0-9_\\.]([a-zA-Z0-9_\\.@-]{0,101}|[a-zA-Z0-9_\\.@-]{0,100}\$)$")
 
 
-# some distros are "different", login.defs may be in different dir, config reflects multiple dirs to check for the file
-for rFile in cons.TK_USER_LIMITS_FILE:
-    # check if file exists
-    if os.path.isfile(rFile):
-        # load limits
-        with fileinput.input(rFile) as rLimitsFile:
-            # read line and do manipulations
-            for rLine in rLimitsFile:
-                # get min/max uids
-                if re.match("^UID_M(IN|AX)[ \t]+[0-9]+$", rLine):
-                    # find our config
-                    x = re.findall(r"^([A-Z_]+)[ \t]+([0-9]+).*$", rLine)
-                    # save min/max uuids
-                    _limitsConfig[x[0][0]] = int(x[0][1])
-            # fin
-            break
-
-
 def isUserValid(pUserId, pUserName=None, pUserShell=None):
     """Validate user ID, name and shell"""
     # vars
-    global _limitsConfig
     global _userNameRegexp
     isUIDOK = False
 
     # check user id
     if pUserId is not None and pUserId != "":
         # check normal users and to test in VMs default user (it may have UID of 999, -1 from limit)
-        isUIDOK = int(pUserId) >= _limitsConfig["UID_MIN"] - 1
+        isUIDOK = int(pUserId) >= usercache.getUserLimits()["UID_MIN"] - 1
         # check shell (if provided)
         if isUIDOK and pUserShell is not None:
             # uid is ok and shell is passed
@@ -120,7 +96,7 @@ class timekprUserStore(object):
         users = {}
 
         # iterate through all usernames
-        for rUser in pwd.getpwall():
+        for rUser in usercache.getAllUsers():
             # save our user, if it mactches
             if isUserValid(rUser.pw_uid, rUser.pw_name, rUser.pw_shell):
                 # get processed usernames
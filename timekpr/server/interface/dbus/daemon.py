@@ -12,6 +12,7 @@ import dbus.service
 import time
 import threading
 import traceback
+import concurrent.futures
 from datetime import datetime, timedelta
 
 # timekpr imports
@@ -20,8 +21,11 @@ from timekpr.common.log import log
 from timekpr.server.interface.dbus.logind import manager as l1_manager
 from timekpr.common.utils.config import timekprConfig
 from timekpr.common.utils import misc
+from timekpr.common.utils import perfstats
 from timekpr.server.user.userdata import timekprUser
 from timekpr.server.user.playtime import timekprPlayTimeConfig
+from timekpr.server.user.playtimescanner import timekprPlayTimeScanner
+from timekpr.server.user.persistence import timekprPersistenceScheduler
 from timekpr.server.config.configprocessor import timekprUserConfigurationProcessor
 from timekpr.server.config.configprocessor import timekprConfigurationProcessor
 from timekpr.server.config.userhelper import timekprUserStore
@@ -72,11 +76,37 @@ class timekprDaemon(dbus.service.Object):
         self._timekprUserRestrictionList = {}
         # PlayTime config
         self._timekprPlayTimeConfig = None
+        # users, which do not need PlayTime processes inspected (inactive or PlayTime is not enabled for them)
+        self._timekprPlayTimeSkippedUsers = {}
+        # saving of user time spent
+        self._timekprPersistence = None
+        # worker pool for processing users in parallel
+        self._timekprWorkerPool = None
+        self._timekprWorkerPoolSize = 0
+        # wake up trigger for worker (external events which need attention now)
+        self._timekprWakeUpEvent = threading.Event()
+        # time until next tick (adaptive polling, None - worker is idle until woken up)
+        self._timekprNextTickTimeout = None
+        # whether worker was idle (parked) since last tick
+        self._timekprParked = False
+        # computer is going to sleep (time has to be accounted before it does)
+        self._timekprSleepPending = False
+        # whether users are processed on the main loop and scheduled tick there
+        self._timekprMainLoopWorker = False
+        self._timekprTickSourceId = None
+        # perf
+        self._timekprExecLen = timedelta(0, 0, 0)
+        self._timekprExecCnt = 0
+        self._timekprPerfExportTime = time.monotonic()
 
         # ## initialization ##
         # configuration init
         self._timekprConfig = timekprConfig()
         self._timekprConfig.loadMainConfiguration()
+        # this is determined once (restart is needed to change this)
+        self._timekprMainLoopWorker = self._timekprConfig.getTimekprMainLoopWorkerEnabled()
+        # first tick will be done right away, next one after regular poll
+        self._timekprNextTickTimeout = self._timekprConfig.getTimekprPollTime()
         # log
         self._timekprConfig.logMainConfiguration()
 
@@ -91,18 +121,29 @@ class timekprDaemon(dbus.service.Object):
         # in case we are dealing with logind
         if self._timekprLoginManagerName == "L1":
             self._timekprLoginManager = l1_manager.timekprUserLoginManager()
+            # process user and session changes immediately
+            self._timekprLoginManager.setWakeUpCallback(self._wakeUpWorker)
+            # process sleep and resume immediately
+            self._timekprLoginManager.setSleepCallback(self._processPrepareForSleep)
         # in case we are dealing with consolekit (WHICH IS NOT IMPLEMENTED YET and might NOT be AT ALL)
         elif self._timekprLoginManagerName == "CK":
             self._timekprLoginManager = None
 
-        # PT config
-        self._timekprPlayTimeConfig = timekprPlayTimeConfig(self._timekprConfig)
+        # PT config (processes are inspected either in separate scanner process or in worker)
+        if self._timekprConfig.getTimekprPlayTimeScannerProcessEnabled():
+            self._timekprPlayTimeConfig = timekprPlayTimeScanner(self._timekprConfig)
+        else:
+            self._timekprPlayTimeConfig = timekprPlayTimeConfig(self._timekprConfig)
+        # persistence
+        self._timekprPersistence = timekprPersistenceScheduler(self._timekprConfig)
         log.log(cons.TK_LOG_LEVEL_DEBUG, "finish init daemon data")
 
     def finishTimekpr(self, signal=None, frame=None):
         """Exit timekpr gracefully"""
         # show all threads that we are exiting
         self._finishExecution = True
+        # wake up worker, so it can finish
+        self._wakeUpWorker(pForce=True)
         # exit main loop
         self._timekprMainLoop.quit()
         log.log(cons.TK_LOG_LEVEL_INFO, "main loop shut down")
@@ -119,75 +160,247 @@ class timekprDaemon(dbus.service.Object):
             # set up finishing flag
             self.finishTimekpr()
 
+        # users were processed on the main loop
+        if self._timekprMainLoopWorker:
+            # finish
+            self._finishTimekprWorker()
+
         # finish logging
         log.flushLogFile()
 
     def executeTimekprWorker(self):
         """Execute all the logic of timekpr"""
         log.log(cons.TK_LOG_LEVEL_INFO, "start up worker thread")
-        # def
-        execLen = timedelta(0, 0, 0)
-        execCnt = 0
         # we execute tasks until not asked to stop
         while not self._finishExecution:
-            # perf
-            dtsm = time.time()
-            dts = datetime.now()
-            log.log(cons.TK_LOG_LEVEL_INFO, "--- start working on users ---")
-
             # do the actual work
-            try:
-                self.checkUsers()
-            except Exception:
-                log.log(
-                    cons.TK_LOG_LEVEL_INFO,
-                    '---=== ERROR in "executeTimekprWorker" working on users ===---',
-                )
-                log.log(cons.TK_LOG_LEVEL_INFO, traceback.format_exc())
-                log.log(
-                    cons.TK_LOG_LEVEL_INFO,
-                    '---=== ERROR in "executeTimekprWorker" working on users ===---',
-                )
-
-            # periodically flush the file
-            log.autoFlushLogFile()
-
-            # perf
-            lavg = os.getloadavg()
-            perf = datetime.now() - dts
-            execCnt += 1
-            execLen += perf
-
+            dtsm = self._executeTimekprTick()
+            # take a polling pause (or wait until woken up, when idle), external events may wake us up earlier
+            self._timekprWakeUpEvent.wait(self._getNextTickWait(dtsm))
+            # events which happen from now on will wake up the worker again
+            self._timekprWakeUpEvent.clear()
+
+        # finish
+        self._finishTimekprWorker()
+
+    def _executeTimekprMainLoopTick(self):
+        """Execute all the logic of timekpr on the main loop (alternative to worker thread)"""
+        # this tick is being processed
+        self._timekprTickSourceId = None
+        # do not work when finishing
+        if not self._finishExecution:
+            # do the actual work
+            dtsm = self._executeTimekprTick()
+            # wait time
+            nextTickWait = self._getNextTickWait(dtsm)
+            # schedule the next one (when idle, next one is scheduled when woken up)
+            if nextTickWait is not None:
+                # schedule
+                self._scheduleTimekprMainLoopTick(nextTickWait)
+        # this is one-shot, next one is scheduled explicitly
+        return False
+
+    def _scheduleTimekprMainLoopTick(self, pTimeout):
+        """Schedule next tick on the main loop (replaces already scheduled one)"""
+        # remove scheduled tick
+        if self._timekprTickSourceId is not None:
+            GLib.source_remove(self._timekprTickSourceId)
+        # schedule
+        self._timekprTickSourceId = GLib.timeout_add(max(int(pTimeout * 1000), 0), self._executeTimekprMainLoopTick)
+
+    def _processMainLoopWakeUp(self):
+        """Process wake up request on the main loop (tick is executed right away)"""
+        # events which happen from now on will wake up the worker again
+        self._timekprWakeUpEvent.clear()
+        # process users immediately
+        self._scheduleTimekprMainLoopTick(0)
+        # this is one-shot
+        return False
+
+    def _executeTimekprTick(self):
+        """Process all users once (returns time when processing was started)"""
+        # perf
+        dtsm = time.time()
+        dts = datetime.now()
+        log.log(cons.TK_LOG_LEVEL_INFO, "--- start working on users ---")
+        # worker was idle, processes may have come and gone (pids reused) without us knowing
+        if self._timekprParked:
+            # logging
+            log.log(cons.TK_LOG_LEVEL_INFO, "worker resumed after being idle")
+            # forget cached processes
+            self._timekprPlayTimeConfig.resetPlayTimeProcessCache()
+            self._timekprParked = False
+        # whether computer is going to sleep (checked before work, so time is accounted up to this moment)
+        sleepPending = self._timekprSleepPending
+        self._timekprSleepPending = False
+
+        # perf
+        perfStart = perfstats.startMeasurement()
+
+        # do the actual work
+        try:
+            self.checkUsers()
+        except Exception:
             log.log(
                 cons.TK_LOG_LEVEL_INFO,
-                "--- end working on users (ela: %s) ---" % (str(perf)),
+                '---=== ERROR in "executeTimekprWorker" working on users ===---',
             )
+            log.log(cons.TK_LOG_LEVEL_INFO, traceback.format_exc())
             log.log(
-                cons.TK_LOG_LEVEL_DEBUG,
-                "--- perf: avg ela: %s, loadavg: %s, %s, %s ---" % (str(execLen / execCnt), lavg[0], lavg[1], lavg[2]),
-            )
-            # take a polling pause (try to do that exactly every 3 secs)
-            time.sleep(
-                self._timekprConfig.getTimekprPollTime()
-                - min(time.time() - dtsm, self._timekprConfig.getTimekprPollTime() / 2)
+                cons.TK_LOG_LEVEL_INFO,
+                '---=== ERROR in "executeTimekprWorker" working on users ===---',
             )
+            # retry with regular poll
+            self._timekprNextTickTimeout = self._timekprConfig.getTimekprPollTime()
+
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_TICK, perfStart)
+        # export performance stats periodically
+        if (
+            self._timekprConfig.getTimekprPerfStatsExportEnabled()
+            and time.monotonic() - self._timekprPerfExportTime >= cons.TK_PERF_STATS_EXPORT_INTERVAL
+        ):
+            # export
+            perfstats.exportPerfStats(self._timekprConfig.getTimekprWorkDir())
+            self._timekprPerfExportTime = time.monotonic()
+
+        # time is accounted, computer may go to sleep now
+        if sleepPending and self._timekprLoginManager is not None:
+            # release
+            self._timekprLoginManager.releaseSleepInhibitor()
+
+        # periodically flush the file
+        log.autoFlushLogFile()
+
+        # perf
+        lavg = os.getloadavg()
+        perf = datetime.now() - dts
+        self._timekprExecCnt += 1
+        self._timekprExecLen += perf
+
+        log.log(
+            cons.TK_LOG_LEVEL_INFO,
+            "--- end working on users (ela: %s) ---" % (str(perf)),
+        )
+        log.log(
+            cons.TK_LOG_LEVEL_DEBUG,
+            "--- perf: avg ela: %s, loadavg: %s, %s, %s ---"
+            % (str(self._timekprExecLen / self._timekprExecCnt), lavg[0], lavg[1], lavg[2]),
+        )
+
+        # result
+        return dtsm
+
+    def _finishTimekprWorker(self):
+        """Finish processing users"""
+        # save everything for all users
+        try:
+            # save
+            self._timekprPersistence.flushUsers(self._timekprUserList)
+        except Exception:
+            log.log(cons.TK_LOG_LEVEL_INFO, "ERROR saving users on shutdown:\n%s" % (traceback.format_exc()))
+        # shut down worker pool
+        if self._timekprWorkerPool is not None:
+            self._timekprWorkerPool.shutdown(wait=True)
+        # stop tracking PlayTime processes
+        self._timekprPlayTimeConfig.finishPlayTimeActivities()
 
         log.log(cons.TK_LOG_LEVEL_INFO, "worker shut down")
         # finish logging
         log.flushLogFile()
 
+    def _wakeUpWorker(self, pForce=False):
+        """Wake up worker to process changes immediately (can be called from any thread)"""
+        # worker polls regularly, changes are processed on next poll (extra ticks would make countdowns, which count
+        # ticks, e.g. restriction retries and session attribute verification, run faster than intended)
+        if (
+            not pForce
+            and self._timekprNextTickTimeout is not None
+            and self._timekprNextTickTimeout <= self._timekprConfig.getTimekprPollTime()
+        ):
+            return
+        # users are processed on the main loop
+        if self._timekprMainLoopWorker:
+            # request a tick, unless it's already requested
+            if not self._timekprWakeUpEvent.is_set():
+                # wake up
+                self._timekprWakeUpEvent.set()
+                # this is thread safe
+                GLib.idle_add(self._processMainLoopWakeUp)
+        else:
+            # wake up
+            self._timekprWakeUpEvent.set()
+
+    def _processPrepareForSleep(self, pStart):
+        """Account time before computer goes to sleep and right after it resumes (called from login manager)"""
+        # going to sleep
+        if pStart:
+            # worker releases sleep inhibitor after accounting
+            self._timekprSleepPending = True
+        # process users immediately
+        self._wakeUpWorker(pForce=True)
+
+    def _getNextTickWait(self, pTickStart):
+        """Get time to wait until next tick (None - wait until woken up)"""
+        # idle
+        if self._timekprNextTickTimeout is None:
+            return None
+        # try to do that exactly every 3 secs or until next deadline
+        return self._timekprNextTickTimeout - min(
+            time.time() - pTickStart, self._timekprConfig.getTimekprPollTime() / 2
+        )
+
+    def _calculateNextTickTimeout(self, pUserStats):
+        """Calculate time until next tick (adaptive polling sleeps until the nearest deadline of all users)"""
+        # poll time
+        pollTime = self._timekprConfig.getTimekprPollTime()
+        # max poll time
+        pollTimeMax = self._timekprConfig.getTimekprAdaptivePollTimeMax()
+        # nobody to track and login manager informs about new users and sessions, there is no need to wake up
+        if (
+            not self._timekprUserList
+            and not self._timekprUserRestrictionList
+            and self._timekprLoginManager.isSignalTrackingActive()
+        ):
+            # logging
+            log.log(cons.TK_LOG_LEVEL_INFO, "no users to track, worker is idle until users log in")
+            # idle
+            nextTickTimeout = None
+            self._timekprParked = True
+        # adaptive polling is disabled or restrictions are in progress (they are processed every poll)
+        elif pollTimeMax <= pollTime or len(self._timekprUserRestrictionList) > 0:
+            # regular poll
+            nextTickTimeout = pollTime
+        else:
+            # nearest deadline
+            nextTickTimeout = min([pollTimeMax] + [rUserStats[6] for rUserStats in pUserStats.values()])
+            # not more often than regular poll
+            nextTickTimeout = max(nextTickTimeout, pollTime)
+            # logging
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "adaptive polling, next tick in %i secs" % (nextTickTimeout))
+        # result
+        return nextTickTimeout
+
     def startTimekprDaemon(self):
         """Enable threading for all the tasks"""
         log.log(cons.TK_LOG_LEVEL_INFO, "start daemons")
 
         # set up main loop
         self._timekprMainLoopTh = threading.Thread(target=self.executeTimekprMain)
-        # set up worker
-        self._timekprWorkTh = threading.Thread(target=self.executeTimekprWorker)
 
-        # start both
-        self._timekprMainLoopTh.start()
-        self._timekprWorkTh.start()
+        # users are processed on the main loop (no data races with admin requests, no thread switching)
+        if self._timekprMainLoopWorker:
+            # first tick right after start
+            self._scheduleTimekprMainLoopTick(0)
+            # start main loop
+            self._timekprMainLoopTh.start()
+        else:
+            # set up worker
+            self._timekprWorkTh = threading.Thread(target=self.executeTimekprWorker)
+
+            # start both
+            self._timekprMainLoopTh.start()
+            self._timekprWorkTh.start()
 
         log.log(cons.TK_LOG_LEVEL_INFO, "finish daemons, timekpr started")
 
@@ -197,8 +410,12 @@ class timekprDaemon(dbus.service.Object):
         """Entry point for user management logic"""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start checkUsers")
 
+        # perf
+        perfStart = perfstats.startMeasurement()
         # get user list
         wasConnectionLost, userList = self._timekprLoginManager.getUserList()
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_GETUSERLIST, perfStart)
         # if we had a disaster, remove all users because connection to DBUS was lost
         if wasConnectionLost:
             # logging
@@ -210,6 +427,8 @@ class timekprDaemon(dbus.service.Object):
             for rUser in self._timekprUserList:
                 # remove from DBUS
                 self._timekprUserList[rUser].deInitUser()
+                # remove from save schedule
+                self._timekprPersistence.removeUser(rUser)
             # delete all users
             self._timekprUserList.clear()
             # delete termination list as well
@@ -217,8 +436,19 @@ class timekprDaemon(dbus.service.Object):
 
         # if global switch is enabled, we need to refresh processes at some iterval (method determines that by itself)
         if self._timekprConfig.getTimekprPlayTimeEnabled():
+            # perf
+            perfStart = perfstats.startMeasurement()
+            # users, which were evaluated as not needing PlayTime and whose state has not changed since, are skipped
+            skippedUids = set(
+                self._timekprUserList[rUserName].getUserId()
+                for rUserName, rStateGen in self._timekprPlayTimeSkippedUsers.items()
+                if rUserName in self._timekprUserList
+                and self._timekprUserList[rUserName].getUserStateGeneration() == rStateGen
+            )
             # refresh PT process list
-            self._timekprPlayTimeConfig.processPlayTimeActivities()
+            self._timekprPlayTimeConfig.processPlayTimeActivities(skippedUids)
+            # perf
+            perfstats.stopMeasurement(cons.TK_PERF_PROCESSPT, perfStart)
 
         # add new users to track
         for rUserName, userDict in userList.items():
@@ -254,6 +484,7 @@ class timekprDaemon(dbus.service.Object):
                     userDict[cons.TK_CTRL_UPATH],
                     self._timekprConfig,
                     self._timekprPlayTimeConfig,
+                    self._wakeUpWorker,
                 )
 
                 # init variables for user
@@ -272,6 +503,7 @@ class timekprDaemon(dbus.service.Object):
             # save everything for the user
             self._timekprUserList[rUserName].saveSpent()
             self._timekprUserList[rUserName].deInitUser()
+            self._timekprPersistence.removeUser(rUserName)
             # delete users that left
             self._timekprUserList.pop(rUserName)
             # remove if exists
@@ -279,174 +511,296 @@ class timekprDaemon(dbus.service.Object):
                 # delete from killing list as well
                 self._timekprUserRestrictionList.pop(rUserName)
 
-        # go through all users
+        # user and session state as it was before evaluation (changes from now on are detected on next tick)
+        userStateGens = {
+            rUserName: rUser.getUserStateGeneration() for rUserName, rUser in self._timekprUserList.items()
+        }
+        # evaluate all users (in parallel, if configured)
+        userStats = self._evaluateUsers()
+        # users, which do not need PlayTime processes inspected on next tick, unless their state changes in between
+        # (e.g. they are woken up or unlocked), new users are not known yet, so they are inspected
+        self._timekprPlayTimeSkippedUsers = {
+            rUserName: userStateGens[rUserName] for rUserName, rUserStats in userStats.items() if not rUserStats[7]
+        }
+
+        # go through all users and merge results into restrictions
         for rUserName in self._timekprUserList:
-            # init variables for user
-            self._timekprUserList[rUserName].refreshTimekprRuntimeVariables()
-
-            # adjust time spent
-            userActiveEffective, userActiveActual, userScreenLocked = self._timekprUserList[
-                rUserName
-            ].adjustTimeSpentActual(self._timekprConfig)
-            # recalculate time left
-            self._timekprUserList[rUserName].recalculateTimeLeft()
-            # process actual user session variable validation
-            self._timekprUserList[rUserName].revalidateUserSessionAttributes()
-
-            # get stats for user
-            timeLeftArray = self._timekprUserList[rUserName].getTimeLeft()
-            timeLeftToday = timeLeftArray[0]
-            timeLeftInARow = timeLeftArray[1]
-            timeHourUnaccounted = timeLeftArray[6]
-            timePTActivityCnt = 0
-
-            # PlayTime left validation
-            if self._timekprConfig.getTimekprPlayTimeEnabled():
-                # get time left for PLayTime
-                timeLeftPT, isPTEnabled, isPTAccounted, isPTActive = self._timekprUserList[rUserName].getPlayTimeLeft()
-                # enabled and active for user
-                if isPTEnabled and isPTActive:
-                    # if there is no time left (compare to almost ultimate answer)
-                    # or hour is unaccounted and PT is not allowed in those hours
-                    if (isPTAccounted and timeLeftPT < 0.0042) or (
-                        timeHourUnaccounted
-                        and not self._timekprUserList[rUserName].getUserPlayTimeUnaccountedIntervalsEnabled()
-                    ):
-                        # killing processes
-                        self._timekprPlayTimeConfig.killPlayTimeProcesses(self._timekprUserList[rUserName].getUserId())
-                    else:
-                        # active count
-                        timePTActivityCnt = self._timekprPlayTimeConfig.getMatchedUserProcessCnt(
-                            self._timekprUserList[rUserName].getUserId()
-                        )
-            # set process count (in case PT was disable in-flight or it has changed)
-            self._timekprUserList[rUserName].setPlayTimeActiveActivityCnt(timePTActivityCnt)
+            # process restrictions
+            self._processUserRestrictions(rUserName, userStats[rUserName])
 
-            # logging
-            log.log(
-                cons.TK_LOG_LEVEL_DEBUG,
-                'user "%s", active: %s/%s/%s (act/eff/lck), huacc: %s, tleft: %i'
-                % (
-                    rUserName,
-                    str(userActiveActual),
-                    str(userActiveEffective),
-                    str(userScreenLocked),
-                    str(timeHourUnaccounted),
-                    timeLeftInARow,
-                ),
-            )
+        # save users which are due (spread over save interval, all at once on day change)
+        self._timekprPersistence.processUsers(self._timekprUserList)
 
-            # process actions if user is in the restrictions list
-            if rUserName in self._timekprUserRestrictionList:
-                # (internal idle killing switch) + user is not active + there is a time available today (opposing to in a row)
-                if (
-                    (not userActiveActual and timeLeftToday > self._timekprConfig.getTimekprTerminationTime())
-                    or timeHourUnaccounted
-                ) and self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RESTY] in (
-                    cons.TK_CTRL_RES_T,
-                    cons.TK_CTRL_RES_D,
-                ):
-                    log.log(
-                        cons.TK_LOG_LEVEL_INFO,
-                        'SAVING user "%s" from ending his sessions / shutdown' % (rUserName),
-                    )
-                    # remove from death list
-                    self._timekprUserRestrictionList.pop(rUserName)
-                # if restricted time has passed for hard restrictions, we need to lift the restriction
-                elif (
-                    timeLeftInARow > self._timekprConfig.getTimekprTerminationTime() or timeHourUnaccounted
-                ) and self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RESTY] in (
-                    cons.TK_CTRL_RES_T,
-                    cons.TK_CTRL_RES_D,
-                ):
-                    log.log(
-                        cons.TK_LOG_LEVEL_INFO,
-                        'RELEASING terminate / shutdown from user "%s"' % (rUserName),
-                    )
-                    # remove from restriction list
-                    self._timekprUserRestrictionList.pop(rUserName)
-                # if restricted time has passed for soft restrictions, we need to lift the restriction
-                elif (
-                    timeLeftInARow > self._timekprConfig.getTimekprTerminationTime() or timeHourUnaccounted
-                ) and self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RESTY] in (
-                    cons.TK_CTRL_RES_L,
-                    cons.TK_CTRL_RES_S,
-                    cons.TK_CTRL_RES_W,
+        # calculate when the next tick is needed
+        self._timekprNextTickTimeout = self._calculateNextTickTimeout(userStats)
+
+        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish checkUsers")
+
+    def _evaluateUsers(self):
+        """Evaluate time spent / left for all users, in parallel if there are workers configured"""
+        # result
+        userStats = {}
+        # worker count
+        workerCnt = min(self._timekprConfig.getTimekprWorkerThreads(), len(self._timekprUserList))
+
+        # process one by one
+        if workerCnt <= 1:
+            # go through all users
+            for rUserName in self._timekprUserList:
+                # evaluate
+                userStats[rUserName] = self._evaluateUser(rUserName)
+        else:
+            # (re)create a pool if worker count has changed
+            if (
+                self._timekprWorkerPool is None
+                or self._timekprWorkerPoolSize != self._timekprConfig.getTimekprWorkerThreads()
+            ):
+                # shut down the old one
+                if self._timekprWorkerPool is not None:
+                    self._timekprWorkerPool.shutdown(wait=False)
+                # new pool
+                self._timekprWorkerPoolSize = self._timekprConfig.getTimekprWorkerThreads()
+                self._timekprWorkerPool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._timekprWorkerPoolSize, thread_name_prefix="timekpr-user"
+                )
+            # fan out work for all users
+            userFutures = {
+                rUserName: self._timekprWorkerPool.submit(self._evaluateUser, rUserName)
+                for rUserName in self._timekprUserList
+            }
+            # wait for all and collect the results (errors are raised here, as if they happened sequentially)
+            for rUserName, rFuture in userFutures.items():
+                # result
+                userStats[rUserName] = rFuture.result()
+
+        # result
+        return userStats
+
+    def _evaluateUser(self, pUserName):
+        """Adjust time spent and calculate time left for user (this can run in worker pool, PlayTime locks its own state)"""
+        # init variables for user
+        self._timekprUserList[pUserName].refreshTimekprRuntimeVariables()
+
+        # perf
+        perfStart = perfstats.startMeasurement()
+        # adjust time spent
+        userActiveEffective, userActiveActual, userScreenLocked = self._timekprUserList[
+            pUserName
+        ].adjustTimeSpentActual(self._timekprConfig)
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_ADJSPENT, perfStart, pUserName)
+        perfStart = perfstats.startMeasurement()
+        # recalculate time left
+        self._timekprUserList[pUserName].recalculateTimeLeft()
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_RECALCLEFT, perfStart, pUserName)
+        # process actual user session variable validation
+        self._timekprUserList[pUserName].revalidateUserSessionAttributes()
+
+        # perf
+        perfStart = perfstats.startMeasurement()
+        # get stats for user
+        timeLeftArray = self._timekprUserList[pUserName].getTimeLeft()
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_GETLEFT, perfStart, pUserName)
+        timeLeftToday = timeLeftArray[0]
+        timeLeftInARow = timeLeftArray[1]
+        timeHourUnaccounted = timeLeftArray[6]
+        timePTActivityCnt = 0
+        isPTInspected = False
+
+        # PlayTime left validation
+        if self._timekprConfig.getTimekprPlayTimeEnabled():
+            # get time left for PLayTime
+            timeLeftPT, isPTEnabled, isPTAccounted, isPTActive = self._timekprUserList[pUserName].getPlayTimeLeft()
+            # processes need to be inspected only for active users (even when time is over, processes have to be killed)
+            isPTInspected = isPTEnabled and userActiveActual
+            # enabled and active for user
+            if isPTEnabled and isPTActive:
+                # if there is no time left (compare to almost ultimate answer)
+                # or hour is unaccounted and PT is not allowed in those hours
+                if (isPTAccounted and timeLeftPT < 0.0042) or (
+                    timeHourUnaccounted
+                    and not self._timekprUserList[pUserName].getUserPlayTimeUnaccountedIntervalsEnabled()
                 ):
-                    log.log(
-                        cons.TK_LOG_LEVEL_INFO,
-                        'RELEASING lock / suspend from user "%s"' % (rUserName),
-                    )
-                    # remove from restriction list
-                    self._timekprUserRestrictionList.pop(rUserName)
-                # update restriction stats
+                    # killing processes
+                    self._timekprPlayTimeConfig.killPlayTimeProcesses(self._timekprUserList[pUserName].getUserId())
                 else:
-                    # update active states for restriction routines
-                    self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_USACT] = userActiveActual
-                    self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_USLCK] = userScreenLocked
-                    self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RTDEA] = max(
-                        self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RTDEA] - 1,
-                        0,
+                    # activities with their own limits, which are active and have no time left
+                    if isPTAccounted:
+                        # time left for activities
+                        timeLeftActivitiesPT = self._timekprUserList[pUserName].getPlayTimeActivitiesLeft()
+                        # active ones, which are over
+                        exhaustedActivitiesPT = [
+                            rAct
+                            for rAct in self._timekprPlayTimeConfig.getActiveUserLimitedActivities(
+                                self._timekprUserList[pUserName].getUserId()
+                            )
+                            if timeLeftActivitiesPT.get(rAct, 1) <= 0
+                        ]
+                        # killing processes of these activities
+                        if exhaustedActivitiesPT:
+                            self._timekprPlayTimeConfig.killPlayTimeProcesses(
+                                self._timekprUserList[pUserName].getUserId(), exhaustedActivitiesPT
+                            )
+                    # active count
+                    timePTActivityCnt = self._timekprPlayTimeConfig.getActiveUserProcessCnt(
+                        self._timekprUserList[pUserName].getUserId()
                     )
-                    # only if user is active / screen is not locked
-                    if (
-                        userActiveActual
-                        and self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RESTY]
-                        in (cons.TK_CTRL_RES_T, cons.TK_CTRL_RES_D)
-                    ) or (
-                        not userScreenLocked
-                        and self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RESTY]
-                        in (cons.TK_CTRL_RES_S, cons.TK_CTRL_RES_L, cons.TK_CTRL_RES_W)
-                    ):
-                        # update active states for restriction routines
-                        self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RTDEL] = max(
-                            self._timekprUserRestrictionList[rUserName][cons.TK_CTRL_RTDEL] - 1,
-                            0,
-                        )
+        # set process count (in case PT was disable in-flight or it has changed)
+        self._timekprUserList[pUserName].setPlayTimeActiveActivityCnt(timePTActivityCnt)
+
+        # logging
+        log.log(
+            cons.TK_LOG_LEVEL_DEBUG,
+            'user "%s", active: %s/%s/%s (act/eff/lck), huacc: %s, tleft: %i'
+            % (
+                pUserName,
+                str(userActiveActual),
+                str(userActiveEffective),
+                str(userScreenLocked),
+                str(timeHourUnaccounted),
+                timeLeftInARow,
+            ),
+        )
 
-            # ## FILL IN USER RESTRICTIONS ##
+        # result
+        return (
+            userActiveEffective,
+            userActiveActual,
+            userScreenLocked,
+            timeLeftToday,
+            timeLeftInARow,
+            timeHourUnaccounted,
+            self._timekprUserList[pUserName].getSecondsToNextEvent(userActiveActual),
+            isPTInspected,
+        )
 
-            # if user has very few time left, we need to enforce limits: Lock screen / Sleep computer / Shutdown computer / Terminate sessions
+    def _processUserRestrictions(self, pUserName, pUserStats):
+        """Process user restrictions based on evaluated user stats (this must run on worker thread)"""
+        # user stats
+        (
+            userActiveEffective,
+            userActiveActual,
+            userScreenLocked,
+            timeLeftToday,
+            timeLeftInARow,
+            timeHourUnaccounted,
+            secondsToNextEvent,
+            _isPTInspected,
+        ) = pUserStats
+
+        # process actions if user is in the restrictions list
+        if pUserName in self._timekprUserRestrictionList:
+            # (internal idle killing switch) + user is not active + there is a time available today (opposing to in a row)
             if (
-                timeLeftInARow <= self._timekprConfig.getTimekprTerminationTime()
-                and not timeHourUnaccounted
-                and rUserName not in self._timekprUserRestrictionList
-                and userActiveActual
+                (not userActiveActual and timeLeftToday > self._timekprConfig.getTimekprTerminationTime())
+                or timeHourUnaccounted
+            ) and self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RESTY] in (
+                cons.TK_CTRL_RES_T,
+                cons.TK_CTRL_RES_D,
+            ):
+                log.log(
+                    cons.TK_LOG_LEVEL_INFO,
+                    'SAVING user "%s" from ending his sessions / shutdown' % (pUserName),
+                )
+                # remove from death list
+                self._timekprUserRestrictionList.pop(pUserName)
+            # if restricted time has passed for hard restrictions, we need to lift the restriction
+            elif (
+                timeLeftInARow > self._timekprConfig.getTimekprTerminationTime() or timeHourUnaccounted
+            ) and self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RESTY] in (
+                cons.TK_CTRL_RES_T,
+                cons.TK_CTRL_RES_D,
+            ):
+                log.log(
+                    cons.TK_LOG_LEVEL_INFO,
+                    'RELEASING terminate / shutdown from user "%s"' % (pUserName),
+                )
+                # remove from restriction list
+                self._timekprUserRestrictionList.pop(pUserName)
+            # if restricted time has passed for soft restrictions, we need to lift the restriction
+            elif (
+                timeLeftInARow > self._timekprConfig.getTimekprTerminationTime() or timeHourUnaccounted
+            ) and self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RESTY] in (
+                cons.TK_CTRL_RES_L,
+                cons.TK_CTRL_RES_S,
+                cons.TK_CTRL_RES_W,
             ):
                 log.log(
-                    cons.TK_LOG_LEVEL_DEBUG,
-                    'INFO: user "%s" has got restrictions...' % (rUserName),
+                    cons.TK_LOG_LEVEL_INFO,
+                    'RELEASING lock / suspend from user "%s"' % (pUserName),
                 )
-                # add user to restrictions list
-                self._timekprUserRestrictionList[rUserName] = {
-                    cons.TK_CTRL_UPATH: self._timekprUserList[rUserName].getUserPathOnBus(),  # user path on dbus
-                    cons.TK_CTRL_FCNTD: max(
-                        timeLeftInARow, self._timekprConfig.getTimekprTerminationTime()
-                    ),  # final countdown
-                    cons.TK_CTRL_RESTY: self._timekprUserList[
-                        rUserName
-                    ].getUserLockoutType(),  # restricton type: lock, suspend, suspendwake, terminate, shutdown
-                    cons.TK_CTRL_RTDEL: 0,  # retry delay before next attempt to enforce restrictions
-                    cons.TK_CTRL_RTDEA: 0,  # retry delay (additional delay for lock in case of suspend)
-                    cons.TK_CTRL_USACT: userActiveActual,  # whether user is actually active
-                    cons.TK_CTRL_USLCK: userScreenLocked,  # whether user screen is locked
-                    cons.TK_CTRL_USWKU: (
-                        self._timekprUserList[rUserName].findNextAvailableIntervalStart()
-                        if self._timekprUserList[rUserName].getUserLockoutType() == cons.TK_CTRL_RES_W
-                        and timeLeftToday > timeLeftInARow
-                        else None
-                    ),
-                }
-                # in case this is first restriction we need to initiate restriction process
-                if len(self._timekprUserRestrictionList) == 1:
-                    # process users
-                    GLib.timeout_add_seconds(1, self._restrictUsers)
+                # remove from restriction list
+                self._timekprUserRestrictionList.pop(pUserName)
+            # update restriction stats
+            else:
+                # update active states for restriction routines
+                self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_USACT] = userActiveActual
+                self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_USLCK] = userScreenLocked
+                self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RTDEA] = max(
+                    self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RTDEA] - 1,
+                    0,
+                )
+                # only if user is active / screen is not locked
+                if (
+                    userActiveActual
+                    and self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RESTY]
+                    in (cons.TK_CTRL_RES_T, cons.TK_CTRL_RES_D)
+                ) or (
+                    not userScreenLocked
+                    and self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RESTY]
+                    in (cons.TK_CTRL_RES_S, cons.TK_CTRL_RES_L, cons.TK_CTRL_RES_W)
+                ):
+                    # update active states for restriction routines
+                    self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RTDEL] = max(
+                        self._timekprUserRestrictionList[pUserName][cons.TK_CTRL_RTDEL] - 1,
+                        0,
+                    )
 
-        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish checkUsers")
+        # ## FILL IN USER RESTRICTIONS ##
+
+        # if user has very few time left, we need to enforce limits: Lock screen / Sleep computer / Shutdown computer / Terminate sessions
+        if (
+            timeLeftInARow <= self._timekprConfig.getTimekprTerminationTime()
+            and not timeHourUnaccounted
+            and pUserName not in self._timekprUserRestrictionList
+            and userActiveActual
+        ):
+            log.log(
+                cons.TK_LOG_LEVEL_DEBUG,
+                'INFO: user "%s" has got restrictions...' % (pUserName),
+            )
+            # add user to restrictions list
+            self._timekprUserRestrictionList[pUserName] = {
+                cons.TK_CTRL_UPATH: self._timekprUserList[pUserName].getUserPathOnBus(),  # user path on dbus
+                cons.TK_CTRL_FCNTD: max(
+                    timeLeftInARow, self._timekprConfig.getTimekprTerminationTime()
+                ),  # final countdown
+                cons.TK_CTRL_RESTY: self._timekprUserList[
+                    pUserName
+                ].getUserLockoutType(),  # restricton type: lock, suspend, suspendwake, terminate, shutdown
+                cons.TK_CTRL_RTDEL: 0,  # retry delay before next attempt to enforce restrictions
+                cons.TK_CTRL_RTDEA: 0,  # retry delay (additional delay for lock in case of suspend)
+                cons.TK_CTRL_USACT: userActiveActual,  # whether user is actually active
+                cons.TK_CTRL_USLCK: userScreenLocked,  # whether user screen is locked
+                cons.TK_CTRL_USWKU: (
+                    self._timekprUserList[pUserName].findNextAvailableIntervalStart()
+                    if self._timekprUserList[pUserName].getUserLockoutType() == cons.TK_CTRL_RES_W
+                    and timeLeftToday > timeLeftInARow
+                    else None
+                ),
+            }
+            # in case this is first restriction we need to initiate restriction process
+            if len(self._timekprUserRestrictionList) == 1:
+                # process users
+                GLib.timeout_add_seconds(1, self._restrictUsers)
 
     def _restrictUsers(self):
         """Terminate user sessions"""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start user killer")
+        # perf
+        perfStart = perfstats.startMeasurement()
 
         # final warn
         def _processFinalWarning(pUserName, pFinalNotificationType, pSecondsLeft):
@@ -696,6 +1050,9 @@ class timekprDaemon(dbus.service.Object):
             "RESTRICTIONS, completed with: %s" % (str(len(self._timekprUserRestrictionList) > 0)),
         )
 
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_RESTRICT, perfStart)
+
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish user killer")
 
         # return whether to keep trying to enforce restrictions
@@ -797,6 +1154,8 @@ class timekprDaemon(dbus.service.Object):
         if pUserName in self._timekprUserList:
             # pass this to actual method
             self._timekprUserList[pUserName].processUserSessionAttributes(pWhat, pKey, pValue)
+            # deadlines may have changed, process user immediately
+            self._wakeUpWorker()
 
             # result
             result = 0
@@ -891,6 +1250,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -927,6 +1288,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -957,6 +1320,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -988,6 +1353,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1019,6 +1386,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1052,6 +1421,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1080,6 +1451,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1108,6 +1481,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1142,6 +1517,8 @@ class timekprDaemon(dbus.service.Object):
                 self._timekprUserList[pUserName].adjustTimeSpentFromControl(
                     pSilent=False, pPreserveSpent=(pOperation != "=")
                 )
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1175,6 +1552,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1208,6 +1587,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1241,6 +1622,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1271,6 +1654,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1301,6 +1686,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1330,6 +1717,8 @@ class timekprDaemon(dbus.service.Object):
             if pUserName in self._timekprUserList:
                 # inform the user immediately
                 self._timekprUserList[pUserName].adjustLimitsFromConfig(False)
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1364,6 +1753,8 @@ class timekprDaemon(dbus.service.Object):
                 self._timekprUserList[pUserName].adjustTimeSpentFromControl(
                     pSilent=False, pPreserveSpent=(pOperation != "=")
                 )
+                # deadlines may have changed, process user immediately
+                self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1405,6 +1796,31 @@ class timekprDaemon(dbus.service.Object):
         # result
         return result, message, timekprConfig
 
+    @dbus.service.method(cons.TK_DBUS_ADMIN_INTERFACE, in_signature="", out_signature="isa{sa{sd}}")
+    def getTimekprPerfStats(self):
+        """Get performance stats (execution times in seconds of daemon processing phases) from server"""
+        # default
+        perfStats = {}
+        try:
+            # get stats
+            perfStats = perfstats.getPerfStats()
+            # result
+            result = 0
+            message = ""
+        except Exception as unexpectedException:
+            # logging
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "Unexpected ERROR (%s): %s" % (misc.whoami(), str(unexpectedException)),
+            )
+
+            # result
+            result = -1
+            message = msg.getTranslation("TK_MSG_CONFIG_LOADER_UNEXPECTED_ERROR")
+
+        # result
+        return result, message, perfStats
+
     # --------------- server admin set methods accessible by privileged users (root and all in timekpr group) --------------- #
 
     @dbus.service.method(cons.TK_DBUS_ADMIN_INTERFACE, in_signature="i", out_signature="is")
@@ -1420,6 +1836,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprLogLevel(pLogLevel)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
             # set it effective immediately
             log.setLogLevel(pLogLevel)
         except Exception as unexpectedException:
@@ -1449,6 +1867,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprPollTime(pPollTimeSecs)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1476,6 +1896,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprSaveTime(pSaveTimeSecs)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1503,6 +1925,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprTrackInactive(pTrackInactive)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1532,6 +1956,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprTerminationTime(pTerminationTimeSecs)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1559,6 +1985,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprFinalWarningTime(pFinalWarningTimeSecs)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1588,6 +2016,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprFinalNotificationTime(pFinalNotificationTimeSecs)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1615,6 +2045,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprSessionsCtrl(pSessionsCtrl)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1643,6 +2075,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprSessionsExcl(pSessionsExcl)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1673,6 +2107,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprUsersExcl(pUsersExcl)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1699,6 +2135,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprPlayTimeEnabled(pPlayTimeEnabled)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
@@ -1727,6 +2165,8 @@ class timekprDaemon(dbus.service.Object):
 
             # set in memory as well
             self._timekprConfig.setTimekprPlayTimeEnhancedActivityMonitorEnabled(pPlayTimeAdvancedSearchEnabled)
+            # process users with new configuration (worker may be idle)
+            self._wakeUpWorker()
         except Exception as unexpectedException:
             # logging
             log.log(
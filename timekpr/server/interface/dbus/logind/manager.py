@@ -6,7 +6,9 @@ Created on Aug 28, 2018
 
 # import section
 import dbus
+import os
 import time
+import threading
 from gi.repository import GLib
 
 # timekpr imports
@@ -28,6 +30,22 @@ class timekprUserLoginManager(object):
         self._loginManagerVTNr = None
         self._loginManagerVTNrRetries = 0
         self._connectionRetryCount = 0
+        # login1 signal subscriptions
+        self._login1SignalMatches = []
+        # registry of logged in users maintained from login1 signals
+        self._loggedInUsers = {}
+        self._loggedInUsersLock = threading.Lock()
+        # registry change generation (advanced by every signal) and resync indicators
+        self._loggedInUsersGen = 0
+        self._loggedInUsersResyncNeeded = True
+        self._loggedInUsersLastResync = None
+        # callback which is called when users or sessions change (so changes can be processed immediately)
+        self._wakeUpCallback = None
+        # callback which is called when computer is going to sleep or resumes
+        self._sleepCallback = None
+        # sleep delay inhibitor (file descriptor), it gives a chance to account time before computer goes to sleep
+        self._sleepInhibitorFd = None
+        self._sleepInhibitorLock = threading.Lock()
 
         # dbus initialization
         self._timekprBus = dbus.SystemBus()
@@ -69,6 +87,9 @@ class timekprUserLoginManager(object):
 
             log.log(cons.TK_LOG_LEVEL_DEBUG, "got interface, login1 successfully set up")
 
+            # (re)subscribe to user / session changes
+            self._subscribeToLogin1Signals()
+
             # reset retries
             self._connectionRetryCount = 0
         except Exception as exc:
@@ -108,10 +129,242 @@ class timekprUserLoginManager(object):
         # pass back the result
         return wasConnectionLost, loggedInUsersDBUS
 
-    def getUserList(self, pSilent=False):
-        """Go through a list of logged in users"""
-        (log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start getUserList") if not pSilent else True)
+    def _subscribeToLogin1Signals(self):
+        """Subscribe to login1 user and session signals which keep user registry up to date"""
+        # remove previous subscriptions (in case of reconnect)
+        for rMatch in self._login1SignalMatches:
+            # remove
+            try:
+                rMatch.remove()
+            except Exception:
+                # it's gone already
+                pass
+        # clear
+        self._login1SignalMatches = []
+
+        # signals and their handlers
+        for rSignal, rHandler in (
+            ("UserNew", self._processUserNew),
+            ("UserRemoved", self._processUserRemoved),
+            ("SessionNew", self._processSessionNew),
+            ("SessionRemoved", self._processSessionRemoved),
+            ("PrepareForSleep", self._processPrepareForSleep),
+        ):
+            # subscribe
+            self._login1SignalMatches.append(
+                self._timekprBus.add_signal_receiver(
+                    rHandler,
+                    signal_name=rSignal,
+                    dbus_interface=cons.TK_DBUS_L1_MANAGER_INTERFACE,
+                    bus_name=cons.TK_DBUS_L1_OBJECT,
+                    path=cons.TK_DBUS_L1_PATH,
+                )
+            )
 
+        # whatever was in the registry, it needs to be verified
+        self._requestUserListResync()
+        # previous inhibitor may not be valid anymore
+        self.releaseSleepInhibitor()
+        # take new one
+        self._acquireSleepInhibitor()
+
+    def isSignalTrackingActive(self):
+        """Return whether users and sessions are tracked by login1 signals (changes are informed via wake up callback)"""
+        # result
+        return len(self._login1SignalMatches) > 0 and self._wakeUpCallback is not None
+
+    def setWakeUpCallback(self, pWakeUpCallback):
+        """Set callback which is called when users or sessions change"""
+        # save
+        self._wakeUpCallback = pWakeUpCallback
+
+    def _wakeUp(self):
+        """Inform about changes in users or sessions"""
+        # call back
+        if self._wakeUpCallback is not None:
+            self._wakeUpCallback()
+
+    def setSleepCallback(self, pSleepCallback):
+        """Set callback which is called when computer is going to sleep or resumes"""
+        # save
+        self._sleepCallback = pSleepCallback
+
+    def _acquireSleepInhibitor(self):
+        """Take sleep delay inhibitor lock, so time can be accounted right before computer goes to sleep"""
+        # lock
+        with self._sleepInhibitorLock:
+            # already taken
+            if self._sleepInhibitorFd is not None:
+                return
+            try:
+                # inhibit (delay only, sleep is not blocked)
+                self._sleepInhibitorFd = self._login1ManagerInterface.Inhibit(
+                    "sleep", "Timekpr-nEXT", "Accounting time spent before sleep", "delay"
+                ).take()
+                # logging
+                log.log(cons.TK_LOG_LEVEL_DEBUG, "sleep delay inhibitor taken")
+            except Exception as exc:
+                # logging
+                log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: error taking sleep delay inhibitor: %s" % (exc))
+
+    def releaseSleepInhibitor(self):
+        """Release sleep delay inhibitor lock (computer is allowed to go to sleep)"""
+        # lock
+        with self._sleepInhibitorLock:
+            # not taken
+            if self._sleepInhibitorFd is None:
+                return
+            try:
+                # release
+                os.close(self._sleepInhibitorFd)
+                # logging
+                log.log(cons.TK_LOG_LEVEL_DEBUG, "sleep delay inhibitor released")
+            except OSError:
+                # it's gone already
+                pass
+            # reset
+            self._sleepInhibitorFd = None
+
+    def _processPrepareForSleep(self, pStart):
+        """Process login1 PrepareForSleep signal (computer is going to sleep or resumed)"""
+        # logging
+        log.log(
+            cons.TK_LOG_LEVEL_INFO,
+            "INFO: computer is %s" % ("going to sleep" if pStart else "resuming from sleep"),
+        )
+        # resumed, take inhibitor for next sleep
+        if not pStart:
+            # take
+            self._acquireSleepInhibitor()
+        # inform
+        if self._sleepCallback is not None:
+            # call back (callback is responsible to release inhibitor when going to sleep)
+            self._sleepCallback(bool(pStart))
+        # nobody to inform
+        elif pStart:
+            # do not delay sleep
+            self.releaseSleepInhibitor()
+
+    def _requestUserListResync(self):
+        """Mark user registry as out of sync, next getUserList will re-read it from login1"""
+        # lock
+        with self._loggedInUsersLock:
+            # advance generation and request resync
+            self._loggedInUsersGen += 1
+            self._loggedInUsersResyncNeeded = True
+
+    def _processUserNew(self, pUID, pUserPath):
+        """Process login1 UserNew signal (executed in main loop)"""
+        # def
+        userName = None
+        # user name is not part of the signal, ask login1 for it
+        try:
+            # dbus performance measurement
+            misc.measureDBUSTimeElapsed(pStart=True)
+            # get user name
+            userName = str(
+                dbus.Interface(
+                    self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, pUserPath),
+                    cons.TK_DBUS_PROPERTIES_INTERFACE,
+                ).Get(cons.TK_DBUS_USER_OBJECT, "Name")
+            )
+            # measurement logging
+            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_USER_OBJECT)
+        except Exception as exc:
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                'ERROR: error getting user name for "%s" from DBUS, will resync: %s' % (str(pUserPath), exc),
+            )
+
+        # we could not get the name, resync the whole list
+        if userName is None:
+            # resync
+            self._requestUserListResync()
+        else:
+            # lock
+            with self._loggedInUsersLock:
+                # add user to registry
+                self._loggedInUsers[userName] = {
+                    cons.TK_CTRL_UID: str(int(pUID)),
+                    cons.TK_CTRL_UNAME: userName,
+                    cons.TK_CTRL_UPATH: str(pUserPath),
+                }
+                # advance generation
+                self._loggedInUsersGen += 1
+            # logging
+            log.log(cons.TK_LOG_LEVEL_DEBUG, "login1 signal: user %s (%s) logged in" % (userName, str(int(pUID))))
+        # process changes
+        self._wakeUp()
+
+    def _processUserRemoved(self, pUID, pUserPath):
+        """Process login1 UserRemoved signal (executed in main loop)"""
+        # user path as string
+        userPath = str(pUserPath)
+        # lock
+        with self._loggedInUsersLock:
+            # remove user from the registry
+            for rUserName in [
+                rName for rName, rUser in self._loggedInUsers.items() if rUser[cons.TK_CTRL_UPATH] == userPath
+            ]:
+                # remove
+                self._loggedInUsers.pop(rUserName)
+            # advance generation
+            self._loggedInUsersGen += 1
+        # logging
+        log.log(cons.TK_LOG_LEVEL_DEBUG, "login1 signal: user with UID %s logged out" % (str(int(pUID))))
+        # process changes
+        self._wakeUp()
+
+    def _processSessionNew(self, pSessionId, pSessionPath):
+        """Process login1 SessionNew signal (executed in main loop)"""
+        # def
+        userPath = None
+        # user of the session is not part of the signal, ask login1 for it
+        try:
+            # dbus performance measurement
+            misc.measureDBUSTimeElapsed(pStart=True)
+            # get user (uid, path)
+            userPath = str(
+                dbus.Interface(
+                    self._timekprBus.get_object(cons.TK_DBUS_L1_OBJECT, pSessionPath),
+                    cons.TK_DBUS_PROPERTIES_INTERFACE,
+                ).Get(cons.TK_DBUS_SESSION_OBJECT, "User")[1]
+            )
+            # measurement logging
+            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_SESSION_OBJECT)
+        except Exception as exc:
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                'ERROR: error getting user for session "%s" from DBUS, will resync: %s' % (str(pSessionPath), exc),
+            )
+        # lock
+        with self._loggedInUsersLock:
+            # session belongs to a known user (user list does not change, new users are signalled by UserNew)
+            isUserKnown = userPath is not None and any(
+                rUser[cons.TK_CTRL_UPATH] == userPath for rUser in self._loggedInUsers.values()
+            )
+        # session can not be matched to a known user, resync the whole list
+        if not isUserKnown:
+            # resync
+            self._requestUserListResync()
+        # logging
+        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "login1 signal: session %s started" % (str(pSessionId)))
+        # process changes
+        self._wakeUp()
+
+    def _processSessionRemoved(self, pSessionId, pSessionPath):
+        """Process login1 SessionRemoved signal (executed in main loop)"""
+        # user list does not change (users, which leave, are signalled by UserRemoved), periodic resync covers the rest
+        log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "login1 signal: session %s removed" % (str(pSessionId)))
+        # process changes
+        self._wakeUp()
+
+    def _resyncUserList(self):
+        """Re-read the whole user list from login1 into the registry"""
+        # generation at start of resync
+        with self._loggedInUsersLock:
+            # save gen
+            resyncGen = self._loggedInUsersGen
         # get user list
         wasConnectionLost, loggedInUsersDBUS = self._listUsers()
         loggedInUsers = {}
@@ -125,6 +378,43 @@ class timekprUserLoginManager(object):
                 cons.TK_CTRL_UPATH: str(rUser[2]),
             }
 
+        # lock
+        with self._loggedInUsersLock:
+            # replace registry
+            self._loggedInUsers = loggedInUsers
+            self._loggedInUsersLastResync = time.monotonic()
+            # if signals arrived during the resync, the list may already be outdated (signals are applied to registry, but it was just replaced)
+            self._loggedInUsersResyncNeeded = resyncGen != self._loggedInUsersGen
+
+        # result
+        return wasConnectionLost
+
+    def getUserList(self, pSilent=False):
+        """Go through a list of logged in users"""
+        (log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start getUserList") if not pSilent else True)
+
+        # def
+        wasConnectionLost = False
+        # lock
+        with self._loggedInUsersLock:
+            # registry is maintained by signals, but it has to be read from login1 initially, on request and once in a while
+            resyncNeeded = (
+                self._loggedInUsersResyncNeeded
+                or self._loggedInUsersLastResync is None
+                or time.monotonic() - self._loggedInUsersLastResync >= cons.TK_LOGIN1_RESYNC_INTERVAL
+            )
+        # resync
+        if resyncNeeded:
+            # logging
+            (log.log(cons.TK_LOG_LEVEL_DEBUG, "resyncing user list from login1") if not pSilent else True)
+            # get user list
+            wasConnectionLost = self._resyncUserList()
+
+        # lock
+        with self._loggedInUsersLock:
+            # copy users from registry
+            loggedInUsers = {rUserName: rUser.copy() for rUserName, rUser in self._loggedInUsers.items()}
+
         # in case debug
         if not pSilent and log.isDebugEnabled():
             # get all properties
@@ -6,6 +6,9 @@ Created on Aug 28, 2018.
 
 # import section
 import dbus
+import functools
+import threading
+import time
 
 # timekpr imports
 from timekpr.common.constants import constants as cons
@@ -16,12 +19,21 @@ from timekpr.common.utils import misc
 class timekprUserManager(object):
     """A connection with login1 and other DBUS servers."""
 
-    def __init__(self, pUserName, pUserPathOnBus):
+    # session list signals are subscribed once for all users and routed to the user who owns the session
+    _sessionSignalMatches = []
+    # users who receive session list changes (user path on bus -> user manager)
+    _sessionSignalUsers = {}
+    # users are added and removed by worker, signals are processed in main loop
+    _sessionSignalLock = threading.Lock()
+
+    def __init__(self, pUserName, pUserPathOnBus, pWakeUpCallback=None):
         """Initialize manager."""
 
         # save the bus and user
         self._timekprBus = dbus.SystemBus()
         self._userName = pUserName
+        # callback which is called when user state changes (so changes can be processed immediately)
+        self._wakeUpCallback = pWakeUpCallback
 
         # dbus performance measurement
         misc.measureDBUSTimeElapsed(pStart=True)
@@ -40,18 +52,265 @@ class timekprUserManager(object):
         # user sessions & additional DBUS objects
         self._timekprUserSessions = {}
         self._timekprUserObjects = {}
+        # user properties (sessions have their own)
+        self._timekprUserProperties = {}
+
+        # property cache is updated from signals (main loop) and read by worker, hence the lock
+        self._timekprCacheLock = threading.Lock()
+        # cache change generation (advanced by every signal) and resync indicators
+        self._timekprCacheGen = 0
+        self._sessionListResyncNeeded = True
+        self._propertiesResyncNeeded = True
+        self._lastPropertiesResync = None
+        # signal subscriptions for user
+        self._timekprUserSignalMatches = []
 
         # get user ID
         self._userId = int(self._login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "UID"))
         self._scrRetryCnt = 0
         self._sessionLockedStateAvailable = None
 
-    def cacheUserSessionList(self):
+        # subscribe to property and session changes
+        self._subscribeToUserSignals(pUserPathOnBus)
+
+    def _subscribeToUserSignals(self, pUserPathOnBus):
+        """Subscribe to user property changes and session list changes"""
+        # user properties
+        self._timekprUserSignalMatches.append(
+            self._timekprBus.add_signal_receiver(
+                self._processUserPropertiesChanged,
+                signal_name="PropertiesChanged",
+                dbus_interface=cons.TK_DBUS_PROPERTIES_INTERFACE,
+                bus_name=cons.TK_DBUS_L1_OBJECT,
+                path=pUserPathOnBus,
+            )
+        )
+        # session list changes are routed to the user who owns the session
+        self._userPathOnBus = pUserPathOnBus
+        # lock
+        with timekprUserManager._sessionSignalLock:
+            # register user
+            timekprUserManager._sessionSignalUsers[pUserPathOnBus] = self
+            # the first user subscribes for everyone
+            if not timekprUserManager._sessionSignalMatches:
+                # signals and their handlers
+                for rSignal, rHandler in (
+                    ("SessionNew", timekprUserManager._processSessionNew),
+                    ("SessionRemoved", timekprUserManager._processSessionRemoved),
+                ):
+                    # subscribe
+                    timekprUserManager._sessionSignalMatches.append(
+                        self._timekprBus.add_signal_receiver(
+                            rHandler,
+                            signal_name=rSignal,
+                            dbus_interface=cons.TK_DBUS_L1_MANAGER_INTERFACE,
+                            bus_name=cons.TK_DBUS_L1_OBJECT,
+                            path=cons.TK_DBUS_L1_PATH,
+                        )
+                    )
+
+    def _removeSignalMatch(self, pMatch):
+        """Remove signal subscription"""
+        # remove
+        try:
+            pMatch.remove()
+        except Exception:
+            # it's gone already
+            pass
+
+    def deInitUser(self):
+        """Remove all signal subscriptions for user and its sessions"""
+        # lock
+        with timekprUserManager._sessionSignalLock:
+            # unregister user (user may have been registered again by a newer manager)
+            if timekprUserManager._sessionSignalUsers.get(self._userPathOnBus) is self:
+                timekprUserManager._sessionSignalUsers.pop(self._userPathOnBus)
+            # the last user unsubscribes
+            if not timekprUserManager._sessionSignalUsers:
+                # session list signals
+                for rMatch in timekprUserManager._sessionSignalMatches:
+                    # remove
+                    self._removeSignalMatch(rMatch)
+                # clear
+                timekprUserManager._sessionSignalMatches = []
+        # lock
+        with self._timekprCacheLock:
+            # user signals
+            for rMatch in self._timekprUserSignalMatches:
+                # remove
+                self._removeSignalMatch(rMatch)
+            # session signals
+            for rSessionId in self._timekprUserSessions:
+                # remove
+                self._removeSignalMatch(self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_SIG])
+            # clear
+            self._timekprUserSignalMatches = []
+            self._timekprUserSessions.clear()
+
+    def _normalizeProperties(self, pProperties, pTargetProperties):
+        """Convert properties from DBUS to python types and save only those we need"""
+        # loop through properties
+        for rKey, rValue in pProperties.items():
+            # key
+            key = str(rKey)
+            # strings
+            if key in ("Type", "State"):
+                pTargetProperties[key] = str(rValue)
+            # booleans
+            elif key in ("IdleHint", "LockedHint", "Active"):
+                pTargetProperties[key] = bool(rValue)
+            # VT
+            elif key == "VTNr":
+                pTargetProperties[key] = str(int(rValue))
+            # seat (id, path)
+            elif key == "Seat":
+                pTargetProperties[key] = str(rValue[0])
+
+    def _wakeUp(self):
+        """Inform about changes in user or session state"""
+        # call back
+        if self._wakeUpCallback is not None:
+            self._wakeUpCallback()
+
+    def _processUserPropertiesChanged(self, pInterface, pChangedProperties, pInvalidatedProperties):
+        """Process PropertiesChanged signal for user (executed in main loop)"""
+        # we need only user properties
+        if str(pInterface) == cons.TK_DBUS_USER_OBJECT:
+            # lock
+            with self._timekprCacheLock:
+                # apply changes
+                self._normalizeProperties(pChangedProperties, self._timekprUserProperties)
+                # invalidated properties are not sent, they have to be re-read
+                self._propertiesResyncNeeded = self._propertiesResyncNeeded or len(pInvalidatedProperties) > 0
+                # advance generation
+                self._timekprCacheGen += 1
+            # process changes
+            self._wakeUp()
+
+    def _processSessionPropertiesChanged(self, pSessionId, pInterface, pChangedProperties, pInvalidatedProperties):
+        """Process PropertiesChanged signal for session (executed in main loop)"""
+        # we need only session properties
+        if str(pInterface) == cons.TK_DBUS_SESSION_OBJECT:
+            # lock
+            with self._timekprCacheLock:
+                # session may be gone already
+                if pSessionId in self._timekprUserSessions:
+                    # properties
+                    sessionProperties = self._timekprUserSessions[pSessionId][cons.TK_CTRL_DBUS_SESS_PROP]
+                    # apply changes
+                    self._normalizeProperties(pChangedProperties, sessionProperties)
+                    # login1 does not emit changes for State, but it's derived from Active (unless session is closing)
+                    if "Active" in pChangedProperties and sessionProperties.get("State") != "closing":
+                        # derive state
+                        sessionProperties["State"] = "active" if sessionProperties["Active"] else "online"
+                    # invalidated properties are not sent, they have to be re-read
+                    self._propertiesResyncNeeded = self._propertiesResyncNeeded or len(pInvalidatedProperties) > 0
+                    # advance generation
+                    self._timekprCacheGen += 1
+                    # logging
+                    log.log(
+                        cons.TK_LOG_LEVEL_EXTRA_DEBUG,
+                        "session %s properties changed: %s" % (pSessionId, str(sessionProperties)),
+                    )
+            # process changes
+            self._wakeUp()
+
+    @classmethod
+    def _processSessionNew(cls, pSessionId, pSessionPath):
+        """Process login1 SessionNew signal, route it to the user who owns the session (executed in main loop)"""
+        # def
+        userPath = None
+        # user of the session is not part of the signal, ask login1 for it
+        try:
+            # dbus performance measurement
+            misc.measureDBUSTimeElapsed(pStart=True)
+            # get user (uid, path)
+            userPath = str(
+                dbus.Interface(
+                    dbus.SystemBus().get_object(cons.TK_DBUS_L1_OBJECT, pSessionPath),
+                    cons.TK_DBUS_PROPERTIES_INTERFACE,
+                ).Get(cons.TK_DBUS_SESSION_OBJECT, "User")[1]
+            )
+            # measurement logging
+            misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_SESSION_OBJECT)
+        except Exception as exc:
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                'ERROR: error getting user for session "%s" from DBUS, all users will resync: %s'
+                % (str(pSessionPath), exc),
+            )
+        # lock
+        with cls._sessionSignalLock:
+            # owner is not known, every user re-reads its sessions
+            if userPath is None:
+                users = list(cls._sessionSignalUsers.values())
+            # owner (session may belong to user who is not tracked)
+            else:
+                users = [cls._sessionSignalUsers[userPath]] if userPath in cls._sessionSignalUsers else []
+        # process
+        for rUser in users:
+            # session list changed
+            rUser._processSessionListChanged(pSessionId, pSessionPath)
+
+    @classmethod
+    def _processSessionRemoved(cls, pSessionId, pSessionPath):
+        """Process login1 SessionRemoved signal, route it to the user who has the session (executed in main loop)"""
+        # lock
+        with cls._sessionSignalLock:
+            # users
+            users = list(cls._sessionSignalUsers.values())
+        # session id
+        sessionId = str(pSessionId)
+        # process
+        for rUser in users:
+            # user has this session
+            if rUser._isSessionCached(sessionId):
+                # session list changed
+                rUser._processSessionListChanged(pSessionId, pSessionPath)
+
+    def _isSessionCached(self, pSessionId):
+        """Return whether session is cached for user"""
+        # lock
+        with self._timekprCacheLock:
+            # result
+            return pSessionId in self._timekprUserSessions
+
+    def _processSessionListChanged(self, pSessionId, pSessionPath):
+        """Process SessionNew / SessionRemoved signal for session of this user (executed in main loop)"""
+        # lock
+        with self._timekprCacheLock:
+            # session list has to be re-read
+            self._sessionListResyncNeeded = True
+            # advance generation
+            self._timekprCacheGen += 1
+        # process changes
+        self._wakeUp()
+
+    def _getAllProperties(self, pPropertiesInterface, pInterfaceName):
+        """Get all properties of the object in one call"""
+        # properties
+        properties = {}
+        # dbus performance measurement
+        misc.measureDBUSTimeElapsed(pStart=True)
+        # get all properties
+        self._normalizeProperties(pPropertiesInterface.GetAll(pInterfaceName), properties)
+        # measurement logging
+        misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=pInterfaceName)
+        # result
+        return properties
+
+    def cacheUserSessionList(self, pResyncProperties=False):
         """Determine user sessions and cache session objects for further reference."""
         log.log(
             cons.TK_LOG_LEVEL_EXTRA_DEBUG,
             '---=== start cacheUserSessionList for "%s" ===---' % (self._userName),
         )
+        # lock
+        with self._timekprCacheLock:
+            # changes which arrive from now on will be caught by the next resync
+            cacheGen = self._timekprCacheGen
+            self._sessionListResyncNeeded = False
+
         # dbus performance measurement
         misc.measureDBUSTimeElapsed(pStart=True)
         # get all user sessions
@@ -71,6 +330,15 @@ class timekprUserManager(object):
                 ),
             )
 
+        # re-read user properties too
+        if pResyncProperties:
+            # get all
+            userProperties = self._getAllProperties(self._login1UserInterface, cons.TK_DBUS_USER_OBJECT)
+            # lock
+            with self._timekprCacheLock:
+                # replace
+                self._timekprUserProperties = userProperties
+
         # init active sessions
         activeSessions = []
 
@@ -109,39 +377,112 @@ class timekprUserManager(object):
                 # measurement logging
                 misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=cons.TK_DBUS_SESSION_OBJECT)
 
-                # cache sessions
-                self._timekprUserSessions[sessionId] = {
-                    cons.TK_CTRL_DBUS_SESS_OBJ: sessionObject,
-                    cons.TK_CTRL_DBUS_SESS_IF: sessionInterface,
-                    cons.TK_CTRL_DBUS_SESS_PROP_IF: sessionPropertiesInterface,
-                    cons.TK_CTRL_DBUS_SESS_PROP: {},
-                }
-
-                # add static properties
-                self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP]["VTNr"] = str(
-                    int(sessionPropertiesInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "VTNr"))
-                )
-                self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP]["Seat"] = str(
-                    sessionPropertiesInterface.Get(cons.TK_DBUS_SESSION_OBJECT, "Seat")[0]
+                # subscribe to changes before reading properties, so nothing is lost in between
+                sessionSignalMatch = self._timekprBus.add_signal_receiver(
+                    functools.partial(self._processSessionPropertiesChanged, sessionId),
+                    signal_name="PropertiesChanged",
+                    dbus_interface=cons.TK_DBUS_PROPERTIES_INTERFACE,
+                    bus_name=cons.TK_DBUS_L1_OBJECT,
+                    path=sessionPath,
                 )
+
+                # get all properties
+                try:
+                    sessionProperties = self._getAllProperties(sessionPropertiesInterface, cons.TK_DBUS_SESSION_OBJECT)
+                except Exception as exc:
+                    # session most likely is gone
+                    log.log(
+                        cons.TK_LOG_LEVEL_INFO,
+                        'ERROR: error getting session properties for session "%s" DBUS: %s' % (sessionPath, exc),
+                    )
+                    # remove subscription
+                    self._removeSignalMatch(sessionSignalMatch)
+                    # this session will not be used
+                    activeSessions.remove(sessionId)
+                    continue
+
+                # lock
+                with self._timekprCacheLock:
+                    # cache sessions
+                    self._timekprUserSessions[sessionId] = {
+                        cons.TK_CTRL_DBUS_SESS_OBJ: sessionObject,
+                        cons.TK_CTRL_DBUS_SESS_IF: sessionInterface,
+                        cons.TK_CTRL_DBUS_SESS_PROP_IF: sessionPropertiesInterface,
+                        cons.TK_CTRL_DBUS_SESS_PROP: sessionProperties,
+                        cons.TK_CTRL_DBUS_SESS_SIG: sessionSignalMatch,
+                    }
             else:
                 log.log(cons.TK_LOG_LEVEL_DEBUG, "session already cached: %s" % (sessionId))
-
-        # list of sessions to delete
-        removableSesssions = [
-            rUserSession for rUserSession in self._timekprUserSessions if rUserSession not in activeSessions
-        ]
-
-        # get rid of sessions not on the list
-        for userSession in removableSesssions:
-            log.log(cons.TK_LOG_LEVEL_DEBUG, "removing session: %s" % (userSession))
-            self._timekprUserSessions.pop(userSession)
+                # re-read properties if needed
+                if pResyncProperties:
+                    # get all properties
+                    try:
+                        sessionProperties = self._getAllProperties(
+                            self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF],
+                            cons.TK_DBUS_SESSION_OBJECT,
+                        )
+                        # lock
+                        with self._timekprCacheLock:
+                            # replace
+                            self._timekprUserSessions[sessionId][cons.TK_CTRL_DBUS_SESS_PROP] = sessionProperties
+                    except Exception as exc:
+                        # session most likely is gone
+                        log.log(
+                            cons.TK_LOG_LEVEL_INFO,
+                            'ERROR: error getting session properties for session "%s" DBUS: %s' % (sessionPath, exc),
+                        )
+                        # this session will be removed
+                        activeSessions.remove(sessionId)
+
+        # lock
+        with self._timekprCacheLock:
+            # list of sessions to delete
+            removableSesssions = [
+                rUserSession for rUserSession in self._timekprUserSessions if rUserSession not in activeSessions
+            ]
+
+            # get rid of sessions not on the list
+            for userSession in removableSesssions:
+                log.log(cons.TK_LOG_LEVEL_DEBUG, "removing session: %s" % (userSession))
+                # remove subscription
+                self._removeSignalMatch(self._timekprUserSessions.pop(userSession)[cons.TK_CTRL_DBUS_SESS_SIG])
+
+            # properties were re-read
+            if pResyncProperties:
+                # changes arrived while we were reading, properties may be out of date
+                self._propertiesResyncNeeded = cacheGen != self._timekprCacheGen
+                self._lastPropertiesResync = time.monotonic()
 
         log.log(
             cons.TK_LOG_LEVEL_EXTRA_DEBUG,
             '---=== finish cacheUserSessionList for "%s" ===---' % (self._userName),
         )
 
+    def _refreshUserSessionCache(self):
+        """Resync session list and properties from login1 only when signals indicate it or resync is due"""
+        # lock
+        with self._timekprCacheLock:
+            # whether session list has changed
+            sessionListResync = self._sessionListResyncNeeded
+            # whether properties have to be re-read
+            propertiesResync = (
+                self._propertiesResyncNeeded
+                or self._lastPropertiesResync is None
+                or time.monotonic() - self._lastPropertiesResync >= cons.TK_LOGIN1_SESSION_RESYNC_INTERVAL
+            )
+
+        # resync (new sessions always get their properties read)
+        if sessionListResync or propertiesResync:
+            # cache sessions
+            self.cacheUserSessionList(pResyncProperties=propertiesResync)
+
+    def getStateGeneration(self):
+        """Return generation of user and session state (it advances with every change signalled by login1)"""
+        # lock
+        with self._timekprCacheLock:
+            # result
+            return self._timekprCacheGen
+
     def isUserActive(self, pTimekprConfig, pTimekprUserConfig, pIsScreenLocked):
         """Check if user is active."""
         log.log(
@@ -153,18 +494,25 @@ class timekprUserManager(object):
             "supported session types: %s" % (str(pTimekprConfig.getTimekprSessionsCtrl())),
         )
 
-        # get all user sessions
-        userState = str(self._login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "State"))
-        userIdleState = str(bool(self._login1UserInterface.Get(cons.TK_DBUS_USER_OBJECT, "IdleHint")))
+        # refresh cached sessions and their properties (only if needed)
+        self._refreshUserSessionCache()
+
+        # lock
+        with self._timekprCacheLock:
+            # user properties
+            userState = self._timekprUserProperties.get("State", "")
+            userIdleState = str(self._timekprUserProperties.get("IdleHint", False))
+            # take a snapshot of session properties
+            userSessions = [
+                (rSessionId, self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP].copy())
+                for rSessionId in self._timekprUserSessions
+            ]
 
         log.log(
             cons.TK_LOG_LEVEL_DEBUG,
             "user stats, ul1st: %s, ul1idlhnt: %s, uscrlck: %s" % (userState, userIdleState, str(pIsScreenLocked)),
         )
 
-        # cache sessions
-        self.cacheUserSessionList()
-
         # to determine if user is active for all sessions:
         #    session must not be "active"
         #    idlehint must be true
@@ -192,43 +540,21 @@ class timekprUserManager(object):
             )
         else:
             # go through all user sessions
-            for rSessionId in self._timekprUserSessions:
+            for rSessionId, rSessionProperties in userSessions:
                 # not locked
                 sessionLockedState = "False"
 
-                # dbus performance measurement
-                misc.measureDBUSTimeElapsed(pStart=True)
-                # get needed static properties
-                sessionVTNr = self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP]["VTNr"]
                 # get needed properties
-                sessionType = str(
-                    self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(
-                        cons.TK_DBUS_SESSION_OBJECT, "Type"
-                    )
-                )
-                sessionState = str(
-                    self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(
-                        cons.TK_DBUS_SESSION_OBJECT, "State"
-                    )
-                )
-                sessionIdleState = str(
-                    bool(
-                        self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(
-                            cons.TK_DBUS_SESSION_OBJECT, "IdleHint"
-                        )
-                    )
-                )
+                sessionVTNr = rSessionProperties.get("VTNr", "")
+                sessionType = rSessionProperties.get("Type", "")
+                sessionState = rSessionProperties.get("State", "")
+                sessionIdleState = str(rSessionProperties.get("IdleHint", False))
                 # get locked state, only if it's available
                 if self._sessionLockedStateAvailable or self._sessionLockedStateAvailable is None:
-                    try:
+                    # locked state is available only in newer login1 versions
+                    if "LockedHint" in rSessionProperties:
                         # get locked state
-                        sessionLockedState = str(
-                            bool(
-                                self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(
-                                    cons.TK_DBUS_SESSION_OBJECT, "LockedHint"
-                                )
-                            )
-                        )
+                        sessionLockedState = str(rSessionProperties["LockedHint"])
                         # locked state available
                         if self._sessionLockedStateAvailable is None:
                             # state used
@@ -237,15 +563,13 @@ class timekprUserManager(object):
                                 cons.TK_LOG_LEVEL_INFO,
                                 "INFO: session locked state is available and will be used for idle state detection (if it works)",
                             )
-                    except:
+                    else:
                         # locked state not used
                         self._sessionLockedStateAvailable = False
                         log.log(
                             cons.TK_LOG_LEVEL_INFO,
                             "INFO: session locked state is NOT available, will rely on client screensaver state (if it works)",
                         )
-                # measurement logging
-                misc.measureDBUSTimeElapsed(pStop=True, pDbusIFName=rSessionId)
 
                 # logging
                 log.log(
@@ -326,16 +650,15 @@ class timekprUserManager(object):
 
     def lockUserSessions(self):
         """Ask login manager to lock user sessions"""
+        # lock
+        with self._timekprCacheLock:
+            # sessions to lock (we lock only GUI sessions)
+            sessionInterfaces = [
+                rSession[cons.TK_CTRL_DBUS_SESS_IF]
+                for rSession in self._timekprUserSessions.values()
+                if rSession[cons.TK_CTRL_DBUS_SESS_PROP].get("Type") in cons.TK_SESSION_TYPES_CTRL
+            ]
         # go through all user sessions
-        for rSessionId in self._timekprUserSessions:
-            # we lock only GUI sessions
-            if (
-                str(
-                    self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_PROP_IF].Get(
-                        cons.TK_DBUS_SESSION_OBJECT, "Type"
-                    )
-                )
-                in cons.TK_SESSION_TYPES_CTRL
-            ):
-                # lock session
-                self._timekprUserSessions[rSessionId][cons.TK_CTRL_DBUS_SESS_IF].Lock()
+        for rSessionInterface in sessionInterfaces:
+            # lock session
+            rSessionInterface.Lock()
@@ -0,0 +1,156 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import math
+import os
+import time
+import zlib
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+
+
+class timekprPersistenceScheduler(object):
+    """Schedules saving of user time spent, so saves are spread evenly over save interval instead of bursts"""
+
+    def __init__(self, pTimekprConfig):
+        """Initialize scheduler"""
+        log.log(cons.TK_LOG_LEVEL_INFO, "start init timekprPersistenceScheduler")
+
+        # global server config
+        self._timekprConfig = pTimekprConfig
+        # when user is due to be saved (monotonic time)
+        self._userSaveDue = {}
+        # when user was saved last time (monotonic time, for new users it's when they were scheduled)
+        self._userLastSave = {}
+        # when users were processed last time (monotonic time)
+        self._lastProcessTime = None
+
+        log.log(cons.TK_LOG_LEVEL_INFO, "finish init timekprPersistenceScheduler")
+
+    def _getInitialSaveDue(self, pUserName, pTime):
+        """Get first save time for user (stable per user offset within save interval, so users do not save together)"""
+        # offset
+        offset = zlib.crc32(pUserName.encode()) % max(self._timekprConfig.getTimekprSaveTime(), 1)
+        # result
+        return pTime + offset
+
+    def processUsers(self, pTimekprUsers):
+        """Save users which are due (limited number of users per tick) or all users when day has changed"""
+        # day change is saved for everyone at once
+        if any(rUser.isDayChanged() for rUser in pTimekprUsers.values()):
+            # flush
+            self.flushUsers(pTimekprUsers)
+            # done
+            return
+
+        # now
+        timeNow = time.monotonic()
+        # save interval
+        saveTime = max(self._timekprConfig.getTimekprSaveTime(), 1)
+        # time since users were processed last time (ticks are not evenly spaced when polling is adaptive)
+        timeElapsed = (
+            self._timekprConfig.getTimekprPollTime()
+            if self._lastProcessTime is None
+            else timeNow - self._lastProcessTime
+        )
+        self._lastProcessTime = timeNow
+        # schedule new users
+        for rUserName in pTimekprUsers:
+            # not yet scheduled
+            if rUserName not in self._userSaveDue:
+                # schedule
+                self._userSaveDue[rUserName] = self._getInitialSaveDue(rUserName, timeNow)
+                self._userLastSave[rUserName] = timeNow
+
+        # users which are due, most overdue first
+        dueUsers = sorted(
+            (
+                rUserName
+                for rUserName in pTimekprUsers
+                if self._userSaveDue[rUserName] <= timeNow or self._userLastSave[rUserName] <= timeNow - saveTime
+            ),
+            key=lambda rUserName: self._userSaveDue[rUserName],
+        )
+        # nothing to do
+        if not dueUsers:
+            return
+
+        # how many users can be saved this tick, so all users are saved once per save interval
+        saveBudget = max(1, math.ceil(len(pTimekprUsers) * timeElapsed / saveTime))
+        # users which were not saved for whole save interval are saved regardless of budget
+        saveUsers = [
+            rUserName
+            for rIdx, rUserName in enumerate(dueUsers)
+            if rIdx < saveBudget or self._userLastSave[rUserName] <= timeNow - saveTime
+        ]
+        # logging
+        log.log(
+            cons.TK_LOG_LEVEL_DEBUG,
+            "persistence, due users: %i, save budget: %i, saving: %i" % (len(dueUsers), saveBudget, len(saveUsers)),
+        )
+        # save
+        for rUserName in saveUsers:
+            # save
+            pTimekprUsers[rUserName].saveSpent()
+            # next save
+            self._userSaveDue[rUserName] = timeNow + saveTime
+            self._userLastSave[rUserName] = timeNow
+
+    def flushUsers(self, pTimekprUsers):
+        """Save all users and flush them to storage in one pass"""
+        # logging
+        log.log(cons.TK_LOG_LEVEL_INFO, "persistence, saving all users (%i)" % (len(pTimekprUsers)))
+        # now
+        timeNow = time.monotonic()
+        # saved users
+        savedUsers = []
+
+        # write all files first
+        for rUserName, rUser in pTimekprUsers.items():
+            try:
+                # save
+                rUser.saveSpent()
+                # saved
+                savedUsers.append(rUser)
+            except Exception as exc:
+                # logging
+                log.log(cons.TK_LOG_LEVEL_INFO, 'ERROR: error saving user "%s": %s' % (rUserName, exc))
+            # next save (keep the stagger, but within save interval)
+            self._userSaveDue[rUserName] = self._getInitialSaveDue(rUserName, timeNow)
+            self._userLastSave[rUserName] = timeNow
+
+        # then flush them to storage together (storage can group these)
+        for rUser in savedUsers:
+            try:
+                # flush
+                rUser.syncSpent()
+            except OSError as exc:
+                # logging
+                log.log(cons.TK_LOG_LEVEL_INFO, 'ERROR: error flushing user "%s": %s' % (rUser.getUserName(), exc))
+
+        # flush directory entries (backup files and new files) as well
+        if savedUsers:
+            try:
+                # open
+                fd = os.open(self._timekprConfig.getTimekprWorkDir(), os.O_RDONLY)
+                try:
+                    # flush
+                    os.fsync(fd)
+                finally:
+                    # close
+                    os.close(fd)
+            except OSError as exc:
+                # logging
+                log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: error flushing work directory: %s" % (exc))
+
+    def removeUser(self, pUserName):
+        """Remove user from schedule (user left)"""
+        # remove
+        self._userSaveDue.pop(pUserName, None)
+        self._userLastSave.pop(pUserName, None)
@@ -5,16 +5,40 @@ Created on Aug 01, 2020
 """
 
 # imports
+import itertools
 import os
-import psutil
-from gi.repository import GLib
+import sys
+import threading
+from collections import OrderedDict
 from datetime import datetime
-import re
 
 # timekpr imports
 from timekpr.common.log import log
 from timekpr.common.constants import constants as cons
 from timekpr.server.config import userhelper
+from timekpr.server.user.procconnector import timekprProcConnector
+from timekpr.server.user.playtimematcher import timekprPlayTimeMatcher
+from timekpr.server.user.terminator import timekprProcessTerminator
+
+
+class timekprPlayTimeProcess(object):
+    """Cached process (there can be tens of thousands of them, so slots are used to keep them small)"""
+
+    # userId - user id, exe - executable, cmdLine - command line (read only when it's needed), qcPasses - how many
+    # times we need to verify process has changed euid / cmdline (def: 2), qcTicks - time between the QC passes
+    # (def: 5 iterations), parentPid - parent process (read only when it's needed), cpuTime - CPU time used by process
+    # at last check (read only for matched processes, when it's needed)
+    __slots__ = ("userId", "exe", "cmdLine", "qcPasses", "qcTicks", "parentPid", "cpuTime")
+
+    def __init__(self, pUserId, pExe, pQcPasses, pQcTicks, pParentPid):
+        """Initialize process"""
+        self.userId = pUserId
+        self.exe = pExe
+        self.cmdLine = None
+        self.qcPasses = pQcPasses
+        self.qcTicks = pQcTicks
+        self.parentPid = pParentPid
+        self.cpuTime = None
 
 
 class timekprPlayTimeConfig(object):
@@ -25,75 +49,167 @@ class timekprPlayTimeConfig(object):
     _USRS = "U"  # used to identify users (in master structure)
     _MPIDS = "M"  # used to identify processes that match patterns
     _FLTS = "F"  # used to identify filters for processes for particular user
-    _UID = "u"  # used to identify user id (child struct)
-    _EXE = "e"  # used to identify executable for process
-    _CMD = "c"  # used to identify command line for process
-    _TERM = "k"  # used to identify terminate attempts before killing
-    _QCP = "Q"  # used to identify how many times we need to verify process has changed euid / cmdline (def: 2)
-    _QCT = "q"  # used to identify time between the QC passes  (def: 5 iterations)
+    _MTCH = "m"  # used to identify compiled matcher for all filters of particular user
+    _FVER = "v"  # used to identify version of filters for particular user (changes every time filters change)
+    _DMTCH = "l"  # used to identify compiled matcher for filters, which match descendants too (e.g. launchers)
+    _DPIDS = "D"  # used to identify processes that match descendants filters or are descendants of such process
+    _APIDS = "A"  # used to identify matched processes that used CPU since last check
+    _LMTCH = "L"  # used to identify compiled matchers for filters, which have their own limits (filter -> matcher)
+    _LPIDS = "a"  # used to identify processes that match filters, which have their own limits (filter -> pids)
     _TIM = "t"  # used to identify last update date
     # value constants
     _QCP_V = 2
     _QCT_V = 5
-    # file locations for inspecting process and its cmdline
+    # file locations for inspecting process and its cmdline (relative to process information file system)
     # status
-    _STATUS = "/proc/%s/status"
+    _STATUS = "%s/status"
     # exe
-    _EXECUTABLE = "/proc/%s/exe"
+    _EXECUTABLE = "%s/exe"
     # cmdline
-    _CMDLINE = "/proc/%s/cmdline"
+    _CMDLINE = "%s/cmdline"
+    # stat (for parent process)
+    _STAT = "%s/stat"
+    # user slices in cgroup hierarchies (systemd): unified (v2), hybrid and legacy (v1)
+    _CGROUP_USER_SLICES = (
+        "/sys/fs/cgroup/user.slice/user-%s.slice",
+        "/sys/fs/cgroup/unified/user.slice/user-%s.slice",
+        "/sys/fs/cgroup/systemd/user.slice/user-%s.slice",
+    )
+    # processes in cgroup
+    _CGROUP_PROCS = "cgroup.procs"
 
-    def __init__(self, pTimekprConfig):
-        """Initialize all stuff for PlayTime"""
+    def __init__(self, pTimekprConfig, pProcRoot="/proc"):
+        """Initialize all stuff for PlayTime (process information file system can be synthetic, e.g. for benchmarks)"""
 
         log.log(cons.TK_LOG_LEVEL_INFO, "start init timekprUserPlayTime")
 
         # structure:
-        #   P - process pids for all processes, every process has: u - user id, c - cmdline, t - adjustment time
+        #   P - process pids (int) for all processes, every process is timekprPlayTimeProcess
         #   U - contains users, which in turn contains reference to P
         #   TIM - last update date for processes
         self._cachedPids = {self._PIDS: {}, self._USRS: {}, self._TIM: None}
         # global server config
         self._timekprConfig = pTimekprConfig
+        # users may be evaluated in parallel, PlayTime data is shared between them
+        self._playTimeLock = threading.RLock()
+        # process information file system and file locations for process
+        self._procRoot = pProcRoot
+        self._statusPath = os.path.join(pProcRoot, self._STATUS)
+        self._exePath = os.path.join(pProcRoot, self._EXECUTABLE)
+        self._cmdLinePath = os.path.join(pProcRoot, self._CMDLINE)
+        self._statPath = os.path.join(pProcRoot, self._STAT)
+        # kernel process event connector (opened on first use)
+        self._procConnector = None
+        # whether connector could not be opened (then processes are listed regularly)
+        self._procConnectorFailed = False
+        # user slice location in cgroup hierarchy (None - not yet determined, "" - not available)
+        self._cgroupUserSlice = None
+        # match results for (user, filter version, executable, cmdline hash), least recently used are evicted
+        self._matchCache = OrderedDict()
+        # filters are set up from admin calls and worker, processes are matched in worker
+        self._matchCacheLock = threading.Lock()
+        # terminates PlayTime processes
+        self._processTerminator = timekprProcessTerminator(pProcRoot)
+        # process tree: parent pid -> child pids (only for processes which have parent pid read)
+        self._childPids = {}
+        # filter versions are unique for all users, so user which is removed and added again is not confused
+        self._filterVersions = itertools.count(1)
 
         log.log(cons.TK_LOG_LEVEL_INFO, "finish init timekprUserPlayTime")
 
-    def _getMatchedProcessesByFilter(self, pUid, pFlts, pPids):
-        """Method to validate whether cmdline matches the filter"""
+    def _getMatchedProcesses(self, pUid, pPids, pMatcher=None, pLimitedFlt=None):
+        """Method to validate whether processes match any of the user filters (or only descendants filters or only one
+        filter, which has its own limit)"""
         # def
         matchedPids = []
+        # filter, which has its own limit
+        if pLimitedFlt is not None:
+            # which matcher
+            matcherKey = (self._LMTCH, pLimitedFlt)
+            # filter matcher
+            matcher = self._cachedPids[self._USRS][pUid][self._LMTCH][pLimitedFlt]
+        else:
+            # which matcher
+            matcherKey = self._MTCH if pMatcher is None else pMatcher
+            # user matcher
+            matcher = self._cachedPids[self._USRS][pUid][matcherKey]
+        # no filters
+        if matcher is None:
+            return matchedPids
+        # filter version
+        fltVersion = self._cachedPids[self._USRS][pUid][self._FVER]
+        # whether command line is inspected too
+        isCmdLineUsed = self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled()
         # loop through user processes
         for rPid in pPids:
             # executable
-            exe = self._cachedPids[self._PIDS][rPid][self._EXE]
+            exe = self._cachedPids[self._PIDS][rPid].exe
             # command line
-            cmdLine = self._cachedPids[self._PIDS][rPid][self._CMD]
-            # try searching only if exe is specified
-            if exe is not None:
-                # match
-                for rFlt in pFlts:
-                    # pid matched
-                    isMatched = rFlt.search(exe) is not None
-                    isMatched = isMatched or (
-                        self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled()
-                        and cmdLine is not None
-                        and rFlt.search(cmdLine) is not None
+            cmdLine = None
+            # executable is checked first
+            isMatched = self._isMatchedCached((pUid, fltVersion, matcherKey, exe, None), matcher, exe, None)
+            # command line is read and checked only when executable does not match
+            if not isMatched and isCmdLineUsed and exe is not None:
+                # command line
+                cmdLine = self._getCmdLine(rPid)
+                # check it
+                if cmdLine:
+                    # match
+                    isMatched = self._isMatchedCached(
+                        (pUid, fltVersion, matcherKey, None, hash(cmdLine)), matcher, None, cmdLine
                     )
-                    # try to check if matches
-                    if isMatched:
-                        # match
-                        matchedPids.append(rPid)
-                        # log
-                        log.log(
-                            cons.TK_LOG_LEVEL_DEBUG,
-                            "PT match, uid: %s, exe: %s, cmdl: %s"
-                            % (pUid, exe, "n/a" if cmdLine is None else cmdLine[:128]),
-                        )
-                        # first filter is enough
-                        break
+            # try to check if matches
+            if isMatched:
+                # match
+                matchedPids.append(rPid)
+                # log
+                log.log(
+                    cons.TK_LOG_LEVEL_DEBUG,
+                    "PT match, uid: %s, exe: %s, cmdl: %s" % (pUid, exe, "n/a" if cmdLine is None else cmdLine[:128]),
+                )
         # result
         return matchedPids
 
+    def _isMatchedCached(self, pKey, pMatcher, pExe, pCmdLine):
+        """Match executable or command line using remembered results"""
+        # lock
+        with self._matchCacheLock:
+            # cached result
+            isMatched = self._matchCache.get(pKey)
+            # recently used
+            if isMatched is not None:
+                self._matchCache.move_to_end(pKey)
+        # not cached
+        if isMatched is None:
+            # match
+            isMatched = pMatcher.isMatched(pExe, None) if pCmdLine is None else pMatcher.isCmdLineMatched(pCmdLine)
+            # lock
+            with self._matchCacheLock:
+                # cache
+                self._matchCache[pKey] = isMatched
+                # evict least recently used
+                if len(self._matchCache) > cons.TK_PLAYTIME_MATCH_CACHE_SIZE:
+                    self._matchCache.popitem(last=False)
+        # result
+        return isMatched
+
+    def _getCmdLine(self, pProcId):
+        """Get command line for process (it's read once for the lifetime of the process, empty if it's not available)"""
+        # cached process
+        cachedPid = self._cachedPids[self._PIDS][pProcId]
+        # not read yet
+        if cachedPid.cmdLine is None:
+            try:
+                # we have to inspect full cmdline (the first TK_MAX_CMD_SRCH (def: 512) symbols to be precise)
+                with open(self._cmdLinePath % (pProcId), mode="r") as cmdFd:
+                    # split this
+                    cachedPid.cmdLine = cmdFd.read().replace("\x00", " ")[: cons.TK_MAX_CMD_SRCH]
+            except Exception:
+                # process is gone or it's not accessible
+                cachedPid.cmdLine = ""
+        # result
+        return cachedPid.cmdLine
+
     def _initUserData(self, pUid):
         """Initialize user in cached structure"""
         # result
@@ -101,10 +217,416 @@ class timekprPlayTimeConfig(object):
             self._PIDS: set(),
             self._MPIDS: set(),
             self._FLTS: {},
+            self._MTCH: None,
+            self._FVER: 0,
+            self._DMTCH: None,
+            self._DPIDS: set(),
+            self._APIDS: set(),
+            self._LMTCH: {},
+            self._LPIDS: {},
         }
 
-    def _cachePlayTimeProcesses(self):
-        """Refresh all processes for inspection"""
+    def _readParentPid(self, pProcId):
+        """Read parent process id (None if process is gone)"""
+        try:
+            # read stat
+            with open(self._statPath % (pProcId), mode="r") as statFd:
+                # parent is the second field after command (which is in parentheses and may contain anything)
+                parentPid = int(statFd.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            # process is gone
+            parentPid = None
+        # result
+        return parentPid
+
+    def _readCpuTime(self, pProcId):
+        """Read CPU time used by process (user and system time in clock ticks, None if process is gone)"""
+        try:
+            # read stat
+            with open(self._statPath % (pProcId), mode="r") as statFd:
+                # user and system times are 12th and 13th fields after command
+                fields = statFd.read().rsplit(")", 1)[1].split()
+                # sum
+                cpuTime = int(fields[11]) + int(fields[12])
+        except (OSError, IndexError, ValueError):
+            # process is gone
+            cpuTime = None
+        # result
+        return cpuTime
+
+    def _readProcessInfo(self, pProcId):
+        """Read owner, executable and parent (if needed) of process (raises an exception when it's gone)"""
+        # def
+        exe = None
+        userId = None
+        parentPid = None
+        # ## alternative solutions for determining owner / process ##
+        useAltNr = 3
+        # ## depending on version (they all work, but speed / feature may differ)
+        # using status (correct euid)
+        if useAltNr == 1:
+            # obj
+            obj = self._statusPath % (pProcId)
+            # found the process, now try to determine whether this belongs to our user
+            with open(obj, mode="r") as usrFD:
+                # read status lines
+                content = usrFD.read().splitlines()
+                # loop through status lines
+                for rStat in content:
+                    # we are interested in Uid
+                    if rStat.startswith("Uid:"):
+                        # check for our user
+                        userId = rStat.split("\t")[1]
+                        # found Uids, no need to check more
+                        break
+        # using commandline (filter through params too)
+        elif useAltNr == 2:
+            # obj
+            obj = self._cmdLinePath % (pProcId)
+            # check the owner (since we are interested in processes, that usually do not change euid, this is not only enough, it's even faster than checing euid)
+            userId = str(os.stat(obj).st_uid)
+        # using symlinks (faster)
+        else:
+            # obj
+            obj = self._exePath % (pProcId)
+            # check the owner (since we are interested in processes, that usually do not change euid, this is not only enough, it's even faster than checing euid)
+            userId = str(os.lstat(obj).st_uid)
+
+        # same user ids and executables are shared by many processes, keep one copy of them
+        userId = sys.intern(userId)
+        # check if we have it
+        if userId not in self._cachedPids[self._USRS]:
+            # verify
+            if userhelper.isUserValid(int(userId)):
+                # initialize set
+                self._initUserData(userId)
+            else:
+                # this is not of our interest
+                userId = None
+        # we need executables for every process, in case it changes (snapd?), command lines are read only when needed
+        try:
+            # ## alternative
+            if useAltNr == 3:
+                # read link destination (this is the final destination)
+                exe = sys.intern(os.readlink(obj))
+            # ## alternative
+            else:
+                # try reading executable for process
+                with open(obj, mode="r") as cmdFd:
+                    # split this
+                    exe = sys.intern(cmdFd.read().split("\x00")[0])
+        except Exception:
+            # it's not possible to get executable, but we still cache the process
+            exe = None
+        # process tree is needed only for users with descendants filters
+        if userId is not None and self._cachedPids[self._USRS][userId][self._DMTCH] is not None:
+            # parent
+            parentPid = self._readParentPid(pProcId)
+        # result
+        return userId, exe, parentPid
+
+    def _indexParentPid(self, pProcId, pParentPid):
+        """Add process to process tree"""
+        # parent is known
+        if pParentPid is not None:
+            # add
+            self._childPids.setdefault(pParentPid, set()).add(pProcId)
+
+    def _addCachedProcess(self, pProcId, pUserId, pExe, pParentPid):
+        """Cache process and match it against user filters, returns how many matches were added"""
+        # cache it
+        self._cachedPids[self._PIDS][pProcId] = timekprPlayTimeProcess(
+            pUserId,
+            pExe,
+            (self._QCP_V if pExe is not None else 0),
+            (self._QCT_V if pExe is not None else 0),
+            pParentPid,
+        )
+        # process tree
+        self._indexParentPid(pProcId, pParentPid)
+        # result
+        return self._matchCachedProcess(pProcId, pUserId)
+
+    def _matchDescendants(self, pUid, pProcId):
+        """Match process and all its cached descendants of the same user, returns how many matches were added"""
+        # def
+        matchCnt = 0
+        # user
+        user = self._cachedPids[self._USRS][pUid]
+        # processes to check
+        pids = [pProcId]
+        # go through the tree
+        while pids:
+            # process
+            procId = pids.pop()
+            # already done
+            if procId in user[self._DPIDS]:
+                continue
+            # matches descendants filter or is a descendant
+            user[self._DPIDS].add(procId)
+            # new match
+            if procId not in user[self._MPIDS]:
+                # add
+                user[self._MPIDS].add(procId)
+                # stats
+                matchCnt += 1
+            # activities with their own limits (parent is always done before its children)
+            self._matchLimitedActivities(pUid, procId)
+            # children (only these of the same user are interesting)
+            pids.extend(rPid for rPid in self._childPids.get(procId, ()) if rPid in user[self._PIDS])
+        # result
+        return matchCnt
+
+    def _matchCachedProcess(self, pProcId, pUserId):
+        """Add process to user processes and match it against user filters, returns how many matches were added"""
+        # def
+        matchCnt = 0
+        # only if user is specified
+        if pUserId is not None:
+            # manage pids for users
+            self._cachedPids[self._USRS][pUserId][self._PIDS].add(pProcId)
+            # verify whether this cmdline matches any of the filters user set up
+            for rPid in self._getMatchedProcesses(pUserId, (pProcId,)):
+                # add to user pids
+                self._cachedPids[self._USRS][pUserId][self._MPIDS].add(rPid)
+                # activities with their own limits
+                self._matchLimitedActivities(pUserId, rPid)
+                # stats
+                matchCnt += 1
+            # user has filters, which match descendants too
+            if self._cachedPids[self._USRS][pUserId][self._DMTCH] is not None:
+                # started by matched launcher or is a launcher itself (it may have children cached already)
+                if self._cachedPids[self._PIDS][pProcId].parentPid in self._cachedPids[self._USRS][pUserId][
+                    self._DPIDS
+                ] or self._getMatchedProcesses(pUserId, (pProcId,), self._DMTCH):
+                    # match process tree
+                    matchCnt += self._matchDescendants(pUserId, pProcId)
+        # result
+        return matchCnt
+
+    def _matchLimitedActivities(self, pUid, pProcId):
+        """Add matched process to activities with their own limits, which it matches (or is started by)"""
+        # activities
+        for rFlt, rPids in self._cachedPids[self._USRS][pUid][self._LPIDS].items():
+            # already there
+            if pProcId in rPids:
+                continue
+            # started by process of the activity, which matches descendants too, or matches activity itself
+            if (
+                timekprPlayTimeMatcher.isDescendantsFilter(rFlt)
+                and self._cachedPids[self._PIDS][pProcId].parentPid in rPids
+            ) or self._getMatchedProcesses(pUid, (pProcId,), pLimitedFlt=rFlt):
+                # add
+                rPids.add(pProcId)
+
+    def _getLimitedActivityProcesses(self, pUid, pFlt):
+        """Get matched processes of activity, which has its own limit (with processes started by them, if needed)"""
+        # user
+        user = self._cachedPids[self._USRS][pUid]
+        # processes, which match activity
+        pids = set(self._getMatchedProcesses(pUid, user[self._MPIDS], pLimitedFlt=pFlt))
+        # activity matches descendants too
+        if timekprPlayTimeMatcher.isDescendantsFilter(pFlt):
+            # processes to check
+            procIds = list(pids)
+            # go through the tree
+            while procIds:
+                # children (only these of the same user are interesting)
+                for rPid in self._childPids.get(procIds.pop(), ()):
+                    # not yet done
+                    if rPid in user[self._PIDS] and rPid not in pids:
+                        # add
+                        pids.add(rPid)
+                        procIds.append(rPid)
+        # result
+        return pids
+
+    def _unlinkCachedProcess(self, pProcId, pUserId):
+        """Remove process from user processes and user matched processes"""
+        # uid found
+        if pUserId is not None and pUserId in self._cachedPids[self._USRS]:
+            # remove it from user pids
+            self._cachedPids[self._USRS][pUserId][self._PIDS].discard(pProcId)
+            # remove it from user pids that matched filters
+            self._cachedPids[self._USRS][pUserId][self._MPIDS].discard(pProcId)
+            # remove it from user process trees
+            self._cachedPids[self._USRS][pUserId][self._DPIDS].discard(pProcId)
+            # remove it from user processes that used CPU
+            self._cachedPids[self._USRS][pUserId][self._APIDS].discard(pProcId)
+            # remove it from activities with their own limits
+            for rPids in self._cachedPids[self._USRS][pUserId][self._LPIDS].values():
+                rPids.discard(pProcId)
+
+    def _removeCachedProcess(self, pProcId):
+        """Remove process from cache"""
+        # remove
+        cachedPid = self._cachedPids[self._PIDS].pop(pProcId, None)
+        # it was cached
+        if cachedPid is not None:
+            # remove from user
+            self._unlinkCachedProcess(pProcId, cachedPid.userId)
+            # remove from process tree (its own children are left, they are removed when they exit)
+            if cachedPid.parentPid is not None:
+                # parent children
+                childPids = self._childPids.get(cachedPid.parentPid)
+                # there are children
+                if childPids is not None:
+                    # remove
+                    childPids.discard(pProcId)
+                    # last one
+                    if not childPids:
+                        self._childPids.pop(cachedPid.parentPid)
+
+    def _getCgroupUserSlice(self):
+        """Determine where user slices are located in cgroup hierarchy (empty when cgroups are not managed by systemd)"""
+        # not yet determined
+        if self._cgroupUserSlice is None:
+            # def
+            self._cgroupUserSlice = ""
+            # check hierarchies
+            for rUserSlice in self._CGROUP_USER_SLICES:
+                # user.slice exists
+                if os.path.isdir(os.path.dirname(rUserSlice)):
+                    # found
+                    self._cgroupUserSlice = rUserSlice
+                    # no need to check more
+                    break
+            # log
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "PT cgroup user slices: %s" % (self._cgroupUserSlice if self._cgroupUserSlice else "not available"),
+            )
+        # result
+        return self._cgroupUserSlice
+
+    def _listProcessIds(self, pSkippedUids):
+        """List processes to inspect (not skipped users with filters from cgroups or all processes) as set"""
+        # inspect only user slices
+        if self._timekprConfig.getTimekprPlayTimeCgroupScanEnabled() and self._getCgroupUserSlice():
+            # result
+            procIds = set()
+            # only users with filters are interesting
+            for rUser in self._cachedPids[self._USRS]:
+                # no filters or user does not need PlayTime inspected
+                if not self._cachedPids[self._USRS][rUser][self._FLTS] or rUser in pSkippedUids:
+                    continue
+                # all cgroups in user slice (sessions, user manager and its services)
+                for rDir, _rSubDirs, _rFiles in os.walk(self._cgroupUserSlice % (rUser)):
+                    try:
+                        # read processes
+                        with open(os.path.join(rDir, self._CGROUP_PROCS), mode="r") as procsFd:
+                            # add
+                            procIds.update(int(rPid) for rPid in procsFd.read().split())
+                    except OSError:
+                        # cgroup is gone
+                        pass
+        else:
+            # list all in /proc
+            procIds = set(int(rPid) for rPid in os.listdir(self._procRoot) if rPid.isdecimal())
+        # result
+        return procIds
+
+    def _initProcConnector(self):
+        """Open kernel process event connector (if it's not possible, processes are listed every time)"""
+        # connector
+        connector = timekprProcConnector()
+        try:
+            # open
+            connector.openConnector()
+            # use it
+            self._procConnector = connector
+        except Exception as ex:
+            # log
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "WARNING: process event connector is not available, PlayTime processes will be listed regularly (%s)"
+                % (ex),
+            )
+            # do not try again
+            self._procConnectorFailed = True
+
+    def _processPlayTimeProcessEvents(self, pDt):
+        """Refresh cached processes from kernel process events, returns whether full process list has to be inspected"""
+        # open connector on first use
+        if self._procConnector is None:
+            # not yet tried
+            if not self._procConnectorFailed:
+                # open
+                self._initProcConnector()
+            # full inspection is needed anyway (either connector is new or it's not available)
+            return True
+
+        # read pending events
+        try:
+            # drain
+            changedPids, exitedPids, isOverflow = self._procConnector.drainEvents()
+        except Exception as ex:
+            # log
+            log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: reading process events failed (%s), resubscribing" % (ex))
+            # close
+            self._procConnector.closeConnector()
+            self._procConnector = None
+            # full inspection
+            return True
+
+        # events were lost, cache was reset or it's time to reconcile
+        if (
+            isOverflow
+            or self._cachedPids[self._TIM] is None
+            or (pDt - self._cachedPids[self._TIM]).total_seconds() >= cons.TK_PLAYTIME_PROC_CONNECTOR_RESCAN_INTERVAL
+        ):
+            # log
+            if isOverflow:
+                log.log(cons.TK_LOG_LEVEL_DEBUG, "PT process events were lost, inspecting all processes")
+            # full inspection
+            return True
+
+        # stats
+        apids = 0
+        rpids = 0
+        lpids = 0
+        ampids = 0
+        # changed processes are inspected from scratch
+        for rPid in exitedPids | changedPids:
+            # stats
+            rpids += 1 if rPid in self._cachedPids[self._PIDS] else 0
+            # remove
+            self._removeCachedProcess(rPid)
+        # inspect new / changed processes
+        for rPid in changedPids:
+            try:
+                # read
+                userId, exe, parentPid = self._readProcessInfo(rPid)
+            except Exception:
+                # stats
+                lpids += 1
+                # process not here anymore, move on
+                continue
+            # cache
+            ampids += self._addCachedProcess(rPid, userId, exe, parentPid)
+            # stats
+            apids += 1
+
+        # log
+        if changedPids or exitedPids:
+            log.log(
+                cons.TK_LOG_LEVEL_DEBUG,
+                "PT event stats, users: %i, cache: %i, events: %i, add: %i, rm: %i, lost: %i, admatch: %i"
+                % (
+                    len(self._cachedPids[self._USRS]),
+                    len(self._cachedPids[self._PIDS]),
+                    len(changedPids) + len(exitedPids),
+                    apids,
+                    rpids,
+                    lpids,
+                    ampids,
+                ),
+            )
+        # result
+        return False
+
+    def _cachePlayTimeProcesses(self, pSkippedUids=()):
+        """Refresh all processes for inspection (skipped users do not need PlayTime inspected, e.g. inactive)"""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start cachePlayTimeProcesses")
 
         # ## the idea is that processes have to be refreshed regularly, that is:
@@ -113,8 +635,14 @@ class timekprPlayTimeConfig(object):
 
         # def
         dt = datetime.now()
+        # processes are tracked by kernel events, full process list is inspected only to reconcile
+        if self._timekprConfig.getTimekprPlayTimeProcConnectorEnabled() and not self._procConnectorFailed:
+            # process events
+            if not self._processPlayTimeProcessEvents(dt):
+                # events were enough
+                return
         # regular refreshes need to happen even noone is logged in (process pid reuse)
-        if not (
+        elif not (
             (
                 (dt - self._cachedPids[self._TIM]).total_seconds()
                 if self._cachedPids[self._TIM] is not None
@@ -124,10 +652,10 @@ class timekprPlayTimeConfig(object):
         ):
             # def
             areFltsEnabled = False
-            # if no users have set up their filters, we do NOT execute process list
+            # if no users (which need PlayTime inspected) have set up their filters, we do NOT execute process list
             for rUser in self._cachedPids[self._USRS]:
                 # check if there are filters
-                if self._cachedPids[self._USRS][rUser][self._FLTS]:
+                if self._cachedPids[self._USRS][rUser][self._FLTS] and rUser not in pSkippedUids:
                     # filters found
                     areFltsEnabled = True
                     # no need to search further
@@ -165,42 +693,33 @@ class timekprPlayTimeConfig(object):
         qcpids = 0
         ampids = 0
 
-        # ## alternative solutions for determining owner / process ##
-        useAltNr = 3
-        # list all in /proc
-        procIds = [rPid for rPid in os.listdir("/proc") if rPid.isdecimal()]
+        # cached processes before the scan
+        cachedCnt = len(self._cachedPids[self._PIDS])
+        # list processes
+        procIds = self._listProcessIds(pSkippedUids)
         # loop through processes
         for procId in procIds:
             # def
-            exe = None
-            cmdLine = None
-            userId = None
-            prevUserId = None
             qcChk = False
-            processChanged = False
-
+            # cached process
+            cachedPid = self._cachedPids[self._PIDS].get(procId)
             # matched
-            if procId in self._cachedPids[self._PIDS]:
+            if cachedPid is not None:
                 # determine whether this process passed QC validation
-                if (
-                    self._cachedPids[self._PIDS][procId][self._QCP] > 0
-                    and self._cachedPids[self._PIDS][procId][self._EXE] is not None
-                ):
+                if cachedPid.qcPasses > 0 and cachedPid.exe is not None:
                     # stat
                     qcpids += 1
                     # decrease check times
-                    self._cachedPids[self._PIDS][procId][self._QCT] -= 1
+                    cachedPid.qcTicks -= 1
                     # check whether it's time to recheck the process
-                    if not self._cachedPids[self._PIDS][procId][self._QCT] > 0:
+                    if not cachedPid.qcTicks > 0:
                         # decrease pass times
-                        self._cachedPids[self._PIDS][procId][self._QCP] -= 1
+                        cachedPid.qcPasses -= 1
                         # set up next countdown
-                        self._cachedPids[self._PIDS][procId][self._QCT] = self._QCT_V
+                        cachedPid.qcTicks = self._QCT_V
                         # we need to check process
                         qcChk = True
 
-                # cached
-                self._cachedPids[self._PIDS][procId][self._TIM] = self._cachedPids[self._TIM]
                 # stats
                 cpids += 1
                 # if not QC
@@ -210,177 +729,58 @@ class timekprPlayTimeConfig(object):
 
             # since processes come and go
             try:
-                # ## depending on version (they all work, but speed / feature may differ)
-                # using status (correct euid)
-                if useAltNr == 1:
-                    # obj
-                    obj = self._STATUS % (procId)
-                    # found the process, now try to determine whether this belongs to our user
-                    with open(obj, mode="r") as usrFD:
-                        # read status lines
-                        content = usrFD.read().splitlines()
-                        # loop through status lines
-                        for rStat in content:
-                            # we are interested in Uid
-                            if rStat.startswith("Uid:"):
-                                # check for our user
-                                userId = rStat.split("\t")[1]
-                                # found Uids, no need to check more
-                                break
-                # using commandline (filter through params too)
-                elif useAltNr == 2:
-                    # obj
-                    obj = self._CMDLINE % (procId)
-                    # check the owner (since we are interested in processes, that usually do not change euid, this is not only enough, it's even faster than checing euid)
-                    userId = str(os.stat(obj).st_uid)
-                # using symlinks (faster)
-                else:
-                    # obj
-                    obj = self._EXECUTABLE % (procId)
-                    # check the owner (since we are interested in processes, that usually do not change euid, this is not only enough, it's even faster than checing euid)
-                    userId = str(os.lstat(obj).st_uid)
-
-                # check if we have it
-                if userId not in self._cachedPids[self._USRS]:
-                    # verify
-                    if userhelper.isUserValid(int(userId)):
-                        # initialize set
-                        self._initUserData(userId)
-                    else:
-                        # this is not of our interest
-                        userId = None
-                # we need commandlines for every process, in case it changes (snapd?)
-                try:
-                    # ## alternative
-                    if useAltNr == 3:
-                        # read link destination (this is the final destination)
-                        exe = os.readlink(obj)
-                    # ## alternative
-                    else:
-                        # try reading executable for process
-                        with open(obj, mode="r") as cmdFd:
-                            # split this
-                            exe = cmdFd.read().split("\x00")[0]
-                    # we have to inspect full cmdline (the first TK_MAX_CMD_SRCH (def: 512) symbols to be precise)
-                    if self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled():
-                        # obj
-                        obj = self._CMDLINE % (procId)
-                        # try reading cmdline for process
-                        with open(obj, mode="r") as cmdFd:
-                            # split this
-                            cmdLine = cmdFd.read().replace("\x00", " ")[: cons.TK_MAX_CMD_SRCH]
-                except Exception:
-                    # it's not possible to get executable, but we still cache the process
-                    exe = None
-                    # stat
-                    lcmpids += 1
+                # read
+                userId, exe, parentPid = self._readProcessInfo(procId)
             # try next on any exception
             except Exception:
                 # stats
                 lpids += 1
                 # process not here anymore, move on
                 continue
+            # stat
+            lcmpids += 1 if exe is None else 0
 
             # if we ar not running QC check, we cache it, else we make verifications
             if not qcChk:
                 # cache it
-                self._cachedPids[self._PIDS][procId] = {
-                    self._UID: userId,
-                    self._EXE: exe,
-                    self._CMD: cmdLine,
-                    self._QCP: (self._QCP_V if exe is not None else 0),
-                    self._QCT: (self._QCT_V if exe is not None else 0),
-                    self._TERM: 0,
-                    self._TIM: self._cachedPids[self._TIM],
-                }
+                ampids += self._addCachedProcess(procId, userId, exe, parentPid)
                 # stats
                 apids += 1
-            else:
-                # check if process changed uid / cmdline
-                if (
-                    self._cachedPids[self._PIDS][procId][self._UID] != userId
-                    or self._cachedPids[self._PIDS][procId][self._EXE] != exe
-                ):
-                    # log
-                    log.log(
-                        cons.TK_LOG_LEVEL_DEBUG,
-                        'WARNING: uid/executable changes, uid: %s -> %s, executable: "%s" -> "%s"'
-                        % (
-                            self._cachedPids[self._PIDS][procId][self._UID],
-                            userId,
-                            self._cachedPids[self._PIDS][procId][self._EXE],
-                            exe,
-                        ),
-                    )
-                    # save previous user id
-                    prevUserId = self._cachedPids[self._PIDS][procId][self._UID]
-                    # adjust new values
-                    self._cachedPids[self._PIDS][procId][self._UID] = userId
-                    self._cachedPids[self._PIDS][procId][self._EXE] = exe
-                    self._cachedPids[self._PIDS][procId][self._CMD] = cmdLine
-                    # if process has changed, we do not verify it anymore
-                    self._cachedPids[self._PIDS][procId][self._QCP] = 0
-                    self._cachedPids[self._PIDS][procId][self._QCT] = 0
-                    # flag that this is changed
-                    processChanged = True
-                    # stats
-                    ccmpids += 1
-                else:
-                    # nothing here
-                    continue
+            # check if process changed uid / cmdline
+            elif cachedPid.userId != userId or cachedPid.exe != exe:
+                # log
+                log.log(
+                    cons.TK_LOG_LEVEL_DEBUG,
+                    'WARNING: uid/executable changes, uid: %s -> %s, executable: "%s" -> "%s"'
+                    % (
+                        cachedPid.userId,
+                        userId,
+                        cachedPid.exe,
+                        exe,
+                    ),
+                )
+                # remove from previous user
+                self._unlinkCachedProcess(procId, cachedPid.userId)
+                # adjust new values
+                cachedPid.userId = userId
+                cachedPid.exe = exe
+                # command line is read again when needed
+                cachedPid.cmdLine = None
+                # if process has changed, we do not verify it anymore
+                cachedPid.qcPasses = 0
+                cachedPid.qcTicks = 0
+                # update processes / matches
+                ampids += self._matchCachedProcess(procId, userId)
+                # stats
+                ccmpids += 1
 
-            # we have user (or process changed and we have to update processes / matches)
-            if (userId is not None and not qcChk) or processChanged:
-                # handle case when uid becomes None from existing
-                if userId != prevUserId and prevUserId is not None:
-                    # remove from user pids
-                    if procId in self._cachedPids[self._USRS][prevUserId][self._PIDS]:
-                        # remove
-                        self._cachedPids[self._USRS][prevUserId][self._PIDS].remove(procId)
-                    # remove from matched pids
-                    if procId in self._cachedPids[self._USRS][prevUserId][self._MPIDS]:
-                        # remove
-                        self._cachedPids[self._USRS][prevUserId][self._MPIDS].remove(procId)
-                # only if user is specified
-                if userId is not None:
-                    # manage pids for users
-                    self._cachedPids[self._USRS][userId][self._PIDS].add(procId)
-                    # verify whether this cmdline matches any of the filters user set up
-                    for rFlt in self._cachedPids[self._USRS][userId][self._FLTS]:
-                        # matched pids
-                        matchedPids = self._getMatchedProcessesByFilter(
-                            userId,
-                            self._cachedPids[self._USRS][userId][self._FLTS][rFlt],
-                            set([procId]),
-                        )
-                        # match and add to user matched pids
-                        for rPid in matchedPids:
-                            # add to user pids
-                            self._cachedPids[self._USRS][userId][self._MPIDS].add(rPid)
-                            # stats
-                            ampids += 1
-
-        # take care of removing the disapeared pids
-        pids = [
-            rPid
-            for rPid in self._cachedPids[self._PIDS]
-            if self._cachedPids[self._TIM] != self._cachedPids[self._PIDS][rPid][self._TIM]
-        ]
+        # take care of removing the disapeared pids (when all cached processes were seen, nothing has disappeared)
+        pids = self._cachedPids[self._PIDS].keys() - procIds if cpids < cachedCnt else ()
 
         # remove items
         for rPid in pids:
-            # pid
-            uid = self._cachedPids[self._PIDS][rPid][self._UID]
-            # uid found
-            if uid is not None:
-                # remove it from user pids
-                self._cachedPids[self._USRS][uid][self._PIDS].remove(rPid)
-                # remove it from user pids that matched filters
-                if rPid in self._cachedPids[self._USRS][uid][self._MPIDS]:
-                    # remove
-                    self._cachedPids[self._USRS][uid][self._MPIDS].remove(rPid)
             # remove
-            self._cachedPids[self._PIDS].pop(rPid)
+            self._removeCachedProcess(rPid)
         # stats
         rpids += len(pids)
 
@@ -416,182 +816,314 @@ class timekprPlayTimeConfig(object):
         )
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish cachePlayTimeProcesses")
 
-    def _scheduleKill(self, pPid, pKill):
-        # kill process
-        try:
-            # if trying to terminate
-            if not pKill:
-                # logging
-                log.log(
-                    cons.TK_LOG_LEVEL_INFO,
-                    "sending terminate signal to process %s" % (pPid),
-                )
-                # terminate
-                psutil.Process(pid=int(pPid)).terminate()
-            # now just kill
-            else:
-                # logging
-                log.log(cons.TK_LOG_LEVEL_INFO, "sending kill signal to process %s" % (pPid))
-                # kill
-                psutil.Process(pid=int(pPid)).kill()
-        except:
-            # error in killing does not matter
-            pass
-
-    def processPlayTimeActivities(self):
-        """This is the main process to take care of PT processes"""
-        # cache processes
-        self._cachePlayTimeProcesses()
+    def _getActivePidsKey(self):
+        """Get which processes are active PlayTime activities (all matched or matched, which used CPU)"""
+        # result
+        return self._APIDS if self._timekprConfig.getTimekprPlayTimeCpuActivityEnabled() else self._MPIDS
+
+    def _processCpuActivity(self):
+        """Determine which matched processes used CPU since last check (only matched processes are inspected)"""
+        # def
+        apids = 0
+        # go through users
+        for rUser in self._cachedPids[self._USRS].values():
+            # processes which used CPU
+            activePids = set()
+            # only matched processes are interesting
+            for rPid in rUser[self._MPIDS]:
+                # cached process
+                cachedPid = self._cachedPids[self._PIDS][rPid]
+                # CPU time
+                cpuTime = self._readCpuTime(rPid)
+                # process is gone (it's removed from cache on next refresh)
+                if cpuTime is None:
+                    continue
+                # used CPU since last check (process, which was not checked before, has just started or matched)
+                if cachedPid.cpuTime is None or cpuTime - cachedPid.cpuTime >= cons.TK_PLAYTIME_CPU_ACTIVITY_TICKS:
+                    # active
+                    activePids.add(rPid)
+                # remember
+                cachedPid.cpuTime = cpuTime
+            # active processes
+            rUser[self._APIDS] = activePids
+            # stats
+            apids += len(activePids)
+        # log
+        log.log(cons.TK_LOG_LEVEL_DEBUG, "PT CPU activity, active processes: %i" % (apids))
+
+    def resetPlayTimeProcessCache(self):
+        """Forget all cached processes (filters are kept), next refresh will inspect all processes again"""
+        # lock
+        with self._playTimeLock:
+            # clear processes
+            self._cachedPids[self._PIDS].clear()
+            # clear user processes
+            for rUser in self._cachedPids[self._USRS]:
+                # clear
+                self._cachedPids[self._USRS][rUser][self._PIDS].clear()
+                self._cachedPids[self._USRS][rUser][self._MPIDS].clear()
+                self._cachedPids[self._USRS][rUser][self._DPIDS].clear()
+                self._cachedPids[self._USRS][rUser][self._APIDS].clear()
+                # clear activities with their own limits
+                for rPids in self._cachedPids[self._USRS][rUser][self._LPIDS].values():
+                    rPids.clear()
+            # process tree is read again too
+            self._childPids.clear()
+            # refresh right away
+            self._cachedPids[self._TIM] = None
+
+    def finishPlayTimeActivities(self):
+        """Stop tracking processes (unsubscribe from kernel process events)"""
+        # lock
+        with self._playTimeLock:
+            # connector is open
+            if self._procConnector is not None:
+                # close
+                self._procConnector.closeConnector()
+                self._procConnector = None
+
+    def processPlayTimeActivities(self, pSkippedUids=()):
+        """This is the main process to take care of PT processes (skipped users do not need PlayTime inspected)"""
+        # lock
+        with self._playTimeLock:
+            # processes being terminated (kill the ones which have not exited in time)
+            self._processTerminator.processTerminations()
+            # cache processes
+            self._cachePlayTimeProcesses(pSkippedUids)
+            # PlayTime activity is counted only when matched processes use CPU
+            if self._timekprConfig.getTimekprPlayTimeCpuActivityEnabled():
+                # check matched processes
+                self._processCpuActivity()
 
     def verifyPlayTimeActive(self, pUid, pUname, pSilent=False):
         """Return whether PlayTime is active, i.e. offending process is running"""
-        # if we have user
-        if pUid in self._cachedPids[self._USRS]:
-            # extra log
-            if not pSilent and log.getLogLevel() == cons.TK_LOG_LEVEL_DEBUG:
-                # logging
-                log.log(
-                    cons.TK_LOG_LEVEL_DEBUG,
-                    'PT: user "%s" (%s) has %i matching processes out of %i, using %i filters'
-                    % (
-                        pUname,
-                        pUid,
-                        len(self._cachedPids[self._USRS][pUid][self._MPIDS]),
-                        len(self._cachedPids[self._USRS][pUid][self._PIDS]),
-                        len(self._cachedPids[self._USRS][pUid][self._FLTS]),
-                    ),
-                )
-            # result
-            return True if self._cachedPids[self._USRS][pUid][self._MPIDS] else False
-        else:
-            # result
-            return False
-
-    def processPlayTimeFilters(self, pUid, pFlts):
-        """Add, modify, delete user process filters"""
-        # if we do not have a user yet
-        if pUid not in self._cachedPids[self._USRS]:
-            # initialize set
-            self._initUserData(str(pUid))
-
-        # the logic here is that we need to remove obsolete first and add the rest later
-        # this is due to user may enter filters in a way that process matches more than one filter
-        # therefore not to loose processes, this order is important
-        newFlts = set([rFlt[0] for rFlt in pFlts])
-        existFlts = set([rFlt for rFlt in self._cachedPids[self._USRS][pUid][self._FLTS]])
-        # remove obsolete filters
-        for rFlt in existFlts:
-            # if this is obsolete
-            if rFlt not in newFlts:
-                # now remove processes associated with filter
-                for rPid in self._getMatchedProcessesByFilter(
-                    pUid,
-                    self._cachedPids[self._USRS][pUid][self._FLTS][rFlt],
-                    self._cachedPids[self._USRS][pUid][self._MPIDS],
-                ):
-                    # remove pids
-                    self._cachedPids[self._USRS][pUid][self._MPIDS].remove(rPid)
-                # remove filter
-                self._cachedPids[self._USRS][pUid][self._FLTS].pop(rFlt)
-        # process filters
-        for rFlt in newFlts:
-            # if filter does not exist, we need to add it
-            if rFlt not in existFlts:
-                # filter does not exist, we need to add it
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt] = []
-                # firstly check if regexp is valid, in case someone will not enter it correclty (probably by mistake)
-                try:
-                    # if this succeeds then match is valid
-                    re.compile("^%s$" % (rFlt))
-                    # filter as is
-                    flt = rFlt
-                except re.error:
-                    # it failed, so we do escape and that's our pattern
-                    flt = re.escape(rFlt)
-                # remove brackets "[]" because we use them as description
-                flt = flt.replace("[", "").replace("]", "")
-                # add precompiled filters
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt].append(re.compile("^%s$" % (flt)))
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt].append(re.compile("[/\\\\]%s$" % (flt)))
-                self._cachedPids[self._USRS][pUid][self._FLTS][rFlt].append(re.compile("[/\\\\]%s " % (flt)))
-                # add matched pids to to matched pid list
-                self._cachedPids[self._USRS][pUid][self._MPIDS].update(
-                    self._getMatchedProcessesByFilter(
-                        pUid,
-                        self._cachedPids[self._USRS][pUid][self._FLTS][rFlt],
-                        self._cachedPids[self._USRS][pUid][self._PIDS],
+        # lock
+        with self._playTimeLock:
+            # if we have user
+            if pUid in self._cachedPids[self._USRS]:
+                # extra log
+                if not pSilent and log.getLogLevel() == cons.TK_LOG_LEVEL_DEBUG:
+                    # logging
+                    log.log(
+                        cons.TK_LOG_LEVEL_DEBUG,
+                        'PT: user "%s" (%s) has %i matching processes (%i used CPU) out of %i, using %i filters'
+                        % (
+                            pUname,
+                            pUid,
+                            len(self._cachedPids[self._USRS][pUid][self._MPIDS]),
+                            len(self._cachedPids[self._USRS][pUid][self._APIDS]),
+                            len(self._cachedPids[self._USRS][pUid][self._PIDS]),
+                            len(self._cachedPids[self._USRS][pUid][self._FLTS]),
+                        ),
                     )
-                )
+                # result (when CPU use is checked, only processes which used CPU are active)
+                return True if self._cachedPids[self._USRS][pUid][self._getActivePidsKey()] else False
+            else:
+                # result
+                return False
 
-    def killPlayTimeProcesses(self, pUid):
-        """Kill all PT processes"""
-        # if we have user
-        if pUid in self._cachedPids[self._USRS]:
-            # logging
-            log.log(
-                cons.TK_LOG_LEVEL_INFO,
-                'killing %i PT processes for uid "%s" ' % (len(self._cachedPids[self._USRS][pUid][self._MPIDS]), pUid),
+    def processPlayTimeFilters(self, pUid, pFlts, pLimitedFlts=()):
+        """Add, modify, delete user process filters (limited filters are activities, which have their own limits)"""
+        # lock
+        with self._playTimeLock:
+            # if we do not have a user yet
+            if pUid not in self._cachedPids[self._USRS]:
+                # initialize set
+                self._initUserData(str(pUid))
+
+            # filters
+            newFlts = set([rFlt[0] for rFlt in pFlts])
+            # activities with their own limits (they have to be filters too)
+            limitedFlts = newFlts.intersection(pLimitedFlts)
+            # nothing changed
+            if newFlts == set(self._cachedPids[self._USRS][pUid][self._FLTS]) and limitedFlts == set(
+                self._cachedPids[self._USRS][pUid][self._LMTCH]
+            ):
+                return
+            # filters with their patterns
+            self._cachedPids[self._USRS][pUid][self._FLTS] = {
+                rFlt: timekprPlayTimeMatcher.normalizeFilter(rFlt) for rFlt in newFlts
+            }
+            # all filters are compiled into one matcher
+            self._cachedPids[self._USRS][pUid][self._MTCH] = timekprPlayTimeMatcher(newFlts) if newFlts else None
+            # filters, which match descendants of matching process too
+            descendantsFlts = [rFlt for rFlt in newFlts if timekprPlayTimeMatcher.isDescendantsFilter(rFlt)]
+            # these are compiled into separate matcher
+            self._cachedPids[self._USRS][pUid][self._DMTCH] = (
+                timekprPlayTimeMatcher(descendantsFlts) if descendantsFlts else None
             )
-            # terminate / kill all user PT processes
-            for rPid in self._cachedPids[self._USRS][pUid][self._MPIDS]:
-                # increase terminate attempts
-                self._cachedPids[self._PIDS][rPid][self._TERM] += 1
-                # schedule a terminate / kill (first we try to terminate and later we just kill)
-                GLib.timeout_add_seconds(
-                    0.1,
-                    self._scheduleKill,
-                    rPid,
-                    (True if self._cachedPids[self._PIDS][rPid][self._TERM] > cons.TK_POLLTIME else False),
+            # new version, so cached match results for previous filters are not used (they are evicted eventually)
+            self._cachedPids[self._USRS][pUid][self._FVER] = next(self._filterVersions)
+            # activities with their own limits are matched after all processes are matched
+            self._cachedPids[self._USRS][pUid][self._LMTCH] = {}
+            self._cachedPids[self._USRS][pUid][self._LPIDS] = {}
+            # processes are matched again, since process may match more than one filter
+            self._cachedPids[self._USRS][pUid][self._MPIDS] = set(
+                self._getMatchedProcesses(pUid, self._cachedPids[self._USRS][pUid][self._PIDS])
+            )
+            # process trees are matched again too
+            self._cachedPids[self._USRS][pUid][self._DPIDS] = set()
+            # processes which do not match anymore are not active (new matches are checked for CPU use on next check)
+            self._cachedPids[self._USRS][pUid][self._APIDS] &= self._cachedPids[self._USRS][pUid][self._MPIDS]
+            # user has filters, which match descendants too
+            if self._cachedPids[self._USRS][pUid][self._DMTCH] is not None:
+                # processes cached before descendants filters were set up do not have their parents
+                for rPid in self._cachedPids[self._USRS][pUid][self._PIDS]:
+                    # not yet known
+                    if self._cachedPids[self._PIDS][rPid].parentPid is None:
+                        # read parent
+                        self._cachedPids[self._PIDS][rPid].parentPid = self._readParentPid(rPid)
+                        # process tree
+                        self._indexParentPid(rPid, self._cachedPids[self._PIDS][rPid].parentPid)
+                # match process trees
+                for rPid in self._getMatchedProcesses(
+                    pUid, self._cachedPids[self._USRS][pUid][self._PIDS], self._DMTCH
+                ):
+                    # match
+                    self._matchDescendants(pUid, rPid)
+            # every activity with its own limit is compiled into separate matcher
+            self._cachedPids[self._USRS][pUid][self._LMTCH] = {
+                rFlt: timekprPlayTimeMatcher([rFlt]) for rFlt in limitedFlts
+            }
+            # processes of activities with their own limits (these are matched processes, so only they are checked)
+            self._cachedPids[self._USRS][pUid][self._LPIDS] = {
+                rFlt: self._getLimitedActivityProcesses(pUid, rFlt) for rFlt in limitedFlts
+            }
+
+    def killPlayTimeProcesses(self, pUid, pLimitedFlts=None):
+        """Kill all PT processes (or only processes of specified activities, which have their own limits)"""
+        # lock
+        with self._playTimeLock:
+            # if we have user
+            if pUid in self._cachedPids[self._USRS]:
+                # all processes
+                if pLimitedFlts is None:
+                    # processes
+                    pids = self._cachedPids[self._USRS][pUid][self._MPIDS]
+                else:
+                    # processes of activities
+                    pids = set().union(
+                        *(
+                            self._cachedPids[self._USRS][pUid][self._LPIDS][rFlt]
+                            for rFlt in pLimitedFlts
+                            if rFlt in self._cachedPids[self._USRS][pUid][self._LPIDS]
+                        )
+                    )
+                # logging
+                log.log(
+                    cons.TK_LOG_LEVEL_INFO,
+                    'killing %i PT processes for uid "%s" ' % (len(pids), pUid),
+                )
+                # terminate all user PT processes at once (they are killed later if they do not exit in time)
+                self._processTerminator.terminateProcesses(
+                    {rPid: self._cachedPids[self._PIDS][rPid].exe for rPid in pids}
                 )
 
     # --------------- helper methods --------------- #
 
     def getCachedProcesses(self):
         """Get all cached processes"""
-        proc = [
-            [
-                rPid,
-                self._cachedPids[self._PIDS][rPid][self._EXE],
-                self._cachedPids[self._PIDS][rPid][self._CMD],
+        # lock
+        with self._playTimeLock:
+            proc = [
+                [
+                    str(rPid),
+                    self._cachedPids[self._PIDS][rPid].exe,
+                    self._cachedPids[self._PIDS][rPid].cmdLine or None,
+                ]
+                for rPid in self._cachedPids[self._PIDS]
             ]
-            for rPid in self._cachedPids[self._PIDS]
-        ]
-        return proc
+            return proc
 
     def getCachedUserProcesses(self, pUserId):
         """Get processes, that are cached for user"""
-        if pUserId in self._cachedPids[self._USRS]:
-            proc = [
-                [
-                    rPid,
-                    self._cachedPids[self._PIDS][rPid][self._EXE],
-                    self._cachedPids[self._PIDS][rPid][self._CMD],
+        # lock
+        with self._playTimeLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                proc = [
+                    [
+                        str(rPid),
+                        self._cachedPids[self._PIDS][rPid].exe,
+                        self._cachedPids[self._PIDS][rPid].cmdLine or None,
+                    ]
+                    for rPid in self._cachedPids[self._USRS][pUserId][self._PIDS]
                 ]
-                for rPid in self._cachedPids[self._USRS][pUserId][self._PIDS]
-            ]
-        else:
-            proc = []
-        return proc
+            else:
+                proc = []
+            return proc
 
     def getMatchedUserProcesses(self, pUserId):
         """Get processes, that are cached for user and matches at least one filter"""
-        if pUserId in self._cachedPids[self._USRS]:
-            proc = [
-                [
-                    rPid,
-                    self._cachedPids[self._PIDS][rPid][self._EXE],
-                    self._cachedPids[self._PIDS][rPid][self._CMD],
+        # lock
+        with self._playTimeLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                proc = [
+                    [
+                        str(rPid),
+                        self._cachedPids[self._PIDS][rPid].exe,
+                        self._cachedPids[self._PIDS][rPid].cmdLine or None,
+                    ]
+                    for rPid in self._cachedPids[self._USRS][pUserId][self._MPIDS]
                 ]
-                for rPid in self._cachedPids[self._USRS][pUserId][self._MPIDS]
-            ]
-        else:
-            proc = []
-        return proc
+            else:
+                proc = []
+            return proc
+
+    def getMatchedProcessesSnapshot(self):
+        """Get matched processes for all users (uid -> [process count, {pid: (executable, cmdline)}, active pids,
+        {filter: pids} for activities with their own limits])"""
+        # lock
+        with self._playTimeLock:
+            snapshot = {
+                rUid: [
+                    len(rUser[self._PIDS]),
+                    {
+                        rPid: (
+                            self._cachedPids[self._PIDS][rPid].exe,
+                            self._cachedPids[self._PIDS][rPid].cmdLine or None,
+                        )
+                        for rPid in rUser[self._MPIDS]
+                    },
+                    set(rUser[self._getActivePidsKey()]),
+                    {rFlt: set(rPids) for rFlt, rPids in rUser[self._LPIDS].items()},
+                ]
+                for rUid, rUser in self._cachedPids[self._USRS].items()
+            }
+            return snapshot
 
     def getMatchedUserProcessCnt(self, pUserId):
         """Get process count, that are cached for user and matches at least one filter"""
-        if pUserId in self._cachedPids[self._USRS]:
-            procCnt = len(self._cachedPids[self._USRS][pUserId][self._MPIDS])
-        else:
-            procCnt = 0
-        return procCnt
+        # lock
+        with self._playTimeLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                procCnt = len(self._cachedPids[self._USRS][pUserId][self._MPIDS])
+            else:
+                procCnt = 0
+            return procCnt
+
+    def getActiveUserProcessCnt(self, pUserId):
+        """Get process count, that are active PlayTime activities for user (matched, which used CPU if it is checked)"""
+        # lock
+        with self._playTimeLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                procCnt = len(self._cachedPids[self._USRS][pUserId][self._getActivePidsKey()])
+            else:
+                procCnt = 0
+            return procCnt
+
+    def getActiveUserLimitedActivities(self, pUserId):
+        """Get activities, which have their own limits and are active for user (they have active processes)"""
+        # lock
+        with self._playTimeLock:
+            if pUserId in self._cachedPids[self._USRS]:
+                # active processes
+                activePids = self._cachedPids[self._USRS][pUserId][self._getActivePidsKey()]
+                # activities
+                acts = [
+                    rFlt
+                    for rFlt, rPids in self._cachedPids[self._USRS][pUserId][self._LPIDS].items()
+                    if not rPids.isdisjoint(activePids)
+                ]
+            else:
+                acts = []
+            return acts
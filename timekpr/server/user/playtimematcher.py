@@ -0,0 +1,155 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import re
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+
+
+class timekprPlayTimeMatcher(object):
+    """All PlayTime filters of one user compiled into one matcher
+
+    Every filter matches the whole string, a path ending with the filter or a path ending with the filter
+    which is followed by arguments, i.e. "^flt$", "[/\\\\]flt$" and "[/\\\\]flt ". Plain executable names
+    (most filters are like that) are looked up by path components, the rest are joined into one regexp.
+    Filters prefixed with "+" match descendants of matching process too (prefix itself is not part of the filter)."""
+
+    # prefix for filters, which match descendants of matching process too
+    DESCENDANTS_PREFIX = "+"
+
+    # literal filter (no regexp specials, except escaped ones)
+    _LITERAL = re.compile(r"(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])*")
+    # unescape literal
+    _UNESCAPE = re.compile(r"\\(.)")
+    # path components, which can match literal filter (after path separator, followed by argument separator or end)
+    _COMPONENTS = re.compile(r"[/\\]([^/\\ ]+)(?= |$)")
+    # characters, which make literal filter not to be a single path component
+    _SEPARATORS = ("/", "\\", " ")
+    # group references (numbered or named) and named groups, they change meaning when patterns are joined
+    _GROUPREFS = re.compile(r"\\[1-9]|\(\?P[=<]")
+
+    def __init__(self, pFilters):
+        """Compile filters"""
+        # literal filters, which are single path components
+        self._literals = set()
+        # literal filters, which can only match whole string
+        self._wholeLiterals = set()
+        # patterns for regexp
+        patterns = []
+        # patterns, which have to be compiled on their own
+        ownPatterns = []
+        # go through filters
+        for rFlt in pFilters:
+            # pattern
+            flt = self.normalizeFilter(rFlt)
+            # literal
+            if self._LITERAL.fullmatch(flt):
+                # unescaped
+                literal = self._UNESCAPE.sub(r"\1", flt)
+                # path component
+                if not any(rSep in literal for rSep in self._SEPARATORS):
+                    self._literals.add(literal)
+                # may still match whole string, the rest is left to regexp
+                else:
+                    self._wholeLiterals.add(literal)
+                    patterns.append(flt)
+            # regexp, which refers to its groups
+            elif self._GROUPREFS.search(flt):
+                ownPatterns.append(flt)
+            else:
+                # regexp
+                patterns.append(flt)
+
+        # regexps
+        self._regExps = []
+        # pattern count
+        patternCnt = len(patterns) + len(ownPatterns)
+        # there are patterns
+        if patterns:
+            # alternation
+            alt = "|".join("(?:%s)" % (rPattern) for rPattern in patterns)
+            try:
+                # all in one
+                self._regExps.append(re.compile("^(?:%s)$|[/\\\\](?:%s)(?:$| )" % (alt, alt)))
+            except re.error:
+                # patterns can not be joined, use them one by one
+                ownPatterns.extend(patterns)
+        # patterns on their own (whole string and path are separate regexps, so group numbers and names stay intact)
+        for rPattern in ownPatterns:
+            # compile
+            self._regExps.append(re.compile("^(?:%s)$" % (rPattern)))
+            self._regExps.append(re.compile("[/\\\\](?:%s)(?:$| )" % (rPattern)))
+        # log
+        log.log(
+            cons.TK_LOG_LEVEL_DEBUG,
+            "PT matcher, literals: %i, regexps: %i (%i patterns)"
+            % (len(self._literals), len(self._regExps), patternCnt),
+        )
+
+    @classmethod
+    def normalizeFilter(cls, pFilter):
+        """Get regexp pattern for filter (invalid regexps are used as literals, brackets are description)"""
+        # descendants prefix is not part of the filter
+        pFilter = pFilter[1:] if cls.isDescendantsFilter(pFilter) else pFilter
+        # firstly check if regexp is valid, in case someone will not enter it correclty (probably by mistake)
+        try:
+            # if this succeeds then match is valid
+            re.compile("^%s$" % (pFilter))
+            # filter as is
+            flt = pFilter
+        except re.error:
+            # it failed, so we do escape and that's our pattern
+            flt = re.escape(pFilter)
+        # remove brackets "[]" because we use them as description
+        flt = flt.replace("[", "").replace("]", "")
+        # removing brackets may break the pattern
+        try:
+            # check
+            re.compile(flt)
+        except re.error:
+            # literal
+            flt = re.escape(pFilter.replace("[", "").replace("]", ""))
+        # result
+        return flt
+
+    @classmethod
+    def isDescendantsFilter(cls, pFilter):
+        """Check whether filter matches descendants of matching process too"""
+        # result
+        return pFilter.startswith(cls.DESCENDANTS_PREFIX) and len(pFilter) > len(cls.DESCENDANTS_PREFIX)
+
+    def _isMatched(self, pValue):
+        """Check whether value matches any filter"""
+        # whole value
+        if pValue in self._literals or pValue in self._wholeLiterals:
+            return True
+        # path components
+        if self._literals and ("/" in pValue or "\\" in pValue):
+            # check
+            for rComponent in self._COMPONENTS.findall(pValue):
+                # found
+                if rComponent in self._literals:
+                    return True
+        # regexps
+        for rRegExp in self._regExps:
+            # found
+            if rRegExp.search(pValue) is not None:
+                return True
+        # result
+        return False
+
+    def isCmdLineMatched(self, pCmdLine):
+        """Check whether command line matches any filter"""
+        # result
+        return self._isMatched(pCmdLine)
+
+    def isMatched(self, pExe, pCmdLine):
+        """Check whether process (executable and command line, if it's used) matches any filter"""
+        # result
+        return pExe is not None and (self._isMatched(pExe) or (pCmdLine is not None and self._isMatched(pCmdLine)))
@@ -0,0 +1,453 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import multiprocessing
+import os
+import signal
+import threading
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+from timekpr.server.user.playtime import timekprPlayTimeConfig
+from timekpr.server.user.terminator import timekprProcessTerminator
+
+# requests for scanner process
+_REQ_SETTINGS = "S"  # settings changed
+_REQ_FILTERS = "F"  # user filters changed
+_REQ_RESET = "R"  # forget cached processes
+_REQ_SCAN = "C"  # inspect processes (except for skipped users) and send results
+_REQ_STOP = "X"  # finish
+
+# settings fields
+_SET_ENHANCED = 0  # whether cmdline is inspected
+_SET_PROC_CONNECTOR = 1  # whether kernel process events are used
+_SET_CGROUP_SCAN = 2  # whether processes are listed from user cgroups
+_SET_LOG_LEVEL = 3  # log level
+_SET_CPU_ACTIVITY = 4  # whether only matched processes, which use CPU, are active
+
+
+class _timekprScannerConfig(object):
+    """Server configuration values, which are needed to inspect processes (scanner process has no server config)"""
+
+    def __init__(self, pSettings):
+        """Initialize config"""
+        # settings
+        self._settings = pSettings
+
+    def setSettings(self, pSettings):
+        """Set settings"""
+        # settings
+        self._settings = pSettings
+
+    def getTimekprPlayTimeEnhancedActivityMonitorEnabled(self):
+        """Get whether cmdline is inspected"""
+        # result
+        return self._settings[_SET_ENHANCED]
+
+    def getTimekprPlayTimeProcConnectorEnabled(self):
+        """Get whether kernel process events are used"""
+        # result
+        return self._settings[_SET_PROC_CONNECTOR]
+
+    def getTimekprPlayTimeCgroupScanEnabled(self):
+        """Get whether processes are listed from user cgroups"""
+        # result
+        return self._settings[_SET_CGROUP_SCAN]
+
+    def getTimekprPlayTimeCpuActivityEnabled(self):
+        """Get whether only matched processes, which use CPU, are active"""
+        # result
+        return self._settings[_SET_CPU_ACTIVITY]
+
+
+def _runScanner(pConnection, pSettings, pLogDir):
+    """Scanner process: inspect processes when requested and send matched processes back"""
+    # stopping is up to daemon (ctrl+c in console goes to the whole process group)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # logging goes to daemon log
+    log.setLogging(pSettings[_SET_LOG_LEVEL], pLogDir, cons.TK_LOG_OWNER_SRV, "")
+    try:
+        # lowest priority, io priority follows niceness (unless it's set explicitly)
+        os.nice(cons.TK_PLAYTIME_SCANNER_NICE)
+    except OSError as ex:
+        # log
+        log.log(cons.TK_LOG_LEVEL_INFO, "WARNING: can not lower PlayTime scanner priority (%s)" % (ex))
+    # config
+    scannerConfig = _timekprScannerConfig(pSettings)
+    # PT processes
+    playTimeConfig = timekprPlayTimeConfig(scannerConfig)
+    # log
+    log.log(cons.TK_LOG_LEVEL_INFO, "PlayTime scanner process started (pid: %i)" % (os.getpid()))
+
+    try:
+        # work until stopped
+        while True:
+            # whether scan was requested
+            isScanRequested = False
+            # users, which do not need PlayTime inspected
+            skippedUids = ()
+            # wait for requests, then process all of them (scans requested in the meantime are done once)
+            pConnection.poll(None)
+            while pConnection.poll():
+                # request
+                request = pConnection.recv()
+                # finish
+                if request[0] == _REQ_STOP:
+                    return
+                # settings
+                elif request[0] == _REQ_SETTINGS:
+                    # set
+                    scannerConfig.setSettings(request[1])
+                    log.setLogLevel(request[1][_SET_LOG_LEVEL])
+                # filters
+                elif request[0] == _REQ_FILTERS:
+                    # set
+                    playTimeConfig.processPlayTimeFilters(request[1], request[2], request[3])
+                # reset
+                elif request[0] == _REQ_RESET:
+                    # forget
+                    playTimeConfig.resetPlayTimeProcessCache()
+                # scan
+                elif request[0] == _REQ_SCAN:
+                    # scan
+                    isScanRequested = True
+                    skippedUids = request[1]
+            # scan
+            if isScanRequested:
+                # inspect processes
+                playTimeConfig.processPlayTimeActivities(skippedUids)
+                # send results
+                pConnection.send(playTimeConfig.getMatchedProcessesSnapshot())
+                # write log (same as daemon does every tick)
+                log.autoFlushLogFile()
+    except (EOFError, OSError):
+        # daemon is gone
+        pass
+    finally:
+        # stop tracking processes
+        playTimeConfig.finishPlayTimeActivities()
+        # log
+        log.log(cons.TK_LOG_LEVEL_INFO, "PlayTime scanner process finished")
+        log.flushLogFile()
+
+
+class timekprPlayTimeScanner(object):
+    """Inspects PlayTime processes in separate process with low priority, matched processes are taken from the latest
+    results of the scanner, so process inspection never delays accounting (same interface as timekprPlayTimeConfig)"""
+
+    # snapshot fields
+    _SNAP_CNT = 0  # cached process count
+    _SNAP_MPIDS = 1  # matched processes (pid -> (executable, cmdline))
+    _SNAP_APIDS = 2  # active processes (matched, which used CPU, if it's checked)
+    _SNAP_LPIDS = 3  # processes of activities, which have their own limits (filter -> pids)
+
+    def __init__(self, pTimekprConfig):
+        """Initialize all stuff for PlayTime scanner"""
+
+        log.log(cons.TK_LOG_LEVEL_INFO, "start init timekprPlayTimeScanner")
+
+        # global server config
+        self._timekprConfig = pTimekprConfig
+        # scanner process and connection to it
+        self._scannerProcess = None
+        self._scannerConnection = None
+        # scanner is started fresh (daemon has dbus, GLib main loop and worker threads, which are not forked)
+        self._scannerContext = multiprocessing.get_context("spawn")
+        # requests are sent from user processing (can be worker pool) and worker
+        self._scannerLock = threading.Lock()
+        # settings sent to scanner
+        self._scannerSettings = None
+        # whether scan was requested and results are not received yet
+        self._isScanPending = False
+        # user filters and filters, which have their own limits (they are sent again when scanner is restarted)
+        self._userFilters = {}
+        # the latest scanner results (uid -> [cached process count, {pid: (executable, cmdline)}, active pids,
+        # {filter: pids} for activities with their own limits])
+        self._snapshot = {}
+        # terminates PlayTime processes
+        self._processTerminator = timekprProcessTerminator()
+
+        log.log(cons.TK_LOG_LEVEL_INFO, "finish init timekprPlayTimeScanner")
+
+    def _getScannerSettings(self):
+        """Get settings for scanner"""
+        # result
+        return (
+            self._timekprConfig.getTimekprPlayTimeEnhancedActivityMonitorEnabled(),
+            self._timekprConfig.getTimekprPlayTimeProcConnectorEnabled(),
+            self._timekprConfig.getTimekprPlayTimeCgroupScanEnabled(),
+            log.getLogLevel(),
+            self._timekprConfig.getTimekprPlayTimeCpuActivityEnabled(),
+        )
+
+    def _startScanner(self):
+        """Start scanner process"""
+        # settings
+        self._scannerSettings = self._getScannerSettings()
+        # connection
+        self._scannerConnection, scannerConnection = self._scannerContext.Pipe()
+        # process
+        self._scannerProcess = self._scannerContext.Process(
+            target=_runScanner,
+            args=(scannerConnection, self._scannerSettings, self._timekprConfig.getTimekprLogfileDir()),
+            name="timekpr-ptscanner",
+            daemon=True,
+        )
+        # start
+        self._scannerProcess.start()
+        # scanner has its end
+        scannerConnection.close()
+        # nothing is pending in new scanner
+        self._isScanPending = False
+        # filters
+        for rUid, (rFlts, rLimitedFlts) in self._userFilters.items():
+            # send
+            self._sendRequest((_REQ_FILTERS, rUid, rFlts, rLimitedFlts))
+        # log
+        log.log(cons.TK_LOG_LEVEL_INFO, "PlayTime scanner process started")
+
+    def _stopScanner(self):
+        """Stop scanner process"""
+        # not running
+        if self._scannerProcess is None:
+            return
+        # ask to finish
+        self._sendRequest((_REQ_STOP,))
+        # wait
+        self._scannerProcess.join(cons.TK_PLAYTIME_SCANNER_STOP_TIMEOUT)
+        # did not finish in time
+        if self._scannerProcess.is_alive():
+            # log
+            log.log(cons.TK_LOG_LEVEL_INFO, "WARNING: PlayTime scanner process did not finish in time, killing it")
+            # kill
+            self._scannerProcess.kill()
+            self._scannerProcess.join()
+        # clean up
+        with self._scannerLock:
+            # close
+            if self._scannerConnection is not None:
+                self._scannerConnection.close()
+            self._scannerConnection = None
+        self._scannerProcess = None
+
+    def _sendRequest(self, pRequest):
+        """Send request to scanner (returns whether it was sent)"""
+        # lock
+        with self._scannerLock:
+            # scanner is not running
+            if self._scannerConnection is None:
+                return False
+            try:
+                # send
+                self._scannerConnection.send(pRequest)
+            except (OSError, ValueError) as ex:
+                # log
+                log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: sending request to PlayTime scanner failed (%s)" % (ex))
+                # scanner is gone, it's restarted on next tick
+                self._scannerConnection.close()
+                self._scannerConnection = None
+                # result
+                return False
+        # result
+        return True
+
+    def _receiveSnapshots(self):
+        """Receive scanner results (only the latest are used)"""
+        # scanner is gone
+        if self._scannerConnection is None:
+            return
+        try:
+            # read everything, which is there
+            while self._scannerConnection.poll():
+                # the latest
+                self._snapshot = self._scannerConnection.recv()
+                # scan is done
+                self._isScanPending = False
+        except (EOFError, OSError) as ex:
+            # log
+            log.log(cons.TK_LOG_LEVEL_INFO, "ERROR: receiving results from PlayTime scanner failed (%s)" % (ex))
+            # scanner is gone, it's restarted on next tick
+            with self._scannerLock:
+                # close
+                self._scannerConnection.close()
+                self._scannerConnection = None
+
+    def resetPlayTimeProcessCache(self):
+        """Forget all cached processes (filters are kept), next refresh will inspect all processes again"""
+        # results are not valid anymore
+        self._snapshot = {}
+        # forget
+        self._sendRequest((_REQ_RESET,))
+
+    def finishPlayTimeActivities(self):
+        """Stop scanner process"""
+        # stop
+        self._stopScanner()
+
+    def processPlayTimeActivities(self, pSkippedUids=()):
+        """This is the main process to take care of PT processes (processes are inspected by scanner in the background)"""
+        # processes being terminated (kill the ones which have not exited in time)
+        self._processTerminator.processTerminations()
+        # scanner is gone
+        if self._scannerProcess is not None and (
+            self._scannerConnection is None or not self._scannerProcess.is_alive()
+        ):
+            # log
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "ERROR: PlayTime scanner process exited unexpectedly (exit code: %s), restarting it"
+                % (self._scannerProcess.exitcode),
+            )
+            # clean up
+            self._stopScanner()
+        # start scanner
+        if self._scannerProcess is None:
+            # start
+            self._startScanner()
+        # results
+        self._receiveSnapshots()
+        # settings
+        settings = self._getScannerSettings()
+        # settings changed
+        if settings != self._scannerSettings:
+            # send
+            if self._sendRequest((_REQ_SETTINGS, settings)):
+                # sent
+                self._scannerSettings = settings
+        # request next scan (if scanner is busy, results of the scan it's doing are used)
+        if not self._isScanPending:
+            # request
+            self._isScanPending = self._sendRequest((_REQ_SCAN, frozenset(pSkippedUids)))
+        # log
+        log.log(
+            cons.TK_LOG_LEVEL_DEBUG,
+            "PT scanner, users: %i, scan pending: %s" % (len(self._snapshot), self._isScanPending),
+        )
+
+    def verifyPlayTimeActive(self, pUid, pUname, pSilent=False):
+        """Return whether PlayTime is active, i.e. offending process is running"""
+        # the latest results
+        userSnapshot = self._snapshot.get(pUid)
+        # if we have user
+        if userSnapshot is not None:
+            # extra log
+            if not pSilent and log.getLogLevel() == cons.TK_LOG_LEVEL_DEBUG:
+                # logging
+                log.log(
+                    cons.TK_LOG_LEVEL_DEBUG,
+                    'PT: user "%s" (%s) has %i matching processes (%i active) out of %i, using %i filters'
+                    % (
+                        pUname,
+                        pUid,
+                        len(userSnapshot[self._SNAP_MPIDS]),
+                        len(userSnapshot[self._SNAP_APIDS]),
+                        userSnapshot[self._SNAP_CNT],
+                        len(self._userFilters[pUid][0]) if pUid in self._userFilters else 0,
+                    ),
+                )
+            # result
+            return True if userSnapshot[self._SNAP_APIDS] else False
+        else:
+            # result
+            return False
+
+    def processPlayTimeFilters(self, pUid, pFlts, pLimitedFlts=()):
+        """Add, modify, delete user process filters (limited filters are activities, which have their own limits)"""
+        # filters (in the same format as user activities, filter is the first)
+        flts = sorted(set((str(rFlt[0]),) for rFlt in pFlts))
+        # activities with their own limits
+        limitedFlts = sorted(set(str(rFlt) for rFlt in pLimitedFlts))
+        # nothing changed
+        if pUid in self._userFilters and (flts, limitedFlts) == self._userFilters[pUid]:
+            return
+        # filters
+        self._userFilters[pUid] = (flts, limitedFlts)
+        # send
+        self._sendRequest((_REQ_FILTERS, pUid, flts, limitedFlts))
+
+    def killPlayTimeProcesses(self, pUid, pLimitedFlts=None):
+        """Kill all PT processes (or only processes of specified activities, which have their own limits)"""
+        # the latest results
+        userSnapshot = self._snapshot.get(pUid)
+        # if we have user
+        if userSnapshot is not None:
+            # all processes
+            if pLimitedFlts is None:
+                # processes
+                pids = userSnapshot[self._SNAP_MPIDS].keys()
+            else:
+                # processes of activities
+                pids = set().union(
+                    *(
+                        userSnapshot[self._SNAP_LPIDS][rFlt]
+                        for rFlt in pLimitedFlts
+                        if rFlt in userSnapshot[self._SNAP_LPIDS]
+                    )
+                )
+            # logging
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                'killing %i PT processes for uid "%s" ' % (len(pids), pUid),
+            )
+            # terminate all user PT processes at once (they are killed later if they do not exit in time)
+            self._processTerminator.terminateProcesses({rPid: userSnapshot[self._SNAP_MPIDS][rPid][0] for rPid in pids})
+
+    # --------------- helper methods --------------- #
+
+    def getCachedProcesses(self):
+        """Get all cached processes (scanner sends only matched processes, so these are matched processes of all users)"""
+        proc = [
+            [str(rPid), rProcess[0], rProcess[1]]
+            for rUserSnapshot in self._snapshot.values()
+            for rPid, rProcess in rUserSnapshot[self._SNAP_MPIDS].items()
+        ]
+        return proc
+
+    def getCachedUserProcesses(self, pUserId):
+        """Get processes, that are cached for user (scanner sends only matched processes, so these are matched ones)"""
+        return self.getMatchedUserProcesses(pUserId)
+
+    def getMatchedUserProcesses(self, pUserId):
+        """Get processes, that are cached for user and matches at least one filter"""
+        if pUserId in self._snapshot:
+            proc = [
+                [str(rPid), rProcess[0], rProcess[1]]
+                for rPid, rProcess in self._snapshot[pUserId][self._SNAP_MPIDS].items()
+            ]
+        else:
+            proc = []
+        return proc
+
+    def getMatchedUserProcessCnt(self, pUserId):
+        """Get process count, that are cached for user and matches at least one filter"""
+        if pUserId in self._snapshot:
+            procCnt = len(self._snapshot[pUserId][self._SNAP_MPIDS])
+        else:
+            procCnt = 0
+        return procCnt
+
+    def getActiveUserProcessCnt(self, pUserId):
+        """Get process count, that are active PlayTime activities for user (matched, which used CPU if it is checked)"""
+        if pUserId in self._snapshot:
+            procCnt = len(self._snapshot[pUserId][self._SNAP_APIDS])
+        else:
+            procCnt = 0
+        return procCnt
+
+    def getActiveUserLimitedActivities(self, pUserId):
+        """Get activities, which have their own limits and are active for user (they have active processes)"""
+        if pUserId in self._snapshot:
+            # activities
+            acts = [
+                rFlt
+                for rFlt, rPids in self._snapshot[pUserId][self._SNAP_LPIDS].items()
+                if not rPids.isdisjoint(self._snapshot[pUserId][self._SNAP_APIDS])
+            ]
+        else:
+            acts = []
+        return acts
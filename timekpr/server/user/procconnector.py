@@ -0,0 +1,182 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import errno
+import os
+import socket
+import struct
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+
+
+class timekprProcConnector(object):
+    """Listens to kernel process events (netlink proc connector) and reports which processes have to be inspected"""
+
+    # netlink / connector constants (linux/netlink.h, linux/connector.h, linux/cn_proc.h)
+    _NETLINK_CONNECTOR = 11
+    _NLMSG_DONE = 3
+    _CN_IDX_PROC = 1
+    _CN_VAL_PROC = 1
+    _PROC_CN_MCAST_LISTEN = 1
+    _PROC_CN_MCAST_IGNORE = 2
+    # events we are interested in
+    _PROC_EVENT_FORK = 0x00000001
+    _PROC_EVENT_EXEC = 0x00000002
+    _PROC_EVENT_UID = 0x00000004
+    _PROC_EVENT_EXIT = 0x80000000
+    # structures: nlmsghdr, cn_msg, proc_event header
+    _NLMSGHDR = struct.Struct("=IHHII")
+    _CNMSG = struct.Struct("=IIIIHH")
+    _PROCEVENT = struct.Struct("=IIQ")
+    # event data: fork (parent pid, parent tgid, child pid, child tgid), exec / exit / uid (pid, tgid, ...)
+    _EVENTFORK = struct.Struct("=IIII")
+    _EVENTPROC = struct.Struct("=II")
+    # receive size (kernel sends one event per message, but there can be more messages per datagram)
+    _RECVSIZE = 65536
+
+    def __init__(self):
+        """Initialize connector"""
+        # socket
+        self._socket = None
+
+    def _sendControl(self, pOperation):
+        """Send listen / ignore operation to the connector"""
+        # operation
+        operation = struct.pack("=I", pOperation)
+        # connector message
+        cnMsg = self._CNMSG.pack(self._CN_IDX_PROC, self._CN_VAL_PROC, 0, 0, len(operation), 0)
+        # netlink message
+        nlMsg = self._NLMSGHDR.pack(
+            self._NLMSGHDR.size + len(cnMsg) + len(operation), self._NLMSG_DONE, 0, 0, os.getpid()
+        )
+        # send to kernel
+        self._socket.send(nlMsg + cnMsg + operation)
+
+    def openConnector(self):
+        """Open netlink socket and subscribe to process events (needs root, raises OSError on failure)"""
+        # socket
+        self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self._NETLINK_CONNECTOR)
+        try:
+            # process churn comes in bursts, buffer is large, so it does not overflow between ticks
+            try:
+                # ignores system limits (we are root)
+                self._socket.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_RCVBUFFORCE, cons.TK_PLAYTIME_PROC_CONNECTOR_RCVBUF
+                )
+            except (OSError, AttributeError):
+                # limited by system
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, cons.TK_PLAYTIME_PROC_CONNECTOR_RCVBUF)
+            # bind to process events group (port id is assigned by kernel)
+            self._socket.bind((0, self._CN_IDX_PROC))
+            # subscribe
+            self._sendControl(self._PROC_CN_MCAST_LISTEN)
+            # events are read when processing
+            self._socket.setblocking(False)
+        except Exception:
+            # clean up
+            self._socket.close()
+            self._socket = None
+            # pass on
+            raise
+        # log
+        log.log(cons.TK_LOG_LEVEL_INFO, "process event connector subscribed")
+
+    def closeConnector(self):
+        """Unsubscribe from process events and close the socket"""
+        # not open
+        if self._socket is None:
+            return
+        try:
+            # unsubscribe (kernel stops sending events when there are no listeners)
+            self._sendControl(self._PROC_CN_MCAST_IGNORE)
+        except OSError:
+            # does not matter
+            pass
+        # close
+        self._socket.close()
+        self._socket = None
+
+    def _processMessage(self, pData, pChangedPids, pExitedPids):
+        """Process one connector message"""
+        # connector message follows netlink header
+        offset = self._NLMSGHDR.size
+        # check idx / val (only proc connector is of interest)
+        idx, val, _seq, _ack, dataLen, _flags = self._CNMSG.unpack_from(pData, offset)
+        # not ours or too short
+        if idx != self._CN_IDX_PROC or val != self._CN_VAL_PROC or dataLen < self._PROCEVENT.size:
+            return
+        # event header
+        offset += self._CNMSG.size
+        what, _cpu, _ts = self._PROCEVENT.unpack_from(pData, offset)
+        # event data
+        offset += self._PROCEVENT.size
+        # new process (threads are not interesting)
+        if what == self._PROC_EVENT_FORK:
+            # child
+            _ppid, _ptgid, pid, tgid = self._EVENTFORK.unpack_from(pData, offset)
+            # process, not thread
+            if pid == tgid:
+                # inspect
+                pChangedPids.add(tgid)
+        # new executable or user for process
+        elif what in (self._PROC_EVENT_EXEC, self._PROC_EVENT_UID):
+            # process
+            _pid, tgid = self._EVENTPROC.unpack_from(pData, offset)
+            # inspect
+            pChangedPids.add(tgid)
+        # process is gone (threads are not interesting)
+        elif what == self._PROC_EVENT_EXIT:
+            # process
+            pid, tgid = self._EVENTPROC.unpack_from(pData, offset)
+            # process, not thread
+            if pid == tgid:
+                # exited
+                pExitedPids.add(tgid)
+                # nothing to inspect
+                pChangedPids.discard(tgid)
+
+    def drainEvents(self):
+        """Read all pending events, returns processes to inspect, processes which exited and whether events were lost"""
+        # result
+        changedPids = set()
+        exitedPids = set()
+        isOverflow = False
+        # read until there is nothing left
+        while True:
+            try:
+                # read
+                data = self._socket.recv(self._RECVSIZE)
+            except BlockingIOError:
+                # nothing left
+                break
+            except OSError as ex:
+                # buffer overflowed, events were lost
+                if ex.errno == errno.ENOBUFS:
+                    # lost
+                    isOverflow = True
+                    # read what's left
+                    continue
+                # pass on
+                raise
+            # go through messages in datagram
+            offset = 0
+            while offset + self._NLMSGHDR.size <= len(data):
+                # header
+                msgLen, msgType, _flags, _seq, _pid = self._NLMSGHDR.unpack_from(data, offset)
+                # broken message
+                if msgLen < self._NLMSGHDR.size or offset + msgLen > len(data):
+                    break
+                # events come as "done" messages
+                if msgType == self._NLMSG_DONE and msgLen >= self._NLMSGHDR.size + self._CNMSG.size:
+                    # process
+                    self._processMessage(data[offset : offset + msgLen], changedPids, exitedPids)
+                # next message (aligned to 4 bytes)
+                offset += (msgLen + 3) & ~3
+        # result
+        return changedPids, exitedPids, isOverflow
@@ -0,0 +1,214 @@
+"""
+Created on Oct 18, 2026
+
+@author: mjasnik
+"""
+
+# imports
+import errno
+import os
+import select
+import signal
+import threading
+import time
+import psutil
+
+# timekpr imports
+from timekpr.common.log import log
+from timekpr.common.constants import constants as cons
+
+
+class timekprProcessTerminator(object):
+    """Terminates processes: sends terminate signal, then kill signal when process has not exited in time
+
+    Processes are referenced by pidfds (or psutil process objects on systems without pidfd support), which are
+    taken once when termination starts, so signals never reach another process which reused the pid."""
+
+    # process fields
+    _HANDLE = 0  # pidfd or psutil process
+    _DEADLINE = 1  # when kill signal is sent (monotonic)
+    _KILLED = 2  # whether kill signal was sent
+
+    def __init__(self, pProcRoot="/proc"):
+        """Initialize terminator (process information file system can be synthetic, e.g. for tests)"""
+        # executable location for process (to verify pid was not reused)
+        self._exePath = os.path.join(pProcRoot, "%i/exe")
+        # processes being terminated (pid -> fields)
+        self._processes = {}
+        # processes are terminated from user processing (can be worker pool) and checked from worker
+        self._lock = threading.Lock()
+        # whether pidfds are supported (python 3.9+ and linux 5.3+)
+        self._isPidFdUsed = hasattr(os, "pidfd_open") and hasattr(signal, "pidfd_send_signal")
+
+    def _openProcess(self, pPid, pExe):
+        """Take a reference to the process, verify it's still the same process (None if it's gone or not the same)"""
+        # pidfd
+        if self._isPidFdUsed:
+            try:
+                # open
+                handle = os.pidfd_open(pPid)
+            except OSError as ex:
+                # process is gone
+                if ex.errno != errno.ENOSYS:
+                    return None
+                # not supported by kernel, use psutil from now on
+                self._isPidFdUsed = False
+                # logging
+                log.log(cons.TK_LOG_LEVEL_INFO, "pidfds are not supported by kernel, using process objects instead")
+                # result
+                return self._openProcess(pPid, pExe)
+        else:
+            try:
+                # process (psutil verifies process identity before sending signals)
+                handle = psutil.Process(pid=pPid)
+            except psutil.Error:
+                # process is gone
+                return None
+
+        # pid may have been reused since process was inspected, check it's the same executable
+        try:
+            # same
+            isSame = os.readlink(self._exePath % (pPid)) == pExe
+        except OSError:
+            # gone or inaccessible
+            isSame = False
+        # not the same
+        if not isSame:
+            # release
+            self._closeProcess(handle)
+            # result
+            return None
+        # result
+        return handle
+
+    def _closeProcess(self, pHandle):
+        """Release reference to the process"""
+        # pidfd
+        if self._isPidFdUsed:
+            # close
+            os.close(pHandle)
+
+    def _sendSignal(self, pHandle, pSignal):
+        """Send signal to the process (returns whether process was still there)"""
+        try:
+            # pidfd
+            if self._isPidFdUsed:
+                # signal
+                signal.pidfd_send_signal(pHandle, pSignal)
+            else:
+                # signal
+                pHandle.send_signal(pSignal)
+        except (OSError, psutil.Error):
+            # process is gone
+            return False
+        # result
+        return True
+
+    def terminateProcesses(self, pProcesses):
+        """Start terminating processes (pid -> executable), processes already being terminated are skipped"""
+        # def
+        pids = []
+        # deadline for kill
+        deadline = time.monotonic() + cons.TK_PLAYTIME_KILL_TIMEOUT
+        # lock
+        with self._lock:
+            # go through processes
+            for rPid, rExe in pProcesses.items():
+                # already terminating
+                if rPid in self._processes:
+                    continue
+                # take a reference
+                handle = self._openProcess(rPid, rExe)
+                # gone
+                if handle is None:
+                    continue
+                # terminate
+                if self._sendSignal(handle, signal.SIGTERM):
+                    # track it until it exits
+                    self._processes[rPid] = [handle, deadline, False]
+                    # signalled
+                    pids.append(rPid)
+                else:
+                    # gone
+                    self._closeProcess(handle)
+        # logging
+        if pids:
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "sent terminate signal to %i processes: %s" % (len(pids), ", ".join(str(rPid) for rPid in pids)),
+            )
+        # check the rest
+        self.processTerminations()
+
+    def _getExitedProcesses(self):
+        """Get processes which have exited"""
+        # def
+        exitedPids = []
+        # pidfds become readable when process exits
+        if self._isPidFdUsed:
+            # poll
+            poller = select.poll()
+            # fds
+            fds = {}
+            # register
+            for rPid, rProcess in self._processes.items():
+                # register
+                poller.register(rProcess[self._HANDLE], select.POLLIN)
+                fds[rProcess[self._HANDLE]] = rPid
+            # check, no waiting
+            for rFd, _rEvent in poller.poll(0):
+                # exited
+                exitedPids.append(fds[rFd])
+        else:
+            # go through processes
+            for rPid, rProcess in self._processes.items():
+                # exited (zombies are exited too, they are waiting for parent)
+                try:
+                    # check
+                    isExited = not rProcess[self._HANDLE].is_running() or (
+                        rProcess[self._HANDLE].status() == psutil.STATUS_ZOMBIE
+                    )
+                except psutil.Error:
+                    # gone
+                    isExited = True
+                # exited
+                if isExited:
+                    exitedPids.append(rPid)
+        # result
+        return exitedPids
+
+    def processTerminations(self):
+        """Forget processes which have exited and kill processes which have not exited in time"""
+        # def
+        pids = []
+        # lock
+        with self._lock:
+            # nothing to do
+            if not self._processes:
+                return
+            # exited
+            for rPid in self._getExitedProcesses():
+                # release
+                self._closeProcess(self._processes.pop(rPid)[self._HANDLE])
+            # now
+            timeNow = time.monotonic()
+            # the rest
+            for rPid, rProcess in self._processes.items():
+                # time to kill
+                if not rProcess[self._KILLED] and rProcess[self._DEADLINE] <= timeNow:
+                    # kill
+                    self._sendSignal(rProcess[self._HANDLE], signal.SIGKILL)
+                    # killed
+                    rProcess[self._KILLED] = True
+                    # signalled
+                    pids.append(rPid)
+            # processes left
+            processCnt = len(self._processes)
+        # logging
+        if pids:
+            log.log(
+                cons.TK_LOG_LEVEL_INFO,
+                "sent kill signal to %i processes: %s" % (len(pids), ", ".join(str(rPid) for rPid in pids)),
+            )
+        # logging
+        log.log(cons.TK_LOG_LEVEL_DEBUG, "processes being terminated: %i" % (processCnt))
@@ -13,6 +13,8 @@ import math
 # timekpr imports
 from timekpr.common.log import log
 from timekpr.common.constants import constants as cons
+from timekpr.common.utils import misc
+from timekpr.common.utils import perfstats
 from timekpr.server.interface.dbus.logind.user import timekprUserManager
 from timekpr.common.utils.notifications import timekprNotificationManager
 from timekpr.common.utils.config import timekprUserConfig
@@ -22,7 +24,9 @@ from timekpr.common.utils.config import timekprUserControl
 class timekprUser(object):
     """Contains all the data for timekpr user"""
 
-    def __init__(self, bus_name, user_id, user_name, user_path, timekpr_config, play_time_config):
+    def __init__(
+        self, bus_name, user_id, user_name, user_path, timekpr_config, play_time_config, wake_up_callback=None
+    ):
         """Initialize all stuff for user"""
 
         log.log(cons.TK_LOG_LEVEL_INFO, "start init timekprUser")
@@ -38,6 +42,12 @@ class timekprUser(object):
         self._timekprConfig = timekpr_config
         # PlayTime option
         self._timekprPlayTimeConfig = play_time_config
+        # activity (effective, PlayTime) determined at last check
+        self._lastUserActivity = None
+        # session attribute changes reported by client (they change user state too)
+        self._sessionAttributesGen = 0
+        # whether day changed at last check
+        self._dayChanged = False
 
         # set up user properties
         self._timekprUserData[cons.TK_CTRL_SCR_N] = False  # is screensaver running
@@ -47,6 +57,7 @@ class timekprUser(object):
         self._timekprUserManager = timekprUserManager(
             self._timekprUserData[cons.TK_CTRL_UNAME],
             self._timekprUserData[cons.TK_CTRL_UPATH],
+            wake_up_callback,
         )
         # user config
         self._timekprUserConfig = timekprUserConfig(
@@ -129,6 +140,9 @@ class timekprUser(object):
             cons.TK_CTRL_SLEEP: 0,  # time spent while user was logged in and sleeping
             # checking values
             cons.TK_CTRL_LCHECK: datetime.now().replace(microsecond=0),  # this is last checked time
+            cons.TK_CTRL_LCHECKM: None,  # this is last checked time (monotonic clock)
+            cons.TK_CTRL_LCHECKB: None,  # this is last checked time (boottime clock)
+            cons.TK_CTRL_LCHECKR: 0.0,  # this is accounted time remainder (fractions of a second)
             cons.TK_CTRL_LSAVE: datetime.now().replace(
                 microsecond=0
             ),  # this is last save time (physical save will be less often as check)
@@ -178,6 +192,7 @@ class timekprUser(object):
         # PlayTime
         limits[cons.TK_CTRL_PTCNT] = {}
         limits[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTLSTC] = 0
+        limits[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP] = {}
         # loop through days
         for i in range(1, 7 + 1):
             # adding days and allowances
@@ -200,6 +215,8 @@ class timekprUser(object):
         )
         # deinit
         self._timekprUserNotification.deInitUser()
+        # remove login1 signal subscriptions
+        self._timekprUserManager.deInitUser()
 
     def recalculateTimeLeft(self):
         """Recalculate time left based on spent and configuration"""
@@ -465,6 +482,7 @@ class timekprUser(object):
             self._timekprPlayTimeConfig.processPlayTimeFilters(
                 self._timekprUserData[cons.TK_CTRL_UID],
                 self._timekprUserConfig.getUserPlayTimeActivities(),
+                self._timekprUserConfig.getUserPlayTimeActivityLimits().keys(),
             )
 
         # set up last config mod time
@@ -530,9 +548,15 @@ class timekprUser(object):
                 - self._timekprUserControl.getUserPlayTimeSpentDay(),
                 0,
             )
+            # PT activities with their own limits as well
+            timeSpentBeforeReloadPTAct = {
+                rAct: max(rSpent - self._timekprUserControl.getUserPlayTimeActivitiesSpentDay().get(rAct, 0), 0)
+                for rAct, rSpent in self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP].items()
+            }
         else:
             # no additional time
             timeSpentBeforeReload = timeSpentBeforeReloadPT = 0
+            timeSpentBeforeReloadPTAct = {}
 
         # read from config
         self._timekprUserControl.loadUserControl()
@@ -572,6 +596,12 @@ class timekprUser(object):
             self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_SPENTBD],
             self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_SPENTD],
         ) = _getPlayTimeBalanceSpent(timeSpentBeforeReloadPT)
+        # PlayTime activities with their own limits (they start from scratch when day has changed)
+        activitiesSpentPT = {} if dayChanged else self._timekprUserControl.getUserPlayTimeActivitiesSpentDay()
+        self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP] = {
+            rAct: activitiesSpentPT.get(rAct, 0) + timeSpentBeforeReloadPTAct.get(rAct, 0)
+            for rAct in activitiesSpentPT.keys() | timeSpentBeforeReloadPTAct.keys()
+        }
         # update last file mod time
         self._timekprUserData[cons.TK_CTRL_LMOD] = self._timekprUserControl.getUserControlLastModified()
 
@@ -600,7 +630,7 @@ class timekprUser(object):
         return isPTEnabled, isPTAccounted, isPTActive
 
     def adjustTimeSpentActual(self, pTimekprConfig):
-        """Adjust time spent (and save it)"""
+        """Adjust time spent (saving is done by persistence scheduler)"""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start adjustTimeSpentActual")
 
         def _adjustTimeSpentValues(pDay, pHOD, pSecs, pActive):
@@ -633,10 +663,29 @@ class timekprUser(object):
         )
         # currentHOD in str
         currentHODStr = str(self._currentHOD)
+        # get clocks (monotonic clock does not advance while computer is asleep, boottime clock does)
+        timeMonotonic, timeBoot = misc.getClockTimes()
+        # first check (init time is the start of the accounting window)
+        if self._timekprUserData[cons.TK_CTRL_LCHECKM] is None:
+            # get time spent (wall clock)
+            timeSpentExact = (self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LCHECK]).total_seconds()
+            # no sleep
+            timeSlept = 0
+        else:
+            # get time spent while computer was awake (wall clock changes and sleep do not affect this)
+            timeSpentExact = timeMonotonic - self._timekprUserData[cons.TK_CTRL_LCHECKM]
+            # get time computer was asleep
+            timeSlept = int(timeBoot - self._timekprUserData[cons.TK_CTRL_LCHECKB] - timeSpentExact)
+        # add remainder from previous check, so fractions of a second are not lost
+        timeSpentExact = max(timeSpentExact, 0) + self._timekprUserData[cons.TK_CTRL_LCHECKR]
         # get time spent
-        timeSpent = int((self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LCHECK]).total_seconds())
+        timeSpent = int(timeSpentExact)
+        # save remainder
+        self._timekprUserData[cons.TK_CTRL_LCHECKR] = timeSpentExact - timeSpent
         # adjust last time checked
         self._timekprUserData[cons.TK_CTRL_LCHECK] = self._effectiveDatetime
+        self._timekprUserData[cons.TK_CTRL_LCHECKM] = timeMonotonic
+        self._timekprUserData[cons.TK_CTRL_LCHECKB] = timeBoot
 
         # determine if active
         userActiveActual, userScreenLocked = self._timekprUserManager.isUserActive(
@@ -647,6 +696,8 @@ class timekprUser(object):
         userActiveEffective = userActiveActual
         # def PlayTime
         userActivePT = False
+        # PlayTime activities with their own limits, which are active
+        userActivitiesPT = []
 
         # account PlayTime as well (it makes sense to check PT activity only if user is active in the system)
         if userActiveEffective:
@@ -656,33 +707,51 @@ class timekprUser(object):
             if isPTEna:
                 # PT active
                 userActivePT = isPTAct
+                # activities with their own limits are checked only when PT is active
+                if userActivePT:
+                    # active activities
+                    userActivitiesPT = self._timekprPlayTimeConfig.getActiveUserLimitedActivities(self.getUserId())
                 # if override is enabled, then active is determined differently
                 if not isPTAcc:
                     # override
                     userActiveEffective = userActivePT
 
-        # if time spent is very much higher than the default polling time, computer might went to sleep?
-        if timeSpent >= cons.TK_POLLTIME * 15:
-            # sleeping time is added to inactive time (there is a question whether that's OK, disabled currently)
+        # in adaptive polling mode, time since last check is accounted using activity determined at last check,
+        # because session changes wake up the worker immediately (this keeps long polling intervals precise), PlayTime
+        # processes do not, so users with PlayTime activities are checked every regular poll (see getSecondsToNextEvent)
+        if self._lastUserActivity is not None and self._isAdaptivePollingEnabled():
+            # use previous activity
+            accountActiveEffective, accountActivePT, accountActivitiesPT = self._lastUserActivity
+        else:
+            # use current activity
+            accountActiveEffective, accountActivePT, accountActivitiesPT = (
+                userActiveEffective,
+                userActivePT,
+                userActivitiesPT,
+            )
+        # save activity for next check
+        self._lastUserActivity = (userActiveEffective, userActivePT, userActivitiesPT)
+
+        # time computer was asleep is not accounted (time spent is measured by monotonic clock, which stops while asleep)
+        if timeSlept > 0:
+            # sleeping time is not added to any time
             log.log(
                 cons.TK_LOG_LEVEL_INFO,
-                "INFO: it appears that computer was put to sleep for %i secs" % (timeSpent),
+                "INFO: computer was asleep for %i secs, user: %s" % (timeSlept, self.getUserName()),
             )
-            # effectively spent is 0 (we ignore +/- 3 seconds here)
-            timeSpent = 0
-        else:
-            # set time spent for previous hour (this may be triggered only when day changes)
-            if timeSpent > self._secondsInHour:
-                # adjust time values (either inactive or actual time)
-                _adjustTimeSpentValues(
-                    (self._timekprUserData[self._currentDOW][cons.TK_CTRL_PDAY] if dayChanged else self._currentDOW),
-                    "23" if self._currentHOD == 0 else currentHODStr,
-                    timeSpent - self._secondsInHour,
-                    userActiveEffective,
-                )
 
-            # adjust time spent for this hour
-            timeSpent = min(timeSpent, self._secondsInHour)
+        # set time spent for previous hour (this may be triggered only when hour or day changes)
+        if timeSpent > self._secondsInHour:
+            # adjust time values (either inactive or actual time)
+            _adjustTimeSpentValues(
+                (self._timekprUserData[self._currentDOW][cons.TK_CTRL_PDAY] if dayChanged else self._currentDOW),
+                "23" if self._currentHOD == 0 else currentHODStr,
+                timeSpent - self._secondsInHour,
+                accountActiveEffective,
+            )
+
+        # adjust time spent for this hour
+        timeSpent = min(timeSpent, self._secondsInHour)
 
         # if there is a day change, we need to adjust time for this day and day after
         if dayChanged:
@@ -706,6 +775,8 @@ class timekprUser(object):
                 self._timekprUserData[cons.TK_CTRL_PTCNT][rDay][cons.TK_CTRL_SPENTBD] = 0
                 # reset PlayTime spent for this day
                 self._timekprUserData[cons.TK_CTRL_PTCNT][rDay][cons.TK_CTRL_SPENTD] = 0
+            # reset PlayTime spent for activities with their own limits
+            self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP].clear()
 
             # # handle week change
             if weekChanged:
@@ -717,15 +788,21 @@ class timekprUser(object):
                 self._timekprUserData[cons.TK_CTRL_SPENTM] = 0
 
         # adjust time values (either sleep or inactive or actual time)
-        _adjustTimeSpentValues(self._currentDOW, currentHODStr, timeSpent, userActiveEffective)
+        _adjustTimeSpentValues(self._currentDOW, currentHODStr, timeSpent, accountActiveEffective)
 
         # count PlayTime if enabled
-        if userActiveEffective and userActivePT:
+        if accountActiveEffective and accountActivePT:
             # when override is enabled, only balance for regular time is accounted, PT balance is not
             # if override is not enabled, we count this only for spent, not for balance (i.e. it will not count towards limit)
             if not self._timekprUserConfig.getUserPlayTimeOverrideEnabled():
                 # adjust PlayTime balance this day
                 self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_SPENTBD] += timeSpent
+                # adjust PlayTime spent this day for active activities with their own limits
+                for rAct in accountActivitiesPT:
+                    # adjust
+                    self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP][rAct] = (
+                        self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP].get(rAct, 0) + timeSpent
+                    )
             # adjust PlayTime spent this day
             self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_SPENTD] += timeSpent
 
@@ -754,12 +831,8 @@ class timekprUser(object):
                     % (self.getUserName(), self._timekprUserData[cons.TK_CTRL_SPENTM]),
                 )
 
-        # check if we need to save progress
-        if (
-            self._effectiveDatetime - self._timekprUserData[cons.TK_CTRL_LSAVE]
-        ).total_seconds() >= pTimekprConfig.getTimekprSaveTime() or dayChanged:
-            # save
-            self.saveSpent()
+        # save day change (progress is saved by persistence scheduler, day change makes it save everything at once)
+        self._dayChanged = dayChanged
 
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish adjustTimeSpentActual")
 
@@ -879,6 +952,59 @@ class timekprUser(object):
             timeUnaccountedHour,
         )
 
+    def _isAdaptivePollingEnabled(self):
+        """Return whether adaptive polling is enabled"""
+        # adaptive polling is enabled when max poll time is larger than poll time
+        return self._timekprConfig.getTimekprAdaptivePollTimeMax() > self._timekprConfig.getTimekprPollTime()
+
+    def getSecondsToNextEvent(self, pUserActive):
+        """Return seconds until the next event which needs attention: notification, restriction, interval boundary or PlayTime limit"""
+        # time left in a row
+        timeLeftInARow = self._timekprUserData[cons.TK_CTRL_LEFT]
+        # next notification level
+        secondsToEvent = self._timekprUserNotification.getSecondsToNextNotification(timeLeftInARow)
+        # time left can not decrease faster than real time, so restrictions will not start earlier than this
+        secondsToEvent = min(secondsToEvent, timeLeftInARow - self._timekprConfig.getTimekprTerminationTime())
+        # hour boundary
+        secondsToEvent = min(secondsToEvent, self._secondsLeftHour)
+        # interval boundaries in this hour
+        for rMinute in (
+            self._timekprUserData[self._currentDOW][str(self._currentHOD)][cons.TK_CTRL_SMIN],
+            self._timekprUserData[self._currentDOW][str(self._currentHOD)][cons.TK_CTRL_EMIN],
+        ):
+            # boundary is ahead
+            if rMinute * 60 > self._secondsInHour:
+                # seconds to boundary
+                secondsToEvent = min(secondsToEvent, rMinute * 60 - self._secondsInHour)
+
+        # PlayTime is accounted only when user is active
+        if pUserActive:
+            # PT status
+            isPTEnabled, isPTAccounted, isPTActive = self._isPlayTimeEnabledAccountedActive(pSilent=True)
+            # PlayTime processes start and exit without waking up the worker, they are checked every regular poll
+            if isPTEnabled and self._timekprUserConfig.getUserPlayTimeActivities():
+                # regular poll
+                secondsToEvent = min(secondsToEvent, self._timekprConfig.getTimekprPollTime())
+            # PT limit (when time is over, processes have to be found and terminated without delay)
+            if isPTEnabled and isPTAccounted:
+                # PlayTime left can not decrease faster than real time too
+                secondsToEvent = min(
+                    secondsToEvent,
+                    self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_LEFTD],
+                )
+                # activities with their own limits, which were active at last check, can not run out faster either
+                if self._lastUserActivity is not None and self._lastUserActivity[2]:
+                    # time left for activities
+                    timeLeftActivitiesPT = self.getPlayTimeActivitiesLeft()
+                    # active activities
+                    for rAct in self._lastUserActivity[2]:
+                        # limit is still there
+                        if rAct in timeLeftActivitiesPT:
+                            secondsToEvent = min(secondsToEvent, timeLeftActivitiesPT[rAct])
+
+        # result
+        return max(secondsToEvent, 0)
+
     def getPlayTimeLeft(self, pCheckActive=True):
         """Return whether time is over for PlayTime"""
         # get time left
@@ -896,9 +1022,21 @@ class timekprUser(object):
         # result
         return timeLeftPT, isPTEnabled, isPTAccounted, isPTActive
 
+    def getPlayTimeActivitiesLeft(self):
+        """Return PlayTime left for activities, which have their own limits (process mask -> time left)"""
+        # spent
+        activitiesSpentPT = self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP]
+        # result
+        return {
+            rAct: rLimit - activitiesSpentPT.get(rAct, 0)
+            for rAct, rLimit in self._timekprUserConfig.getUserPlayTimeActivityLimits().items()
+        }
+
     def saveSpent(self):
         """Save the time spent by the user"""
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "start saveSpent")
+        # perf
+        perfStart = perfstats.startMeasurement()
 
         # initial config loaded
         userConfigLastModified = self._timekprUserConfig.getUserConfigLastModified()
@@ -952,6 +1090,9 @@ class timekprUser(object):
         self._timekprUserControl.setUserPlayTimeSpentDay(
             self._timekprUserData[cons.TK_CTRL_PTCNT][self._currentDOW][cons.TK_CTRL_SPENTD]
         )
+        self._timekprUserControl.setUserPlayTimeActivitiesSpentDay(
+            self._timekprUserData[cons.TK_CTRL_PTCNT][cons.TK_CTRL_PTASP]
+        )
         self._timekprUserControl.saveControl()
         # renew last modified
         self._timekprUserData[cons.TK_CTRL_LMOD] = self._timekprUserControl.getUserControlLastModified()
@@ -963,8 +1104,21 @@ class timekprUser(object):
                 "save spent structure: %s" % (str(self._timekprUserData[self._currentDOW])),
             )
 
+        # perf
+        perfstats.stopMeasurement(cons.TK_PERF_SAVESPENT, perfStart, self.getUserName())
+
         log.log(cons.TK_LOG_LEVEL_EXTRA_DEBUG, "finish saveSpent")
 
+    def syncSpent(self):
+        """Flush saved time spent to storage"""
+        # flush
+        self._timekprUserControl.syncControl()
+
+    def isDayChanged(self):
+        """Return whether day changed at last check"""
+        # result
+        return self._dayChanged
+
     def getTimeLimits(self):
         """Calculate time limits for sendout to clients"""
         # main container
@@ -1102,6 +1256,8 @@ class timekprUser(object):
 
     def processUserSessionAttributes(self, pWhat, pKey, pValue):
         """This will set up request or verify actual request for user attribute changes"""
+        # user state may change
+        self._sessionAttributesGen += 1
         # depends on what attribute
         if pWhat == cons.TK_CTRL_SCR_N:
             # set it to false, e.g. not in force
@@ -1215,6 +1371,10 @@ class timekprUser(object):
         """Return user id"""
         return self._timekprUserData[cons.TK_CTRL_UID]
 
+    def getUserStateGeneration(self):
+        """Return generation of user and session state (it changes when user or session state changes)"""
+        return self._timekprUserManager.getStateGeneration(), self._sessionAttributesGen
+
     def getUserName(self):
         """Return user name"""
         return self._timekprUserData[cons.TK_CTRL_UNAME]